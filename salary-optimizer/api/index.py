@@ -1,12 +1,10 @@
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
 import sys
 import os
 
 # Add the backend directory to the path so we can import from it
 sys.path.append(os.path.join(os.path.dirname(__file__), '../backend'))
 
-from main import app
-
-# Vercel needs the app explicitly exposed, but importing it is enough if it's named 'app'
-# This file acts as the bridge.
+# Vercel picks up the ASGI callable named 'app'. The serverless entry answers
+# /api/calculate without importing FastAPI and loads main.app on first use
+# for every other route.
+from serverless import app
@@ -0,0 +1,96 @@
+from bisect import bisect_right
+
+from models import AnalyticsResponse, BreakevenPoint, RegimeAnalytics, TaxRequest
+import tax_core
+from tax_core import TaxInputs
+
+# Rate and breakeven analytics for one TaxRequest, read off the slab
+# definitions instead of probing /api/calculate.
+#
+# Gross salary, PF and professional tax are the same under both regimes, so
+# in-hand pay differs only by total tax. The new-regime tax is fixed by the
+# inputs; inverting the old-regime tax curve at that amount
+# (RegimeRules.income_for_tax) gives the old-regime taxable income at which
+# the two regimes cost the same, and the gap to the current taxable income is
+# the extra (or spare) old-regime deduction.
+
+# Old-regime deductions a taxpayer can move: (Investments field, breakdown label)
+BREAKEVEN_DEDUCTIONS = (
+    ('section_80c', 'Section 80C'),
+    ('section_80d', 'Section 80D'),
+    ('nps_self', 'NPS Self (80CCD(1B))'),
+    ('home_loan_interest', 'Home Loan Interest'),
+)
+
+
+def _band(rules, taxable_income: float) -> str:
+    if taxable_income <= rules.rebate_limit:
+        return "rebate"
+    if rules.marginal_relief and taxable_income < rules.marginal_relief_end():
+        return "marginal_relief"
+    surcharge = rules.surcharge
+    i = bisect_right(surcharge.thresholds, taxable_income) - 1
+    if i >= 0 and taxable_income < surcharge.relief_end[i]:
+        return "surcharge_relief"
+    return "slab"
+
+
+def _regime_analytics(rules, result: tax_core.RegimeResult) -> RegimeAnalytics:
+    ti = result.taxable_income
+    next_boundary = next((k for k in rules.kinks() if k > ti), None)
+    relief_end = rules.marginal_relief_end()
+
+    return RegimeAnalytics(
+        regime=result.regime,
+        taxable_income=ti,
+        total_tax=result.total_tax,
+        effective_rate=result.total_tax / result.gross_salary if result.gross_salary > 0 else 0.0,
+        marginal_rate=rules.marginal_rate(ti) * (1 + rules.cess_rate),
+        band=_band(rules, ti),
+        slab_rate=rules.slabs.rate(ti),
+        next_boundary=next_boundary,
+        distance_to_next_boundary=None if next_boundary is None else next_boundary - ti,
+        rebate_limit=rules.rebate_limit,
+        rebate_cliff=0.0 if rules.marginal_relief else rules.slabs.tax(rules.rebate_limit) * (1 + rules.cess_rate),
+        marginal_relief_end=relief_end if rules.marginal_relief else None,
+        reduction_to_rebate=max(0.0, ti - rules.rebate_limit),
+    )
+
+
+def _breakeven_points(inputs: TaxInputs, old: tax_core.RegimeResult, gap: float) -> list:
+    caps = inputs.rules("old").caps
+    points = []
+    for field, label in BREAKEVEN_DEDUCTIONS:
+        claimed = old.deductions_breakdown[label]
+        # PF counts towards the 80C cap but cannot be moved by the taxpayer
+        fixed = inputs.pf_deduction if field == 'section_80c' else 0.0
+        target = claimed + gap - fixed
+        reachable = 0.0 <= target and claimed + gap <= caps[field]
+        points.append(BreakevenPoint(
+            deduction=field,
+            current=getattr(inputs, field),
+            cap=caps[field],
+            breakeven=target if reachable else None,
+        ))
+    return points
+
+
+def analyse(request: TaxRequest) -> AnalyticsResponse:
+    inputs = TaxInputs.from_request(request)
+    result = tax_core.compare(inputs)
+    old_rules, new_rules = inputs.rules("old"), inputs.rules("new")
+    old, new = result.old_regime, result.new_regime
+
+    breakeven_taxable_income = old_rules.income_for_tax(new.total_tax / (1 + old_rules.cess_rate))
+    # Measured from taxable income before the clamp at 0, so a negative gap
+    # is exactly how much deduction could be dropped before the regimes tie
+    gap = old.gross_salary - sum(old.deductions_breakdown.values()) - breakeven_taxable_income
+
+    return AnalyticsResponse(
+        old_regime=_regime_analytics(old_rules, old),
+        new_regime=_regime_analytics(new_rules, new),
+        better_regime="Old" if old.total_tax < new.total_tax else "New",
+        breakeven_taxable_income=breakeven_taxable_income,
+        additional_old_deductions=gap,
+        breakevens=_breakeven_points(inputs, old, gap),
+    )
@@ -1,3 +1,17 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import ComparisonRecord, Scenario
+
+
+@admin.register(Scenario)
+class ScenarioAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'fy', 'name', 'input_hash', 'created_at')
+    list_filter = ('fy',)
+    search_fields = ('user', 'input_hash')
+    raw_id_fields = ('comparison',)
+
+
+@admin.register(ComparisonRecord)
+class ComparisonRecordAdmin(admin.ModelAdmin):
+    list_display = ('id', 'fy', 'input_hash', 'created_at')
+    search_fields = ('input_hash',)
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+import payroll_io
+
+
+class Command(BaseCommand):
+    help = "Run a payroll CSV or Parquet file through the tax engine in fixed-size chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument('input')
+        parser.add_argument('output')
+        parser.add_argument('--chunk-size', type=int, default=payroll_io.CHUNK_SIZE)
+        parser.add_argument('--fixed-point', action='store_true',
+                            help="Integer-paise arithmetic with statutory rounding (fixed_point.py)")
+
+    def handle(self, *args, **options):
+        try:
+            stats = payroll_io.process_file(options['input'], options['output'], options['chunk_size'],
+                                            options['fixed_point'])
+        except (OSError, RuntimeError) as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats.rows} rows ({stats.errors} with errors) in {stats.seconds:.2f}s, "
+            f"{stats.rows_per_second:,.0f} rows/s -> {options['output']}"
+        ))
@@ -0,0 +1,34 @@
+import time
+
+import metrics
+
+
+class MetricsMiddleware:
+    # Django counterpart of metrics.MetricsMiddleware: request count and
+    # latency per URL pattern, and the X-Profile sampling hook. Django serves
+    # each request on one thread, so the profile covers exactly that request.
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profiler = None
+        if metrics.wants_profile(request.headers.get(metrics.PROFILE_HEADER)):
+            profiler = metrics.start_profile()
+        started = time.perf_counter()
+        status = 500
+        try:
+            response = self.get_response(request)
+            status = response.status_code
+        finally:
+            endpoint = _endpoint(request)
+            if profiler is not None:
+                profile_id = metrics.finish_profile(profiler, endpoint)
+            metrics.record_request(endpoint, request.method, status, time.perf_counter() - started)
+        if profiler is not None:
+            response[metrics.PROFILE_ID_HEADER] = profile_id
+        return response
+
+
+def _endpoint(request) -> str:
+    match = getattr(request, 'resolver_match', None)
+    return '/' + match.route if match is not None else 'unmatched'
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComparisonRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fy', models.CharField(default='2025-26', max_length=7)),
+                ('input_hash', models.CharField(max_length=32)),
+                ('result', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('input_hash', 'fy'), name='comparison_hash_fy_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Scenario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user', models.CharField(max_length=150)),
+                ('fy', models.CharField(default='2025-26', max_length=7)),
+                ('name', models.CharField(blank=True, max_length=200)),
+                ('input_hash', models.CharField(max_length=32)),
+                ('request', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('comparison', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='scenarios', to='api.comparisonrecord')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'fy', '-created_at', '-id'], name='scenario_user_fy_recent'), models.Index(fields=['input_hash'], name='scenario_input_hash')],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='comparisonrecord',
+            name='comparison_hash_fy_unique',
+        ),
+        migrations.AddField(
+            model_name='comparisonrecord',
+            name='rules_digest',
+            field=models.CharField(default='', max_length=32),
+        ),
+        migrations.AddConstraint(
+            model_name='comparisonrecord',
+            constraint=models.UniqueConstraint(fields=('input_hash', 'fy', 'rules_digest'), name='comparison_hash_fy_rules_unique'),
+        ),
+    ]
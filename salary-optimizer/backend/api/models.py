@@ -1,3 +1,39 @@
 from django.db import models
 
-# Create your models here.
+from tax_rules import DEFAULT_FY
+
+
+class ComparisonRecord(models.Model):
+    # One stored ComparisonResponse per distinct input. input_hash is
+    # tax_cache.canonical_key (rupee-rounded inputs), so identical what-ifs
+    # from any user share a row and are never recomputed. rules_digest is
+    # tax_rules.rules_digest() when the result was computed; rows from other
+    # versions of TAX_RULES are never served again.
+    fy = models.CharField(max_length=7, default=DEFAULT_FY)
+    input_hash = models.CharField(max_length=32)
+    rules_digest = models.CharField(max_length=32, default='')
+    result = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['input_hash', 'fy', 'rules_digest'], name='comparison_hash_fy_rules_unique'),
+        ]
+
+
+class Scenario(models.Model):
+    # A saved what-if. History is listed newest first per user and FY, which
+    # the (user, fy, created_at, id) index serves without a sort.
+    user = models.CharField(max_length=150)
+    fy = models.CharField(max_length=7, default=DEFAULT_FY)
+    name = models.CharField(max_length=200, blank=True)
+    input_hash = models.CharField(max_length=32)
+    request = models.JSONField()
+    comparison = models.ForeignKey(ComparisonRecord, on_delete=models.PROTECT, related_name='scenarios')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'fy', '-created_at', '-id'], name='scenario_user_fy_recent'),
+            models.Index(fields=['input_hash'], name='scenario_input_hash'),
+        ]
@@ -0,0 +1,13 @@
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+import codec
+
+
+class CodecJSONParser(JSONParser):
+    # JSONParser backed by codec (msgspec/orjson when installed)
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return codec.loads(stream.read())
+        except ValueError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
@@ -27,6 +27,7 @@ class TaxResultSerializer(serializers.Serializer):
     gross_salary = serializers.FloatField()
     taxable_income = serializers.FloatField()
     tax_amount = serializers.FloatField()
+    surcharge = serializers.FloatField()
     cess = serializers.FloatField()
     total_tax = serializers.FloatField()
     in_hand_monthly = serializers.FloatField()
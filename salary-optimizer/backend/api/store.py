@@ -0,0 +1,113 @@
+import numpy as np
+from django.db import transaction
+from django.db.models import Q
+
+from batch_engine import INPUT_FIELDS, compare_tax_regimes_grouped, iter_records
+from tax_cache import canonical_key, canonical_values
+from tax_rules import rules_digest
+
+from .models import ComparisonRecord, Scenario
+
+# Scenario/result persistence.
+#
+# Results are content-addressed: every input is reduced to its canonical key
+# (the same one tax_cache uses) and looked up in ComparisonRecord first, so
+# only inputs never seen before reach the engine - and those go through the
+# batch engine together, then into the table with one bulk insert. Records
+# are per FY; other profile fields (age band, metro) are part of the key.
+# Each record also carries the digest of the TAX_RULES it was computed
+# under, and only records of the current rules are looked up, so editing a
+# rule recomputes instead of serving results of the old one.
+
+# Keys per IN (...) lookup, under SQLite's bound-parameter limit
+LOOKUP_BATCH = 500
+BULK_BATCH = 1000
+
+RULES_DIGEST = rules_digest()
+
+
+def _chunks(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _compute(inputs: list) -> list:
+    # Canonical (rupee-rounded) inputs through the batch engine, in order
+    values = np.array([canonical_values(i) for i in inputs], dtype=np.float64)
+    columns = {name: values[:, k] for k, name in enumerate(INPUT_FIELDS)}
+    return list(iter_records(compare_tax_regimes_grouped(columns, [i.profile for i in inputs])))
+
+
+def _fetch(keys) -> dict:
+    # (fy, input_hash) -> record, one IN (...) query per FY and batch
+    by_fy = {}
+    for fy, input_hash in keys:
+        by_fy.setdefault(fy, []).append(input_hash)
+    records = {}
+    for fy, hashes in by_fy.items():
+        for batch in _chunks(hashes, LOOKUP_BATCH):
+            for record in ComparisonRecord.objects.filter(fy=fy, rules_digest=RULES_DIGEST, input_hash__in=batch):
+                records[(fy, record.input_hash)] = record
+    return records
+
+
+def comparisons_for(inputs: list) -> list:
+    """ComparisonRecord per TaxInputs (in order, under its own FY), computing and storing only unseen inputs."""
+    keys = [(i.profile.fy, canonical_key(i)) for i in inputs]
+    first = {}
+    for key, item in zip(keys, inputs):
+        first.setdefault(key, item)
+
+    records = _fetch(first)
+    missing = [key for key in first if key not in records]
+    if missing:
+        results = _compute([first[key] for key in missing])
+        ComparisonRecord.objects.bulk_create(
+            [ComparisonRecord(fy=fy, input_hash=input_hash, rules_digest=RULES_DIGEST, result=result)
+             for (fy, input_hash), result in zip(missing, results)],
+            batch_size=BULK_BATCH,
+            ignore_conflicts=True,  # Another worker may have stored the same input meanwhile
+        )
+        records.update(_fetch(missing))
+    return [records[key] for key in keys]
+
+
+def lookup(input_hash: str, fy: str):
+    return ComparisonRecord.objects.filter(fy=fy, rules_digest=RULES_DIGEST, input_hash=input_hash).first()
+
+
+def save_scenarios(user: str, items: list) -> list:
+    """Store (name, request data, TaxInputs) items for user in bulk; returns the Scenarios."""
+    with transaction.atomic():
+        records = comparisons_for([inputs for _, _, inputs in items])
+        scenarios = [
+            Scenario(user=user, fy=record.fy, name=name, input_hash=record.input_hash, request=data,
+                     comparison=record)
+            for (name, data, _), record in zip(items, records)
+        ]
+        return Scenario.objects.bulk_create(scenarios, batch_size=BULK_BATCH)
+
+
+def history(user: str, fy: str, limit: int = 50, before: int = None) -> list:
+    """A user's scenarios for an FY, newest first; pass the last id seen as before to page."""
+    scenarios = Scenario.objects.filter(user=user, fy=fy)
+    if before is not None:
+        anchor = Scenario.objects.filter(pk=before, user=user).values('created_at').first()
+        if anchor is not None:
+            scenarios = scenarios.filter(
+                Q(created_at__lt=anchor['created_at']) | Q(created_at=anchor['created_at'], id__lt=before)
+            )
+    return list(scenarios.select_related('comparison').order_by('-created_at', '-id')[:limit])
+
+
+def scenario_dict(scenario: Scenario) -> dict:
+    return {
+        'id': scenario.id,
+        'user': scenario.user,
+        'fy': scenario.fy,
+        'name': scenario.name,
+        'input_hash': scenario.input_hash,
+        'created_at': scenario.created_at.isoformat(),
+        'request': scenario.request,
+        'result': scenario.comparison.result,
+    }
@@ -1,7 +1,19 @@
-from django.test import TestCase
+import numpy as np
+from django.test import SimpleTestCase, TestCase
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
+import json
+import os
+
+from batch_stream import BatchStream, stream_batch
+from batch_engine import INVESTMENT_FIELDS, SALARY_FIELDS, compare_tax_regimes_batch
+from models import Investments, OptimizeRequest, SalaryInputs, TaxRequest
+from optimizer import _columns, optimize_salary_structure
+from tax_engine import compare_tax_regimes
+from tax_rules import compile_slabs, get_rules
+from tax_cache import TaxCache, canonical_key
+from tax_core import EARNING_FIELDS, InvalidInput, TaxInputs, decode_request
 
 class TaxCalculationTests(TestCase):
     def setUp(self):
@@ -35,3 +47,1781 @@ class TaxCalculationTests(TestCase):
         self.assertIn('new_regime', response.data)
         self.assertEqual(response.data['old_regime']['regime'], 'Old')
         self.assertEqual(response.data['new_regime']['regime'], 'New')
+
+
+class BatchEngineTests(SimpleTestCase):
+    def setUp(self):
+        rng = np.random.default_rng(42)
+        n = 500
+        self.columns = {
+            "basic": rng.uniform(100000, 4000000, n).round(),
+            "hra": rng.uniform(0, 1500000, n).round(),
+            "special_allowance": rng.uniform(0, 2000000, n).round(),
+            "lta": rng.uniform(0, 100000, n).round(),
+            "variable_pay": rng.uniform(0, 1000000, n).round(),
+            "other_allowances": rng.uniform(0, 200000, n).round(),
+            "pf_deduction": rng.uniform(0, 200000, n).round(),
+            "professional_tax": np.full(n, 2400.0),
+            "section_80c": rng.uniform(0, 200000, n).round(),
+            "section_80d": rng.uniform(0, 100000, n).round(),
+            "hra_rent_paid": rng.uniform(0, 1200000, n).round(),
+            "nps_self": rng.uniform(0, 80000, n).round(),
+            "nps_employer": rng.uniform(0, 300000, n).round(),
+            "home_loan_interest": rng.uniform(0, 300000, n).round(),
+        }
+
+    def test_matches_scalar_engine(self):
+        batch = compare_tax_regimes_batch(self.columns)
+
+        for i in range(len(self.columns["basic"])):
+            row = {name: float(values[i]) for name, values in self.columns.items()}
+            scalar = compare_tax_regimes(TaxRequest(
+                salary=SalaryInputs(**{k: row[k] for k in SALARY_FIELDS}),
+                investments=Investments(**{k: row[k] for k in INVESTMENT_FIELDS}),
+            ))
+            for regime in ("old_regime", "new_regime"):
+                expected = getattr(scalar, regime)
+                got = batch[regime]
+                for field in ("gross_salary", "taxable_income", "tax_amount", "cess", "total_tax", "in_hand_monthly"):
+                    self.assertEqual(got[field][i], getattr(expected, field), (regime, field, i))
+                for label, amount in expected.deductions_breakdown.items():
+                    self.assertEqual(got["deductions_breakdown"][label][i], amount, (regime, label, i))
+
+    def test_accepts_structured_array(self):
+        dtype = [(name, "f8") for name in self.columns]
+        records = np.zeros(len(self.columns["basic"]), dtype=dtype)
+        for name, values in self.columns.items():
+            records[name] = values
+
+        from_records = compare_tax_regimes_batch(records)
+        from_dict = compare_tax_regimes_batch(self.columns)
+        np.testing.assert_array_equal(from_records["new_regime"]["total_tax"], from_dict["new_regime"]["total_tax"])
+
+    def test_missing_columns_default_to_zero(self):
+        result = compare_tax_regimes_batch({"basic": np.array([1300000.0])})
+        self.assertEqual(result["new_regime"]["taxable_income"][0], 1225000.0)
+        self.assertEqual(result["old_regime"]["deductions_breakdown"]["HRA Exemption"][0], 0.0)
+
+
+PAYLOAD = {
+    "salary": {
+        "basic": 500000,
+        "hra": 200000,
+        "special_allowance": 100000,
+        "lta": 50000,
+        "variable_pay": 100000,
+        "other_allowances": 50000,
+        "pf_deduction": 21600,
+        "professional_tax": 2400
+    },
+    "investments": {
+        "section_80c": 150000,
+        "section_80d": 25000,
+        "hra_rent_paid": 180000,
+        "nps_self": 50000,
+        "nps_employer": 0,
+        "home_loan_interest": 0
+    }
+}
+
+
+def _lines(chunks):
+    return [json.loads(line) for line in b"".join(chunks).splitlines()]
+
+
+class BatchStreamTests(SimpleTestCase):
+    def setUp(self):
+        self.expected = compare_tax_regimes(TaxRequest.model_validate(PAYLOAD)).model_dump()
+
+    def test_json_array_split_across_chunks(self):
+        body = json.dumps([PAYLOAD, {"salary": {}}, PAYLOAD]).encode()
+        chunks = [body[i:i + 7] for i in range(0, len(body), 7)]
+
+        lines = _lines(stream_batch(chunks, chunk_size=2))
+
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(lines[0], self.expected)
+        self.assertEqual(lines[1]["index"], 1)
+        self.assertIn("salary.basic", lines[1]["error"])
+        self.assertEqual(lines[2], self.expected)
+
+    def test_ndjson_with_invalid_line(self):
+        body = (json.dumps(PAYLOAD) + "\nnot json\n\n" + json.dumps(PAYLOAD)).encode()
+
+        lines = _lines(stream_batch([body]))
+
+        self.assertEqual([line.get("index") for line in lines], [None, 1, None])
+        self.assertEqual(lines[2], self.expected)
+
+    def test_results_stream_per_chunk(self):
+        stream = BatchStream(chunk_size=2)
+        emitted = list(stream.feed(("[" + ",".join([json.dumps(PAYLOAD)] * 3)).encode()))
+        self.assertEqual(len(emitted), 2)
+        self.assertEqual(len(list(stream.feed(b"]"))) + len(list(stream.finish())), 1)
+
+    def test_malformed_array_reports_error(self):
+        lines = _lines(stream_batch([b"[" + json.dumps(PAYLOAD).encode() + b" x"]))
+        self.assertEqual(lines[0], self.expected)
+        self.assertEqual(lines[1]["index"], 1)
+
+    def test_empty_array(self):
+        self.assertEqual(list(stream_batch([b" [ ] "])), [])
+
+
+class BatchCalculateTaxViewTests(TestCase):
+    def test_streams_ndjson(self):
+        body = "\n".join(json.dumps(PAYLOAD) for _ in range(3))
+        response = self.client.post(reverse("calculate_tax_batch"), body, content_type="application/x-ndjson")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        lines = _lines(response.streaming_content)
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(lines[0]["new_regime"]["regime"], "New")
+
+    def test_fastapi_endpoint(self):
+        from fastapi.testclient import TestClient
+        from main import app
+
+        client = TestClient(app)
+        response = client.post("/api/calculate/batch", content=json.dumps([PAYLOAD, PAYLOAD]))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.headers["content-type"], "application/x-ndjson")
+        self.assertEqual(len(response.text.splitlines()), 2)
+
+
+class TaxRulesTests(SimpleTestCase):
+    def _ladder(self, income, slabs):
+        # Reference: walk every slab like the original if-chains did
+        tax = 0.0
+        bounds = [lower for lower, _ in slabs[1:]] + [float("inf")]
+        for (lower, rate), upper in zip(slabs, bounds):
+            if income > lower:
+                tax += (min(income, upper) - lower) * rate
+        return tax
+
+    def test_compiled_slabs_match_slab_walk(self):
+        for regime, slabs in (
+            ("new", [(0, 0), (400000, 0.05), (800000, 0.10), (1200000, 0.15), (1600000, 0.20), (2000000, 0.25), (2400000, 0.30)]),
+            ("old", [(0, 0), (250000, 0.05), (500000, 0.20), (1000000, 0.30)]),
+        ):
+            schedule = get_rules(regime).slabs
+            for income in (0, 1, 250000, 399999.5, 400000, 812345, 1000000, 2400000, 7654321):
+                self.assertAlmostEqual(schedule.tax(income), self._ladder(income, slabs), places=6)
+
+    def test_rebate_and_marginal_relief(self):
+        new = get_rules("new")
+        self.assertEqual(new.income_tax(1200000), 0.0)
+        self.assertEqual(new.income_tax(1210000), 10000)
+        self.assertEqual(new.income_tax(1600000), 120000)
+        self.assertEqual(get_rules("old").income_tax(500000), 0.0)
+        self.assertEqual(get_rules("old").income_tax(500001), 12500.2)
+
+    def test_unsorted_slabs_are_compiled_in_order(self):
+        schedule = compile_slabs([(500000, 0.2), (0, 0.0), (250000, 0.05)])
+        self.assertEqual(schedule.breakpoints, (0.0, 250000.0, 500000.0))
+        self.assertEqual(schedule.cumulative, (0.0, 0.0, 12500.0))
+
+    def test_unknown_year(self):
+        with self.assertRaises(ValueError):
+            get_rules("new", fy="1999-00")
+
+    def test_earlier_years(self):
+        new = get_rules("new", fy="2024-25")
+        self.assertEqual(new.standard_deduction, 75000)
+        self.assertEqual(new.income_tax(700000), 0.0)
+        self.assertEqual(new.income_tax(710000), 10000)  # Marginal relief
+        self.assertEqual(new.income_tax(1000000), 50000)
+        self.assertEqual(get_rules("new", fy="2023-24").income_tax(1000000), 60000)
+        self.assertEqual(get_rules("new", fy="2023-24").standard_deduction, 50000)
+
+    def test_age_bands_and_metro(self):
+        taxes = [get_rules("old", age_band=band).income_tax(600000) for band in ("general", "senior", "super_senior")]
+        self.assertEqual(taxes, [32500, 30000, 20000])
+        # The new regime has one schedule for every age
+        self.assertEqual(get_rules("new", age_band="super_senior").slabs, get_rules("new").slabs)
+        self.assertEqual(get_rules("old").caps["hra_basic_pct"], 0.5)
+        self.assertEqual(get_rules("old", metro=False).caps["hra_basic_pct"], 0.4)
+        self.assertNotIn("hra_basic_pct_non_metro", get_rules("old", metro=False).caps)
+        with self.assertRaises(ValueError):
+            get_rules("old", age_band="child")
+
+
+class OptimizerTests(SimpleTestCase):
+    def _grid_best(self, request, step=5000):
+        # Brute-force reference over whole-rupee (basic, nps_employer) grid
+        c = request.constraints
+        pool = request.ctc - request.variable_pay - request.other_allowances
+        best = -np.inf
+        for basic in np.arange(np.ceil(c.min_basic_pct * request.ctc), pool + 1, step):
+            nps = np.arange(0, min(c.max_nps_employer_pct * basic, pool - basic) + 1, step)
+            result = compare_tax_regimes_batch(_columns(request, np.full(len(nps), basic), nps))
+            best = max(best, np.maximum(
+                result["old_regime"]["in_hand_monthly"], result["new_regime"]["in_hand_monthly"]
+            ).max())
+        return best
+
+    def test_beats_grid_search(self):
+        for fields in (
+            {"ctc": 1500000},
+            {"ctc": 1400000, "hra_rent_paid": 300000, "home_loan_interest": 200000, "section_80d": 50000, "nps_self": 50000},
+            {"ctc": 1350000, "variable_pay": 100000, "hra_rent_paid": 240000},
+        ):
+            request = OptimizeRequest(**fields)
+            response = optimize_salary_structure(request)
+            best = max(response.comparison.old_regime.in_hand_monthly, response.comparison.new_regime.in_hand_monthly)
+            self.assertGreaterEqual(best, self._grid_best(request) - 0.01, fields)
+
+    def test_no_runtime_warnings(self):
+        import warnings
+
+        # Flat segments along a constraint line must not divide by zero
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", RuntimeWarning)
+            optimize_salary_structure(OptimizeRequest(ctc=1500000, hra_rent_paid=120000, home_loan_interest=200000))
+
+    def test_structure_respects_constraints(self):
+        request = OptimizeRequest(ctc=2000000, hra_rent_paid=400000)
+        response = optimize_salary_structure(request)
+        salary = response.structure.salary
+        investments = response.structure.investments
+        c = request.constraints
+
+        total = (salary.basic + salary.hra + salary.special_allowance + salary.lta
+                 + salary.variable_pay + salary.other_allowances + investments.nps_employer)
+        self.assertAlmostEqual(total, request.ctc)
+        self.assertGreaterEqual(salary.basic, c.min_basic_pct * request.ctc)
+        self.assertLessEqual(salary.hra, c.max_hra_pct * salary.basic)
+        self.assertLessEqual(salary.lta, c.lta_cap)
+        self.assertLessEqual(investments.nps_employer, c.max_nps_employer_pct * salary.basic)
+        self.assertGreaterEqual(salary.special_allowance, 0)
+
+    def test_rejects_infeasible_ctc(self):
+        with self.assertRaises(ValueError):
+            optimize_salary_structure(OptimizeRequest(ctc=100000, variable_pay=200000))
+
+    def test_endpoint(self):
+        from fastapi.testclient import TestClient
+        from main import app
+
+        response = TestClient(app).post("/api/optimize", json={"ctc": 1800000, "hra_rent_paid": 360000})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(response.json()["recommended_regime"], ("Old", "New"))
+
+    def test_non_finite_values_are_rejected(self):
+        from fastapi.testclient import TestClient
+        from main import app
+
+        client = TestClient(app)
+        for value in ("nan", "inf", "-Infinity"):
+            response = client.post("/api/optimize", json={"ctc": value})
+            self.assertEqual(response.status_code, 422)
+            self.assertEqual(response.json()["detail"][0]["loc"], ["body", "ctc"])
+            response = client.post("/api/optimize", json={"ctc": 1800000, "constraints": {"lta_cap": value}})
+            self.assertEqual(response.status_code, 422)
+            self.assertEqual(response.json()["detail"][0]["loc"], ["body", "constraints", "lta_cap"])
+
+
+class TaxCacheTests(SimpleTestCase):
+    def test_lru_eviction_and_ttl(self):
+        now = [0.0]
+        cache = TaxCache(maxsize=2, ttl=10, clock=lambda: now[0])
+        cache.set("a", 1)
+        cache.set("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+        cache.set("c", 3)  # evicts "b", the least recently used
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+        now[0] = 11
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats(), {"hits": 2, "misses": 2, "coalesced": 0, "size": 1, "hit_ratio": 0.5})
+
+    def test_concurrent_misses_share_one_computation(self):
+        import threading
+
+        cache = TaxCache()
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return "result"
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(cache.get_or_set("k", compute)))
+        leader.start()
+        started.wait(5)
+        followers = [threading.Thread(target=lambda: results.append(cache.get_or_set("k", compute)))
+                     for _ in range(3)]
+        for thread in followers:
+            thread.start()
+        while cache.stats()["coalesced"] < 3:
+            threading.Event().wait(0.001)
+        release.set()
+        for thread in [leader] + followers:
+            thread.join(5)
+
+        self.assertEqual(results, ["result"] * 4)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cache.get_or_set("k", compute), "result")
+
+        # A failure reaches every waiter and nothing is cached
+        def fail():
+            raise ValueError("boom")
+
+        with self.assertRaises(ValueError):
+            cache.get_or_set("bad", fail)
+        self.assertEqual(cache.get_or_set("bad", lambda: "ok"), "ok")
+
+    def test_key_rounds_to_the_rupee(self):
+        base = decode_request(PAYLOAD)
+        nudged = decode_request(PAYLOAD)
+        nudged.basic += 0.3
+        self.assertEqual(canonical_key(base), canonical_key(nudged))
+        nudged.section_80c += 1
+        self.assertNotEqual(canonical_key(base), canonical_key(nudged))
+
+    def test_repeated_requests_hit_the_cache(self):
+        from fastapi.testclient import TestClient
+        from main import app, result_cache
+
+        client = TestClient(app)
+        result_cache.clear()
+        first = client.post("/api/calculate", json=PAYLOAD)
+        second = client.post("/api/calculate", json=PAYLOAD)
+
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(first.json(), self.expected_response())
+        self.assertEqual((result_cache.hits, result_cache.misses), (1, 1))
+
+    def test_django_view_hits_shared_cache(self):
+        from api.views import CalculateTaxView
+
+        CalculateTaxView.result_cache.clear()
+        client = APIClient()
+        first = client.post(reverse("calculate_tax"), PAYLOAD, format="json")
+        second = client.post(reverse("calculate_tax"), PAYLOAD, format="json")
+
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(second.data["new_regime"]["regime"], "New")
+        self.assertEqual(CalculateTaxView.result_cache.hits, 1)
+
+    def expected_response(self):
+        return compare_tax_regimes(TaxRequest.model_validate(PAYLOAD)).model_dump()
+
+
+class TaxCoreTests(SimpleTestCase):
+    def test_decode_reports_nested_errors(self):
+        body = json.loads(json.dumps(PAYLOAD))
+        del body["salary"]["basic"]
+        body["investments"]["nps_self"] = "lots"
+
+        with self.assertRaises(InvalidInput) as ctx:
+            decode_request(body)
+        self.assertEqual(ctx.exception.errors, {
+            "salary": {"basic": ["This field is required."]},
+            "investments": {"nps_self": ["A valid number is required."]},
+        })
+
+    def test_result_struct_is_reused(self):
+        import tax_core
+
+        out = tax_core.ComparisonResult()
+        old_regime = out.old_regime
+        result = tax_core.compare(decode_request(PAYLOAD), out)
+
+        self.assertIs(result, out)
+        self.assertIs(result.old_regime, old_regime)
+        self.assertEqual(result.as_dict(), compare_tax_regimes(TaxRequest.model_validate(PAYLOAD)).model_dump())
+
+    def test_adapters_encode_identically(self):
+        import importlib.util
+        import os
+
+        spec = importlib.util.spec_from_file_location(
+            "vercel_calculate", os.path.join(os.path.dirname(__file__), "calculate.py"))
+        vercel = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(vercel)
+
+        expected = compare_tax_regimes(TaxRequest.model_validate(PAYLOAD)).model_dump_json()
+        self.assertEqual(json.dumps(vercel.compare_tax_regimes(PAYLOAD["salary"], PAYLOAD["investments"]),
+                                    separators=(",", ":")), expected)
+        self.assertEqual(TaxInputs.from_mapping({}, {}).basic, 0.0)
+
+    def test_django_view_rejects_bad_input(self):
+        response = APIClient().post(reverse("calculate_tax"), {"salary": {}}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["investments"], ["This field is required."])
+
+    def test_non_finite_values_are_rejected(self):
+        from fastapi.testclient import TestClient
+        import main
+        import serverless
+
+        for value in ("nan", "inf", "-Infinity"):
+            bad = json.loads(json.dumps(PAYLOAD))
+            bad["salary"]["basic"] = value
+            with self.assertRaises(InvalidInput):
+                decode_request(bad)
+            response = TestClient(main.app).post("/api/calculate", json=bad)
+            self.assertEqual(response.status_code, 422)
+            self.assertEqual(response.json()["detail"][0]["loc"], ["body", "salary", "basic"])
+            self.assertEqual(TestClient(serverless.app).post("/api/calculate", json=bad).status_code, 422)
+            response = APIClient().post(reverse("calculate_tax"), bad, format="json")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(response.data["salary"]["basic"], ["A valid number is required."])
+
+
+class CodecTests(SimpleTestCase):
+    def test_backends_encode_identically(self):
+        import codec
+        import tax_core
+
+        result = tax_core.compare(decode_request(PAYLOAD)).as_dict()
+        stdlib = json.dumps(result, separators=(",", ":")).encode()
+        for name in ("msgspec", "orjson", "json"):
+            backend, loads, dumps = codec._load_backend(name)
+            self.assertEqual(dumps(result), stdlib, backend)
+            self.assertEqual(loads(stdlib), result)
+        self.assertEqual(tax_core.compare(decode_request(PAYLOAD)).to_json(), stdlib)
+
+    def test_non_finite_floats_encode_as_null(self):
+        import codec
+
+        value = {"a": [float("nan"), float("inf"), 1.5], "b": (float("-inf"),), "c": "x"}
+        for name in ("msgspec", "orjson", "json"):
+            backend, loads, dumps = codec._load_backend(name)
+            self.assertEqual(dumps(value), b'{"a":[null,null,1.5],"b":[null],"c":"x"}', backend)
+
+    def test_unknown_backend(self):
+        import codec
+
+        with self.assertRaises(ValueError):
+            codec._load_backend("yaml")
+
+    def test_fastapi_fast_path_keeps_validation_errors(self):
+        from fastapi.testclient import TestClient
+        import main
+
+        client = TestClient(main.app)
+        response = client.post("/api/calculate", json=PAYLOAD)
+        self.assertEqual(response.json(), compare_tax_regimes(TaxRequest.model_validate(PAYLOAD)).model_dump())
+
+        bad = json.loads(json.dumps(PAYLOAD))
+        del bad["salary"]["basic"]
+        response = client.post("/api/calculate", json=bad)
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(response.json()["detail"][0]["loc"], ["body", "salary", "basic"])
+
+        response = client.post("/api/calculate", content=b"{", headers={"Content-Type": "application/json"})
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(response.json()["detail"][0]["type"], "json_invalid")
+
+    def test_django_parser_rejects_malformed_json(self):
+        response = APIClient().post(reverse("calculate_tax"), b"{", content_type="application/json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class AnalyticsTests(SimpleTestCase):
+    def _request(self, rng):
+        payload = json.loads(json.dumps(PAYLOAD))
+        payload["salary"]["special_allowance"] = float(rng.integers(0, 2500000))
+        for field in ("section_80c", "section_80d", "nps_self", "home_loan_interest"):
+            payload["investments"][field] = float(rng.integers(0, 100000))
+        return TaxRequest.model_validate(payload)
+
+    def test_income_for_tax_inverts_income_tax(self):
+        for regime in ("old", "new"):
+            rules = get_rules(regime)
+            for tax in (0, 1, 12500, 60000, 112500, 400000, 1e6):
+                income = rules.income_for_tax(tax)
+                self.assertLessEqual(rules.income_tax(income), tax + 1e-6)
+                self.assertGreater(rules.income_tax(income + 0.01), tax)
+
+    def test_marginal_rate_matches_finite_difference(self):
+        from analytics import analyse
+
+        rng = np.random.default_rng(3)
+        for _ in range(50):
+            result = analyse(self._request(rng))
+            for regime in ("old", "new"):
+                rules = get_rules(regime)
+                analytics = getattr(result, f"{regime}_regime")
+                ti = analytics.taxable_income
+                if analytics.next_boundary is not None and analytics.distance_to_next_boundary < 2:
+                    continue
+                slope = (rules.income_tax(ti + 1) - rules.income_tax(ti)) * (1 + rules.cess_rate)
+                if ti != rules.rebate_limit:
+                    self.assertAlmostEqual(analytics.marginal_rate, slope, places=6)
+
+    def test_breakevens_tie_the_regimes(self):
+        from analytics import analyse
+
+        rng = np.random.default_rng(11)
+        checked = 0
+        for _ in range(200):
+            request = self._request(rng)
+            result = analyse(request)
+            for point in result.breakevens:
+                if point.breakeven is None:
+                    continue
+                moved = request.model_copy(deep=True)
+                setattr(moved.investments, point.deduction, point.breakeven)
+                at = compare_tax_regimes(moved)
+                self.assertLessEqual(at.old_regime.total_tax, at.new_regime.total_tax + 1e-6)
+
+                setattr(moved.investments, point.deduction, point.breakeven - 1)
+                below = compare_tax_regimes(moved)
+                if point.breakeven >= 1:
+                    self.assertGreater(below.old_regime.total_tax, below.new_regime.total_tax)
+                checked += 1
+        self.assertGreater(checked, 20)
+
+    def test_new_regime_rebate_cliff_and_relief_band(self):
+        from analytics import analyse
+
+        payload = json.loads(json.dumps(PAYLOAD))
+        payload["salary"]["special_allowance"] = 405000  # New-regime taxable income 12.3L
+        result = analyse(TaxRequest.model_validate(payload)).new_regime
+        self.assertEqual(result.band, "marginal_relief")
+        self.assertEqual(result.reduction_to_rebate, 30000)
+        self.assertAlmostEqual(result.total_tax, 30000 * 1.04)
+        self.assertAlmostEqual(result.marginal_rate, 1.04)
+        self.assertAlmostEqual(result.next_boundary, 1270588.2352941176)
+        self.assertEqual(result.rebate_cliff, 0)
+
+    def test_endpoint(self):
+        from fastapi.testclient import TestClient
+        import main
+
+        response = TestClient(main.app).post("/api/analytics", json=PAYLOAD)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["breakevens"]), 4)
+
+
+class SweepTests(SimpleTestCase):
+    def _request(self, axes):
+        from models import SweepRequest
+
+        return SweepRequest.model_validate({"base": PAYLOAD, "axes": axes})
+
+    def test_grid_matches_scalar_engine(self):
+        from sweep import sweep
+
+        result = sweep(self._request([
+            {"field": "basic", "start": 300000, "stop": 900000, "step": 150000},
+            {"field": "section_80c", "start": 0, "stop": 150000, "step": 50000},
+        ]))
+        self.assertEqual(result["axes"][0]["values"], [300000, 450000, 600000, 750000, 900000])
+        self.assertEqual(len(result["new_regime"]["total_tax"]), 5)
+        self.assertEqual(len(result["new_regime"]["total_tax"][0]), 4)
+
+        payload = json.loads(json.dumps(PAYLOAD))
+        payload["salary"]["basic"] = 750000
+        payload["investments"]["section_80c"] = 50000
+        expected = compare_tax_regimes(TaxRequest.model_validate(payload))
+        self.assertEqual(result["old_regime"]["in_hand_monthly"][3][1], expected.old_regime.in_hand_monthly)
+        self.assertEqual(result["new_regime"]["total_tax"][3][1], expected.new_regime.total_tax)
+
+    def test_gross_salary_keeps_structure(self):
+        from sweep import sweep
+
+        result = sweep(self._request([{"field": "gross_salary", "start": 500000, "stop": 2000000, "step": 1500000}]))
+        payload = json.loads(json.dumps(PAYLOAD))
+        for name in ("basic", "hra", "special_allowance", "lta", "variable_pay", "other_allowances"):
+            payload["salary"][name] *= 2
+        expected = compare_tax_regimes(TaxRequest.model_validate(payload))
+        self.assertAlmostEqual(result["old_regime"]["total_tax"][1], expected.old_regime.total_tax)
+
+    def test_rejects_bad_axes(self):
+        from sweep import sweep
+
+        for axes in (
+            [],
+            [{"field": "regime", "start": 0, "stop": 1, "step": 1}],
+            [{"field": "basic", "start": 0, "stop": 1, "step": 0}],
+            [{"field": "basic", "start": 0, "stop": 1, "step": 1}] * 2,
+            [{"field": "basic", "start": 0, "stop": 1e6, "step": 1}],
+        ):
+            with self.assertRaises(ValueError):
+                sweep(self._request(axes))
+
+    def test_endpoint(self):
+        from fastapi.testclient import TestClient
+        import main
+
+        client = TestClient(main.app)
+        axes = [{"field": "hra_rent_paid", "start": 0, "stop": 300000, "step": 100000}]
+        response = client.post("/api/sweep", json={"base": PAYLOAD, "axes": axes})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["new_regime"]["in_hand_monthly"]), 4)
+
+        axes[0]["field"] = "ctc"
+        self.assertEqual(client.post("/api/sweep", json={"base": PAYLOAD, "axes": axes}).status_code, 400)
+
+    def test_non_finite_axes_are_rejected(self):
+        from fastapi.testclient import TestClient
+        import main
+
+        client = TestClient(main.app)
+        for key, value in (("stop", "inf"), ("step", "nan"), ("start", "-Infinity")):
+            axis = {"field": "basic", "start": 0, "stop": 300000, "step": 100000, key: value}
+            response = client.post("/api/sweep", json={"base": PAYLOAD, "axes": [axis]})
+            self.assertEqual(response.status_code, 422)
+            self.assertEqual(response.json()["detail"][0]["loc"], ["body", "axes", 0, key])
+
+
+class JobPoolTests(SimpleTestCase):
+    def test_backpressure_and_timeout(self):
+        import asyncio
+        import time
+        from job_pool import JobPool, JobPoolSaturated, JobTimeout
+
+        pool = JobPool(max_workers=1, max_pending=1, timeout=0.2)
+        self.addCleanup(pool.shutdown)
+
+        async def scenario():
+            self.assertEqual(await pool.run(abs, -3, timeout=30), 3)
+            with self.assertRaises(JobTimeout):
+                await pool.run(time.sleep, 1)
+            # The timed-out job still occupies the worker, so its slot is held
+            self.assertEqual(pool.pending, 1)
+            with self.assertRaises(JobPoolSaturated):
+                await pool.run(abs, -1)
+            while pool.pending:
+                await asyncio.sleep(0.05)
+            self.assertEqual(await pool.run(abs, -2), 2)
+
+        asyncio.run(scenario())
+        self.assertEqual(pool.stats()["rejected"], 1)
+        self.assertEqual(pool.stats()["timed_out"], 1)
+
+    def test_map_is_admitted_whole_and_cancels_on_failure(self):
+        import asyncio
+        import time
+        from job_pool import JobPool, JobPoolSaturated
+
+        pool = JobPool(max_workers=1, max_pending=9)
+        self.addCleanup(pool.shutdown)
+
+        async def scenario():
+            self.assertEqual(await pool.map(abs, [(-1,), (-2,), (-3,)]), [1, 2, 3])
+            with self.assertRaises(JobPoolSaturated):
+                await pool.map(abs, [(-1,)] * 10)
+            self.assertEqual(pool.pending, 0)
+            # The failing job runs first on the single worker; of the sleeps
+            # behind it only the ones already handed to the worker still run
+            started = time.monotonic()
+            with self.assertRaises(TypeError):
+                await pool.map(time.sleep, [("x",)] + [(0.5,)] * 8)
+            while pool.pending:
+                await asyncio.sleep(0.01)
+            self.assertLess(time.monotonic() - started, 2.5)
+
+        asyncio.run(scenario())
+        self.assertEqual(pool.stats()["rejected"], 1)
+
+    def test_endpoints_return_429_when_saturated(self):
+        from unittest import mock
+        from fastapi.testclient import TestClient
+        from job_pool import JobPool
+        import main
+
+        pool = JobPool(max_workers=1, max_pending=1)
+        pool.acquire()
+        client = TestClient(main.app)
+        with mock.patch.object(main, "jobs", pool):
+            response = client.post("/api/optimize", json={"ctc": 1500000})
+            self.assertEqual(response.status_code, 429)
+            self.assertEqual(response.headers["Retry-After"], "1")
+            self.assertEqual(client.post("/api/calculate/batch", content=b"[]").status_code, 429)
+            # Interactive calculations never queue behind jobs
+            self.assertEqual(client.post("/api/calculate", json=PAYLOAD).status_code, 200)
+
+    def test_streamed_chunks_run_in_workers(self):
+        from unittest import mock
+        from fastapi.testclient import TestClient
+        from batch_stream import encode_chunk
+        from job_pool import JobPool, JobTimeout
+        import main
+        import payroll_io
+
+        pool = JobPool(max_workers=1)
+        self.addCleanup(pool.shutdown)
+        body = "\n".join(json.dumps(PAYLOAD) for _ in range(3)).encode()
+        csv = ",".join(SALARY_FIELDS) + "\n" + ",".join(str(PAYLOAD["salary"][name]) for name in SALARY_FIELDS) + "\n"
+        client = TestClient(main.app)
+        with mock.patch.object(main, "jobs", pool), mock.patch.object(pool, "submit", wraps=pool.submit) as submit:
+            batch = client.post("/api/calculate/batch", content=body)
+            payroll = client.post("/api/payroll", content=csv.encode(), headers={"Content-Type": "text/csv"})
+        self.assertEqual([c.args[0] for c in submit.call_args_list], [encode_chunk, payroll_io.csv_chunk])
+        expected = compare_tax_regimes(TaxRequest.model_validate(PAYLOAD)).model_dump()
+        self.assertEqual([json.loads(line) for line in batch.text.splitlines()], [expected] * 3)
+        self.assertEqual(len(payroll.text.splitlines()), 2)
+        self.assertEqual(pool.pending, 0)
+
+        # A chunk that times out in the worker ends the stream with an error line
+        with mock.patch.object(main, "jobs", pool), mock.patch.object(pool, "call", side_effect=JobTimeout("slow")):
+            lines = client.post("/api/calculate/batch", content=body).text.splitlines()
+        self.assertEqual(json.loads(lines[-1])["error"], "slow")
+        self.assertEqual(pool.pending, 0)
+
+    def test_streaming_slot_released_without_body(self):
+        import asyncio
+        import main
+
+        # The client is gone before the first send, so the body is never iterated
+        async def send(message):
+            raise OSError("client disconnected")
+
+        async def receive():
+            return {"type": "http.disconnect"}
+
+        def body():
+            raise AssertionError("body iterated")
+            yield b""
+
+        for cls in (main.JobStreamingResponse, main.RequestStreamingResponse):
+            released = []
+            response = cls(body(), lambda: released.append(1))
+            with self.assertRaises(OSError):
+                asyncio.run(response({"type": "http", "method": "POST"}, receive, send))
+            self.assertEqual(released, [1])
+
+
+class ScenarioStoreTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse("scenarios")
+
+    def _payload(self, basic):
+        payload = json.loads(json.dumps(PAYLOAD))
+        payload["salary"]["basic"] = basic
+        return payload
+
+    def test_save_and_list_history(self):
+        from api.models import ComparisonRecord
+
+        for basic in (500000, 600000, 500000):
+            response = self.client.post(self.url, {"user": "u1", "name": f"basic {basic}", **self._payload(basic)},
+                                        format="json")
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.client.post(self.url, {"user": "u2", **self._payload(700000)}, format="json")
+
+        # The repeated input reuses the stored result
+        self.assertEqual(ComparisonRecord.objects.count(), 3)
+        expected = compare_tax_regimes(TaxRequest.model_validate(self._payload(600000))).model_dump()
+
+        response = self.client.get(self.url, {"user": "u1", "limit": 2})
+        results = response.data["results"]
+        self.assertEqual([r["name"] for r in results], ["basic 500000", "basic 600000"])
+        self.assertEqual(results[1]["result"], expected)
+
+        page = self.client.get(self.url, {"user": "u1", "before": response.data["next"]}).data
+        self.assertEqual([r["name"] for r in page["results"]], ["basic 500000"])
+        self.assertIsNone(page["next"])
+
+        stored = self.client.get(reverse("stored_result", args=[results[1]["input_hash"]]))
+        self.assertEqual(stored.data, expected)
+        self.assertEqual(self.client.get(reverse("stored_result", args=["0" * 32])).status_code, 404)
+
+        for limit in (0, -1):
+            response = self.client.get(self.url, {"user": "u1", "limit": limit})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_insert_computes_each_input_once(self):
+        from api.models import ComparisonRecord, Scenario
+
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        scenarios = [self._payload(400000 + (i % 50) * 10000) for i in range(600)]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, {"user": "batch", "scenarios": scenarios}, format="json")
+        # Batched statements only (SQLite caps the rows per INSERT), never one per scenario
+        self.assertLess(len(queries), 20)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data), 600)
+        self.assertEqual(ComparisonRecord.objects.count(), 50)
+        self.assertEqual(Scenario.objects.filter(user="batch").count(), 600)
+        self.assertEqual(response.data[51]["result"], response.data[1]["result"])
+
+    def test_results_of_other_rules_are_not_served(self):
+        from api.models import ComparisonRecord
+
+        self.client.post(self.url, {"user": "u1", **PAYLOAD}, format="json")
+        record = ComparisonRecord.objects.get()
+        # As if stored before a TAX_RULES edit
+        ComparisonRecord.objects.update(rules_digest="0" * 32, result={"stale": True})
+        self.assertEqual(self.client.get(reverse("stored_result", args=[record.input_hash])).status_code, 404)
+
+        response = self.client.post(self.url, {"user": "u1", **PAYLOAD}, format="json")
+        expected = compare_tax_regimes(TaxRequest.model_validate(PAYLOAD)).model_dump()
+        self.assertEqual(response.data["result"], expected)
+        self.assertEqual(ComparisonRecord.objects.count(), 2)
+        self.assertEqual(self.client.get(reverse("stored_result", args=[record.input_hash])).data, expected)
+
+    def test_rejects_invalid_items(self):
+        response = self.client.post(self.url, {"user": "u1", "scenarios": [PAYLOAD, {"salary": {}}]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(1, response.data)
+        response = self.client.post(self.url, {"user": "u1", "fy": "1999-00", **PAYLOAD}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_scenarios_per_year(self):
+        payload = self._payload(500000)
+        self.client.post(self.url, {"user": "u3", "fy": "2024-25", "scenarios": [payload, {**payload, "fy": "2023-24"}]},
+                         format="json")
+        self.client.post(self.url, {"user": "u3", "age_band": "senior", **payload}, format="json")
+        fys = {fy: [r["result"] for r in self.client.get(self.url, {"user": "u3", "fy": fy}).data["results"]]
+               for fy in ("2023-24", "2024-25", "2025-26")}
+        expected = compare_tax_regimes(TaxRequest.model_validate({**payload, "fy": "2024-25"})).model_dump()
+        self.assertEqual(fys["2024-25"], [expected])
+        self.assertEqual(len(fys["2023-24"]), 1)
+        self.assertEqual(fys["2025-26"][0],
+                         compare_tax_regimes(TaxRequest.model_validate({**payload, "age_band": "senior"})).model_dump())
+
+    def test_history_query_uses_index(self):
+        from django.db import connection
+        from api.models import Scenario
+
+        query = Scenario.objects.filter(user="u1", fy="2025-26").order_by("-created_at", "-id")[:50]
+        sql, params = query.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+            plan = " ".join(str(row) for row in cursor.fetchall())
+        self.assertIn("scenario_user_fy_recent", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+
+class ColdStartTests(SimpleTestCase):
+    def test_rules_artifact_is_current(self):
+        import tax_rules
+
+        # Rebuild with `python tax_rules.py` after editing TAX_RULES
+        self.assertEqual(tax_rules.load_artifact(), tax_rules.compile_all())
+
+    def test_frontend_rule_table_is_current(self):
+        import tax_rules
+
+        if not os.path.exists(tax_rules.TYPESCRIPT_PATH):
+            self.skipTest("frontend not checked out")
+        # The offline calculator's table, also rebuilt by `python tax_rules.py`
+        with open(tax_rules.TYPESCRIPT_PATH) as f:
+            self.assertEqual(f.read(), tax_rules.typescript_rules())
+
+    def test_stale_artifact_is_ignored(self):
+        import os
+        import tempfile
+        import tax_rules
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "rules.json")
+            tax_rules.build_artifact(path)
+            with open(path) as f:
+                artifact = json.load(f)
+            artifact["digest"] = "stale"
+            with open(path, "w") as f:
+                json.dump(artifact, f)
+            self.assertIsNone(tax_rules.load_artifact(path))
+            self.assertIsNone(tax_rules.load_artifact(os.path.join(tmp, "missing.json")))
+
+    def test_serverless_entry_matches_fastapi(self):
+        from fastapi.testclient import TestClient
+        import main
+        import serverless
+
+        fast = TestClient(serverless.ServerlessApp())
+        full = TestClient(main.app)
+        response = fast.post("/api/calculate", json=PAYLOAD, headers={"Origin": "https://example.com"})
+        self.assertEqual(response.content, full.post("/api/calculate", json=PAYLOAD).content)
+        self.assertEqual(response.headers["access-control-allow-origin"], "*")
+
+        bad = {"salary": PAYLOAD["salary"]}
+        self.assertEqual(fast.post("/api/calculate", json=bad).json(), full.post("/api/calculate", json=bad).json())
+        self.assertEqual(fast.get("/").json(), {"message": "Salary Optimizer API is running"})
+
+    def test_serverless_calculate_skips_fastapi(self):
+        import subprocess
+        import sys
+
+        script = (
+            "import asyncio, json, sys\n"
+            "import serverless\n"
+            "body = json.dumps(%r).encode()\n"
+            "messages = [{'type': 'http.request', 'body': body, 'more_body': False}]\n"
+            "sent = []\n"
+            "async def receive(): return messages.pop(0)\n"
+            "async def send(message): sent.append(message)\n"
+            "scope = {'type': 'http', 'method': 'POST', 'path': '/api/calculate', 'headers': []}\n"
+            "asyncio.run(serverless.app(scope, receive, send))\n"
+            "assert sent[0]['status'] == 200, sent\n"
+            "print(sorted(m for m in ('fastapi', 'pydantic', 'numpy', 'main') if m in sys.modules))\n"
+        ) % (PAYLOAD,)
+        backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        out = subprocess.run([sys.executable, "-c", script], cwd=backend, capture_output=True, text=True)
+        self.assertEqual(out.returncode, 0, out.stderr)
+        self.assertEqual(out.stdout.strip(), "[]")
+
+
+class PayrollIOTests(SimpleTestCase):
+    def _csv(self):
+        header = ["employee_id", *SALARY_FIELDS, *INVESTMENT_FIELDS]
+        rows = [",".join(header)]
+        for i, basic in enumerate((300000, 500000, 900000, 1500000, 2500000)):
+            values = {**PAYLOAD["salary"], **PAYLOAD["investments"], "basic": basic}
+            rows.append(",".join([f"E{i}"] + [str(values[name]) for name in header[1:]]))
+        rows.append(",".join(["E5", "abc"] + ["0"] * (len(header) - 2)))
+        return "\n".join(rows) + "\n"
+
+    def test_csv_chunks_match_scalar_engine(self):
+        import csv
+        import io
+        import payroll_io
+
+        stats = payroll_io.PayrollStats()
+        output = "".join(payroll_io.iter_csv(io.StringIO(self._csv()), chunk_size=2, stats=stats))
+        rows = list(csv.DictReader(io.StringIO(output)))
+        self.assertEqual((stats.rows, stats.errors), (6, 1))
+        self.assertEqual(rows[1]["employee_id"], "E1")
+
+        expected = compare_tax_regimes(TaxRequest.model_validate(PAYLOAD))
+        self.assertEqual(float(rows[1]["old_total_tax"]), expected.old_regime.total_tax)
+        self.assertEqual(float(rows[1]["new_in_hand_monthly"]), expected.new_regime.in_hand_monthly)
+        self.assertEqual(float(rows[1]["old_hra_exemption"]), expected.old_regime.deductions_breakdown["HRA Exemption"])
+        better = "Old" if expected.old_regime.in_hand_monthly > expected.new_regime.in_hand_monthly else "New"
+        self.assertEqual(rows[1]["recommended_regime"], better)
+
+        self.assertEqual(rows[5]["old_total_tax"], "")
+        self.assertIn("basic", rows[5]["error"])
+
+    def test_submitted_chunks_keep_their_order(self):
+        import io
+        from concurrent.futures import Future, ThreadPoolExecutor
+        import payroll_io
+
+        inline = "".join(payroll_io.iter_csv(io.StringIO(self._csv()), chunk_size=2))
+        stats = payroll_io.PayrollStats()
+        with ThreadPoolExecutor(3) as executor:
+            for ahead in (1, 2, 5):
+                pieces = payroll_io.iter_csv(io.StringIO(self._csv()), chunk_size=2, stats=stats,
+                                             submit=executor.submit, ahead=ahead)
+                self.assertEqual("".join(pieces), inline)
+        self.assertEqual((stats.rows, stats.errors), (18, 3))
+
+        # Closing the stream early cancels chunks still waiting for a worker
+        futures = []
+
+        def submit(fn, *args):
+            future = Future()
+            if not futures:
+                future.set_result(fn(*args))
+            futures.append(future)
+            return future
+
+        pieces = payroll_io.iter_csv(io.StringIO(self._csv()), chunk_size=1, submit=submit, ahead=3)
+        next(pieces)  # Header
+        next(pieces)
+        pieces.close()
+        self.assertEqual([future.cancelled() for future in futures], [False, True, True])
+
+    def test_non_finite_cells_are_errors(self):
+        import payroll_io
+
+        columns = {"basic": ["500000", "nan", "inf"], "hra": ["0", "0", "-Infinity"]}
+        for fixed in (False, True):
+            out = payroll_io.compute_chunk(columns, 3, fixed)
+            self.assertEqual(out["error"][0], "")
+            self.assertEqual(out["error"][1], "basic: invalid number 'nan'")
+            self.assertEqual(out["error"][2], "basic: invalid number 'inf'")
+            self.assertEqual(out["old_total_tax"][1:], ["", ""])
+            self.assertEqual(out["recommended_regime"][1:], ["", ""])
+
+    def test_management_command(self):
+        import csv
+        import io
+        import tempfile
+        from django.core.management import call_command
+
+        with tempfile.TemporaryDirectory() as tmp:
+            src, dst = os.path.join(tmp, "in.csv"), os.path.join(tmp, "out.csv")
+            with open(src, "w") as f:
+                f.write(self._csv())
+            out = io.StringIO()
+            call_command("payroll", src, dst, "--chunk-size", "4", stdout=out)
+            self.assertIn("6 rows (1 with errors)", out.getvalue())
+            with open(dst) as f:
+                self.assertEqual(len(list(csv.DictReader(f))), 6)
+
+    def test_parquet_roundtrip(self):
+        import io
+        import payroll_io
+
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            self.skipTest("pyarrow not installed")
+
+        values = {**PAYLOAD["salary"], **PAYLOAD["investments"]}
+        columns = {name: [float(values[name])] * 4 for name in values}
+        columns["basic"][3] = float("nan")
+        src, dst = io.BytesIO(), io.BytesIO()
+        pq.write_table(pa.table(columns), src)
+        src.seek(0)
+        stats = payroll_io.process_parquet(src, dst, chunk_size=2)
+        self.assertEqual((stats.rows, stats.errors), (4, 1))
+        dst.seek(0)
+        result = pq.read_table(dst)
+        expected = compare_tax_regimes(TaxRequest.model_validate(PAYLOAD))
+        self.assertEqual(result.column("new_total_tax").to_pylist()[:3], [expected.new_regime.total_tax] * 3)
+        self.assertEqual(result.column("error").to_pylist()[3], "basic: invalid number 'nan'")
+
+    def test_upload_endpoint(self):
+        from fastapi.testclient import TestClient
+        import main
+
+        response = TestClient(main.app).post("/api/payroll", content=self._csv().encode(),
+                                             headers={"Content-Type": "text/csv"})
+        self.assertEqual(response.status_code, 200)
+        lines = response.text.splitlines()
+        self.assertEqual(len(lines), 7)
+        self.assertTrue(lines[0].endswith("new_nps_employer_80ccd_2,error"))
+        self.assertEqual(main.jobs.pending, 0)
+
+        client = TestClient(main.app)
+        for body in (self._csv().encode("utf-16"), self._csv().encode() + b"\xff\n", b"", b"name,team\nbob,x\n"):
+            response = client.post("/api/payroll", content=body, headers={"Content-Type": "text/csv"})
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(main.jobs.pending, 0)
+
+
+class RuleProfileTests(SimpleTestCase):
+    def _payload(self, **profile):
+        payload = json.loads(json.dumps(PAYLOAD))
+        payload["salary"]["basic"] = 300000
+        payload["investments"]["hra_rent_paid"] = 400000
+        return {**payload, **profile}
+
+    def test_profile_selects_rules(self):
+        metro = compare_tax_regimes(TaxRequest.model_validate(self._payload()))
+        non_metro = compare_tax_regimes(TaxRequest.model_validate(self._payload(metro=False)))
+        self.assertEqual(metro.old_regime.deductions_breakdown["HRA Exemption"], 150000)
+        self.assertEqual(non_metro.old_regime.deductions_breakdown["HRA Exemption"], 120000)
+
+        older = compare_tax_regimes(TaxRequest.model_validate(self._payload(fy="2023-24")))
+        self.assertEqual(older.new_regime.deductions_breakdown["Standard Deduction"], 50000)
+
+    def test_decode_and_cache_key(self):
+        inputs = decode_request(self._payload(fy="2024-25", age_band="senior", metro=False))
+        self.assertEqual(tuple(inputs.profile), ("2024-25", "senior", False))
+        self.assertNotEqual(canonical_key(inputs), canonical_key(decode_request(self._payload())))
+        self.assertEqual(canonical_key(decode_request(self._payload())),
+                         canonical_key(decode_request(self._payload(fy="2025-26"))))
+
+        with self.assertRaises(InvalidInput) as ctx:
+            decode_request(self._payload(fy="1999-00", age_band="child", metro="yes"))
+        self.assertEqual(set(ctx.exception.errors), {"fy", "age_band", "metro"})
+
+    def test_endpoints_honour_profile(self):
+        from fastapi.testclient import TestClient
+        import main
+
+        payload = self._payload(fy="2024-25", age_band="super_senior", metro=False)
+        expected = compare_tax_regimes(TaxRequest.model_validate(payload)).model_dump()
+        self.assertEqual(TestClient(main.app).post("/api/calculate", json=payload).json(), expected)
+        response = APIClient().post(reverse("calculate_tax"), payload, format="json")
+        self.assertEqual(response.data, expected)
+        self.assertEqual(TestClient(main.app).post("/api/calculate", json=self._payload(age_band="child")).status_code, 422)
+
+    def test_grouped_batch_matches_scalar(self):
+        from batch_engine import compare_tax_regimes_grouped
+
+        profiles = [{}, {"age_band": "senior"}, {"fy": "2023-24", "metro": False}, {}]
+        requests = [TaxRequest.model_validate(self._payload(**p)) for p in profiles]
+        columns = {
+            name: np.array([getattr(getattr(r, section), name) for r in requests])
+            for section, fields in (("salary", SALARY_FIELDS), ("investments", INVESTMENT_FIELDS))
+            for name in fields
+        }
+        result = compare_tax_regimes_grouped(columns, [TaxInputs.from_request(r).profile for r in requests])
+        for i, request in enumerate(requests):
+            expected = compare_tax_regimes(request)
+            self.assertEqual(result["old_regime"]["total_tax"][i], expected.old_regime.total_tax)
+            self.assertEqual(result["new_regime"]["total_tax"][i], expected.new_regime.total_tax)
+
+
+class SurchargeTests(SimpleTestCase):
+    # Slow reference straight from the declarative rules: walk every slab,
+    # scan every surcharge band and recompute what is due at the threshold
+    # for marginal relief, recursively.
+    def _income_tax(self, spec, age_band, income):
+        slabs = sorted(spec.get("age_slabs", {}).get(age_band, spec["slabs"]))
+        if income <= spec["rebate_limit"]:
+            return 0.0
+        tax = 0.0
+        bounds = [lower for lower, _ in slabs[1:]] + [float("inf")]
+        for (lower, rate), upper in zip(slabs, bounds):
+            if income > lower:
+                tax += (min(income, upper) - lower) * rate
+        if spec["marginal_relief"]:
+            tax = min(tax, income - spec["rebate_limit"])
+        return tax
+
+    def _due(self, spec, age_band, income):
+        tax = self._income_tax(spec, age_band, income)
+        crossed = [(threshold, rate) for threshold, rate in sorted(spec["surcharge"]) if income > threshold]
+        if not crossed:
+            return tax
+        threshold, rate = crossed[-1]
+        return min(tax * (1 + rate), self._due(spec, age_band, threshold) + income - threshold)
+
+    def _incomes(self, spec):
+        rng = np.random.default_rng(16)
+        incomes = list(np.exp(rng.uniform(np.log(1e5), np.log(1e9), 1500)).round(2))
+        for threshold, _ in spec["surcharge"]:
+            incomes += [threshold - 1, threshold, threshold + 1, threshold + 12345.67]
+        return sorted(incomes)
+
+    def _rule_sets(self):
+        from tax_rules import AGE_BANDS, TAX_RULES
+
+        for fy, regimes in TAX_RULES.items():
+            for regime, spec in regimes.items():
+                for age_band in AGE_BANDS:
+                    yield spec, age_band, get_rules(regime, fy, age_band)
+
+    def test_matches_reference(self):
+        for spec, age_band, rules in self._rule_sets():
+            for income in self._incomes(spec):
+                expected = self._due(spec, age_band, income)
+                self.assertAlmostEqual(rules.tax_with_surcharge(income), expected, delta=1e-6 * max(1.0, expected))
+
+    def test_relief_properties(self):
+        for spec, _, rules in self._rule_sets():
+            incomes = self._incomes(spec)
+            due = np.array([rules.tax_with_surcharge(x) for x in incomes])
+            # Never decreasing, and crossing a threshold costs at most the income above it
+            self.assertTrue(np.all(np.diff(due) >= -1e-6))
+            for threshold in rules.surcharge.thresholds:
+                self.assertLessEqual(rules.tax_with_surcharge(threshold + 1) - rules.tax_with_surcharge(threshold), 1 + 1e-6)
+
+            for x in incomes:
+                if x <= rules.rebate_limit + 1000:
+                    continue
+                # income_for_tax inverts the curve, marginal_rate is its slope between kinks
+                self.assertAlmostEqual(rules.income_for_tax(rules.tax_with_surcharge(x)), x, delta=1e-6 * x)
+                if not any(x <= k < x + 1 for k in rules.kinks()):
+                    slope = rules.tax_with_surcharge(x + 1) - rules.tax_with_surcharge(x)
+                    self.assertAlmostEqual(rules.marginal_rate(x), slope, places=6)
+
+    def test_engines_agree_at_high_incomes(self):
+        import tax_core
+
+        rng = np.random.default_rng(3)
+        n = 300
+        columns = {name: np.zeros(n) for name in SALARY_FIELDS + INVESTMENT_FIELDS}
+        columns["basic"] = rng.uniform(2e6, 3e7, n).round()
+        columns["special_allowance"] = rng.uniform(0, 3e7, n).round()
+        batch = compare_tax_regimes_batch(columns)
+        for i in range(n):
+            result = tax_core.compare(TaxInputs(**{name: columns[name][i] for name in columns}))
+            for key in ("old_regime", "new_regime"):
+                self.assertEqual(batch[key]["surcharge"][i], getattr(result, key).surcharge)
+                self.assertEqual(batch[key]["total_tax"][i], getattr(result, key).total_tax)
+        self.assertTrue(np.any(batch["old_regime"]["surcharge"] > 0))
+        # The new regime stops at 25%
+        self.assertLessEqual(
+            np.max(batch["new_regime"]["surcharge"] / np.maximum(batch["new_regime"]["tax_amount"], 1)), 0.25 + 1e-12)
+
+
+class TdsTests(SimpleTestCase):
+    def _request(self, **kwargs):
+        from models import TdsRequest
+
+        payload = json.loads(json.dumps(PAYLOAD))
+        payload["salary"].update(basic=1200000, hra=480000, special_allowance=900000, variable_pay=240000)
+        return TdsRequest.model_validate({"base": payload, **kwargs})
+
+    def _annual_tax(self, request, regime="new"):
+        result = compare_tax_regimes(request.base)
+        return getattr(result, f"{regime}_regime").total_tax
+
+    def test_even_schedule_sums_to_annual_tax(self):
+        import tax_core
+        from tds import project
+
+        request = self._request()
+        response = project(request)
+        tds = [m.tds for m in response.months]
+        self.assertAlmostEqual(sum(tds), self._annual_tax(request), places=6)
+        self.assertAlmostEqual(max(tds), min(tds), places=6)
+        self.assertAlmostEqual(response.annual_gross, tax_core.gross_salary(TaxInputs.from_request(request.base)),
+                               places=6)
+
+    def test_mid_year_join_and_variable_pay_month(self):
+        from tds import TdsProjection
+
+        projection = TdsProjection(self._request(join_month=6, variable_pay_months=[9]))
+        months = projection.schedule()
+        self.assertEqual([m["tds"] for m in months[:6]], [0.0] * 6)
+        self.assertGreater(months[9]["gross"], months[8]["gross"])
+        # Six months of salary plus the full variable pay, taxed over six months
+        self.assertAlmostEqual(projection.totals["basic"], 600000)
+        self.assertAlmostEqual(projection.totals["variable_pay"], 240000)
+        self.assertAlmostEqual(sum(projection.tds), projection.annual_tax()["new"], places=6)
+
+    def test_actuals_recompute_only_later_months(self):
+        from unittest import mock
+        import tax_core
+        from tds import TdsProjection
+
+        projection = TdsProjection(self._request())
+        before = list(projection.tds)
+        with mock.patch.object(tax_core, "compare", wraps=tax_core.compare) as compare:
+            projection.set_actual(5, tds=before[5], earnings={"variable_pay": 500000})
+            self.assertEqual(compare.call_count, 1)
+        self.assertEqual(projection.tds[:6], before[:6])
+        self.assertGreater(projection.tds[6], before[6])
+        self.assertAlmostEqual(sum(projection.tds), projection.annual_tax()["new"], places=6)
+
+    def test_regime_switch_relevels_rest_of_year(self):
+        from tds import project
+
+        request = self._request(regime="new", regime_switches={6: "old"})
+        months = project(request).months
+        self.assertEqual({m.regime for m in months[6:]}, {"Old"})
+        self.assertAlmostEqual(sum(m.tds for m in months), self._annual_tax(request, "old"), places=6)
+
+    def test_monthly_run_matches_projection(self):
+        from tds import MONTH_COUNT, TdsProjection, monthly_run, projected_columns
+
+        projection = TdsProjection(self._request(variable_pay_months=[11]))
+        month = 4
+        rows = projection.months
+        to_date = {name: np.array([sum(r[name] for r in rows[:month])] * 3) for name in SALARY_FIELDS}
+        monthly = {name: np.array([rows[month][name]] * 3) for name in SALARY_FIELDS}
+        monthly["variable_pay"] = monthly["variable_pay"] + rows[11]["variable_pay"] / (MONTH_COUNT - month)
+        annual = {name: np.full(3, value) for name, value in projection.investments.items()}
+        run = monthly_run(projected_columns(to_date, monthly, month, annual), month,
+                          np.full(3, sum(projection.tds[:month])), np.array([False, False, True]))
+        np.testing.assert_allclose(run["tds"][:2], projection.tds[month])
+        self.assertAlmostEqual(run["annual_tax"][2], projection.annual_tax()["old"], places=4)
+
+    def test_endpoint(self):
+        from fastapi.testclient import TestClient
+        import main
+
+        client = TestClient(main.app)
+        body = json.loads(self._request().model_dump_json())
+        response = client.post("/api/tds", json={**body, "actuals": [{"month": 0, "tds": 0}]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["months"]), 12)
+        self.assertTrue(response.json()["months"][0]["actual"])
+        self.assertEqual(client.post("/api/tds", json={**body, "join_month": 12}).status_code, 400)
+        for actual in ({"month": 0, "tds": "nan"}, {"month": 0, "tds": 0, "earnings": {"basic": "inf"}}):
+            response = client.post("/api/tds", json={**body, "actuals": [actual]})
+            self.assertEqual(response.status_code, 422)
+            self.assertEqual(response.json()["detail"][0]["loc"][:3], ["body", "actuals", 0])
+
+
+class DeltaTests(SimpleTestCase):
+    def setUp(self):
+        from fastapi.testclient import TestClient
+        import main
+
+        self.client = TestClient(main.app)
+
+    def _post(self, body):
+        return self.client.post("/api/calculate/delta", json=body)
+
+    def test_deltas_match_full_requests(self):
+        rng = np.random.default_rng(18)
+        payload = json.loads(json.dumps(PAYLOAD))
+        response = self._post(payload).json()
+        fields = [(section, name) for section, names in (("salary", SALARY_FIELDS), ("investments", INVESTMENT_FIELDS))
+                  for name in names]
+        for _ in range(60):
+            section, name = fields[rng.integers(len(fields))]
+            value = int(rng.integers(0, 2000000))
+            payload[section][name] = value
+            response = self._post({"token": response["token"], "changes": {name: value}}).json()
+            expected = compare_tax_regimes(TaxRequest.model_validate(payload)).model_dump()
+            self.assertEqual(response["result"], expected)
+            self.assertEqual(response["token"], canonical_key(decode_request(payload)))
+
+    def test_only_affected_pieces_recompute(self):
+        from unittest import mock
+        import delta
+        import tax_core
+
+        state = delta._full(decode_request(PAYLOAD))
+        with mock.patch.object(tax_core, "gross_salary", wraps=tax_core.gross_salary) as gross:
+            moved = delta.apply(state, {"section_80c": 100000.0})
+            self.assertEqual(gross.call_count, 0)
+        self.assertIs(moved.result.new_regime, state.result.new_regime)
+        self.assertIsNot(moved.result.old_regime, state.result.old_regime)
+
+        moved = delta.apply(state, {"basic": 600000.0})
+        self.assertIsNot(moved.result.new_regime, state.result.new_regime)
+        self.assertIs(delta.apply(state, {"basic": 500000.0}), state)
+
+    def test_profile_change_and_errors(self):
+        token = self._post(PAYLOAD).json()["token"]
+        response = self._post({"token": token, "changes": {"fy": "2023-24"}})
+        expected = compare_tax_regimes(TaxRequest.model_validate({**PAYLOAD, "fy": "2023-24"})).model_dump()
+        self.assertEqual(response.json()["result"], expected)
+
+        self.assertEqual(self._post({"token": token, "changes": {"bonus": 1}}).status_code, 422)
+        for value in ("nan", "inf"):
+            response = self._post({"token": token, "changes": {"basic": value}})
+            self.assertEqual(response.status_code, 422)
+            self.assertEqual(response.json()["detail"], {"changes": {"basic": ["A valid number is required."]}})
+        self.assertEqual(self._post({"token": token, "changes": {"fy": "1999-00"}}).status_code, 422)
+        self.assertEqual(self._post({"token": "0" * 32, "changes": {"basic": 1}}).status_code, 409)
+        self.assertEqual(self._post({"salary": {}}).status_code, 422)
+
+
+class LiveCalculationTests(SimpleTestCase):
+    def test_patches_carry_only_changed_fields(self):
+        from fastapi.testclient import TestClient
+        import main
+
+        rng = np.random.default_rng(25)
+        payload = json.loads(json.dumps(PAYLOAD))
+        fields = [(section, name) for section, names in (("salary", SALARY_FIELDS), ("investments", INVESTMENT_FIELDS))
+                  for name in names]
+        with TestClient(main.app).websocket_connect("/ws/calculate") as ws:
+            ws.send_json({"id": 1, "request": payload})
+            reply = ws.receive_json()
+            self.assertEqual(reply["id"], 1)
+            current = reply["result"]
+            self.assertEqual(current, compare_tax_regimes(TaxRequest.model_validate(payload)).model_dump())
+
+            for _ in range(40):
+                section, name = fields[rng.integers(len(fields))]
+                value = int(rng.integers(0, 2000000))
+                payload[section][name] = value
+                ws.send_json({"changes": {name: value}})
+                patch = ws.receive_json()["changes"]
+                expected = compare_tax_regimes(TaxRequest.model_validate(payload)).model_dump()
+                for key, changed in patch.items():
+                    for field, new in changed.items():
+                        self.assertNotEqual(current[key][field], new)
+                    current[key].update(changed)
+                self.assertEqual(current, expected)
+
+            # 80C never reaches the new regime
+            ws.send_json({"changes": {"section_80c": payload["investments"]["section_80c"] + 1000}})
+            self.assertNotIn("new_regime", ws.receive_json()["changes"])
+            ws.send_json({"changes": {"basic": payload["salary"]["basic"]}})
+            self.assertEqual(ws.receive_json()["changes"], {})
+
+    def test_errors_keep_the_connection(self):
+        from fastapi.testclient import TestClient
+        import main
+
+        with TestClient(main.app).websocket_connect("/ws/calculate") as ws:
+            ws.send_json({"changes": {"basic": 1}})
+            self.assertIn("error", ws.receive_json())
+            ws.send_text("{not json")
+            self.assertIn("error", ws.receive_json())
+            ws.send_json({"request": PAYLOAD})
+            self.assertIn("result", ws.receive_json())
+            ws.send_json({"id": "x", "changes": {"bonus": 1}})
+            self.assertEqual(ws.receive_json(), {"id": "x", "error": {"changes": {"bonus": ["Unknown field."]}}})
+            for value in ("nan", "inf"):
+                ws.send_json({"changes": {"section_80c": value}})
+                self.assertEqual(ws.receive_json(),
+                                 {"error": {"changes": {"section_80c": ["A valid number is required."]}}})
+            ws.send_json({"changes": {"section_80c": 100000}})
+            self.assertIn("old_regime", ws.receive_json()["changes"])
+            ws.send_json({"changes": {"fy": "2023-24"}})
+            self.assertIn("new_regime", ws.receive_json()["changes"])
+
+
+class MetricsTests(TestCase):
+    def _exposition(self, text):
+        samples = {}
+        for line in text.splitlines():
+            if line and not line.startswith("#"):
+                name, value = line.rsplit(" ", 1)
+                samples[name] = float(value)
+        return samples
+
+    def test_fastapi_requests_stages_and_caches(self):
+        from fastapi.testclient import TestClient
+        import main
+        import metrics
+
+        client = TestClient(main.app)
+        endpoint = 'endpoint="/api/calculate"'
+        before = metrics.REQUESTS.value("/api/calculate", "POST", "200")
+        compute_before = metrics.STAGES.count("compute")
+        main.result_cache.clear()
+        client.post("/api/calculate", json=PAYLOAD)
+        client.post("/api/calculate", json=PAYLOAD)
+        self.assertEqual(metrics.REQUESTS.value("/api/calculate", "POST", "200"), before + 2)
+        # The second request is a cache hit and skips compute and encode
+        self.assertEqual(metrics.STAGES.count("compute"), compute_before + 1)
+
+        response = client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("text/plain; version=0.0.4"))
+        samples = self._exposition(response.text)
+        self.assertEqual(samples[f'salary_optimizer_requests_total{{{endpoint},method="POST",status="200"}}'], before + 2)
+        self.assertEqual(samples[f'salary_optimizer_request_seconds_bucket{{{endpoint},le="+Inf"}}'],
+                         samples[f'salary_optimizer_request_seconds_count{{{endpoint}}}'])
+        self.assertEqual(samples['salary_optimizer_cache_hit_ratio{cache="calculate"}'], 0.5)
+        for name in ("decode", "compute", "encode"):
+            self.assertIn(f'salary_optimizer_stage_seconds_count{{stage="{name}"}}', samples)
+
+        client.post("/api/calculate/batch", content=json.dumps([PAYLOAD] * 3))
+        samples = self._exposition(client.get("/metrics").text)
+        self.assertGreaterEqual(samples['salary_optimizer_batch_rows_total{source="batch"}'], 3)
+        self.assertGreater(samples['salary_optimizer_batch_rows_per_second{source="batch"}'], 0)
+
+    def test_profile_header(self):
+        from unittest import mock
+        from fastapi.testclient import TestClient
+        import main
+
+        client = TestClient(main.app)
+        # Off unless the deployment opts in
+        response = client.post("/api/calculate", json=PAYLOAD, headers={"X-Profile": "1"})
+        self.assertNotIn("x-profile-id", response.headers)
+        with mock.patch.dict(os.environ, {"PROFILE_REQUESTS": "1"}):
+            self.assertNotIn("x-profile-id", client.post("/api/calculate", json=PAYLOAD).headers)
+            response = client.post("/api/analytics", json=PAYLOAD, headers={"X-Profile": "1"})
+        self.assertEqual(response.status_code, 200)
+        profile = client.get(f"/metrics/profiles/{response.headers['x-profile-id']}")
+        self.assertEqual(profile.status_code, 200)
+        self.assertTrue(profile.text.startswith("# /api/analytics: "))
+        for line in profile.text.splitlines()[1:]:
+            stack, count = line.rsplit(" ", 1)
+            self.assertGreater(int(count), 0)
+        self.assertEqual(client.get("/metrics/profiles/0").status_code, 404)
+
+    def test_sampling_profiler_sees_running_code(self):
+        import time
+        import metrics
+
+        def spin(seconds):
+            end = time.perf_counter() + seconds
+            while time.perf_counter() < end:
+                pass
+
+        profiler = metrics.SamplingProfiler().start()
+        spin(0.05)
+        profiler.stop()
+        self.assertTrue(profiler.stacks)
+        self.assertTrue(any("spin (tests.py)" in stack for stack in profiler.stacks))
+
+    def test_django_metrics(self):
+        from unittest import mock
+        import metrics
+
+        client = APIClient()
+        response = client.post(reverse("calculate_tax"), PAYLOAD, format="json", HTTP_X_PROFILE="1")
+        self.assertNotIn("X-Profile-Id", response)
+        before = metrics.REQUESTS.value("/api/calculate", "POST", "200")
+        with mock.patch.dict(os.environ, {"PROFILE_REQUESTS": "1"}):
+            response = client.post(reverse("calculate_tax"), PAYLOAD, format="json", HTTP_X_PROFILE="1")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(metrics.REQUESTS.value("/api/calculate", "POST", "200"), before + 1)
+        profile = client.get(reverse("metrics_profile", args=[response["X-Profile-Id"]]))
+        self.assertTrue(profile.content.startswith(b"# /api/calculate: "))
+
+        body = client.get(reverse("metrics")).content.decode()
+        self.assertIn('salary_optimizer_cache_hit_ratio{cache="django_calculate"}', body)
+
+
+class FixedPointTests(SimpleTestCase):
+    FIELDS = ("gross_salary", "taxable_income", "tax_amount", "surcharge", "cess", "total_tax", "in_hand_monthly")
+
+    def _columns(self, size, seed=20):
+        rng = np.random.default_rng(seed)
+        columns = {name: np.round(rng.uniform(0, 400000, size), 2) for name in SALARY_FIELDS + INVESTMENT_FIELDS}
+        columns["basic"] = np.round(rng.uniform(0, 80000000, size), 2)
+        return columns
+
+    def test_batch_matches_scalar_exactly(self):
+        import fixed_point
+        from tax_rules import RuleProfile
+
+        columns = self._columns(400)
+        choices = [RuleProfile(), RuleProfile("2023-24", "senior", False), RuleProfile("2024-25", "super_senior")]
+        profiles = [choices[i % 3] for i in range(400)]
+        result = fixed_point.compare_tax_regimes_grouped(columns, profiles)
+        self.assertEqual(result["old_regime"]["total_tax"].dtype, np.int64)
+
+        for i in range(0, 400, 3):
+            inputs = TaxInputs(**{name: float(values[i]) for name, values in columns.items()}, profile=profiles[i])
+            scalar = fixed_point.compare(inputs)
+            for key in ("old_regime", "new_regime"):
+                regime = getattr(scalar, key)
+                for name in self.FIELDS:
+                    self.assertEqual(getattr(regime, name), result[key][name][i], (key, name, i))
+                for label, value in regime.deductions_breakdown.items():
+                    self.assertEqual(value, result[key]["deductions_breakdown"][label][i])
+
+    def test_statutory_rounding(self):
+        import fixed_point
+        import tax_core
+
+        # Old regime: taxable 950,004.99 is assessed as 950,000 (288A), tax
+        # 1,02,500 + 4% cess = 1,06,600 (288B); the float engine carries the paise
+        inputs = TaxInputs(basic=1000004.99)
+        result = fixed_point.compare(inputs).old_regime
+        self.assertEqual(result.taxable_income, 95000000)
+        self.assertEqual(result.total_tax, 10660000)
+        self.assertAlmostEqual(tax_core.compare(inputs).old_regime.total_tax, 106601.04, places=2)
+
+        columns = self._columns(2000, seed=21)
+        result = fixed_point.compare_tax_regimes_batch(columns)
+        floats = compare_tax_regimes_batch(columns)
+        for key in ("old_regime", "new_regime"):
+            self.assertFalse(np.any(result[key]["taxable_income"] % 1000))
+            self.assertFalse(np.any(result[key]["total_tax"] % 1000))
+            drift = np.abs(result[key]["total_tax"] / 100 - floats[key]["total_tax"])
+            self.assertLessEqual(drift.max(), 10.5)
+
+        response = fixed_point.as_rupees(fixed_point.compare(TaxInputs.from_request(TaxRequest.model_validate(PAYLOAD))))
+        self.assertEqual(response["old_regime"]["total_tax"] * 100 % 1000, 0)
+
+        with self.assertRaises(ValueError):
+            fixed_point.compare_tax_regimes_batch({"basic": np.array([1e13])})
+
+    def test_payroll_fixed_point(self):
+        import csv
+        import io
+        import fixed_point
+        import payroll_io
+
+        text = "basic,hra,section_80c\n1000004.99,0,0\n2500000,400000,150000\n"
+        rows = list(csv.DictReader(io.StringIO("".join(payroll_io.iter_csv(io.StringIO(text), fixed=True)))))
+        self.assertEqual(float(rows[0]["old_total_tax"]), 106600.0)
+        expected = fixed_point.as_rupees(fixed_point.compare(TaxInputs(basic=2500000, hra=400000, section_80c=150000)))
+        self.assertEqual(float(rows[1]["new_in_hand_monthly"]), expected["new_regime"]["in_hand_monthly"])
+
+
+class StaticDeliveryTests(SimpleTestCase):
+    def setUp(self):
+        import gzip
+        import tempfile
+        from static_delivery import StaticSite
+
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        os.makedirs(os.path.join(root, "assets"))
+        self.index = b"<!doctype html><div id=root></div>" + b"<!-- padding -->" * 64
+        self.script = b"console.log('salary optimizer');\n" * 100
+        files = {
+            "index.html": self.index,
+            "assets/index-3f9a1c.js": self.script,
+            "assets/index-77b2e0.css": b"body{margin:0}" * 80,
+            "assets/index-77b2e0.css.gz": gzip.compress(b"body{margin:0}" * 80),
+            "favicon.ico": b"\x00\x01" * 10,
+        }
+        for name, body in files.items():
+            with open(os.path.join(root, name), "wb") as f:
+                f.write(body)
+        self.site = StaticSite(root)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_compression_and_cache_headers(self):
+        import gzip
+
+        response = self.site.respond("/assets/index-3f9a1c.js", "gzip, deflate, br;q=0")
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.body), self.script)
+        self.assertIn("immutable", response.headers["cache-control"])
+        self.assertEqual(response.headers["vary"], "Accept-Encoding")
+
+        plain = self.site.respond("/assets/index-3f9a1c.js", "identity")
+        self.assertEqual(plain.body, self.script)
+        self.assertNotIn("content-encoding", plain.headers)
+        self.assertNotEqual(plain.headers["etag"], response.headers["etag"])
+
+        # A shipped .gz sibling is served and never listed as its own path
+        css = self.site.respond("/assets/index-77b2e0.css", "gzip")
+        self.assertEqual(css.headers["content-encoding"], "gzip")
+        self.assertNotIn("assets/index-77b2e0.css.gz", self.site.manifest)
+        self.assertEqual(self.site.respond("/favicon.ico", "gzip").headers["cache-control"], "public, max-age=3600")
+
+    def test_index_fallback_and_revalidation(self):
+        from unittest import mock
+
+        # Requests are answered from the manifest without touching the filesystem
+        with mock.patch("builtins.open", side_effect=AssertionError), \
+                mock.patch("os.stat", side_effect=AssertionError):
+            response = self.site.respond("/calculator/results")
+            self.assertEqual(response.body, self.index)
+            self.assertEqual(response.headers["cache-control"], "no-cache")
+            self.assertEqual(self.site.respond("").body, self.index)
+
+            etag = self.site.respond("/", "gzip").headers["etag"]
+            for header in (etag, f'W/{etag}', f'"other", {etag}', "*"):
+                revalidated = self.site.respond("/", "", header)
+                self.assertEqual((revalidated.status, revalidated.body), (304, b""))
+            self.assertEqual(self.site.respond("/", "", '"other"').status, 200)
+
+            self.assertIsNone(self.site.respond("/assets/missing-000000.js"))
+
+
+class MonteCarloTests(SimpleTestCase):
+    def _request(self, **fields):
+        from models import MonteCarloRequest
+
+        return MonteCarloRequest(base=TaxRequest.model_validate(PAYLOAD), **fields)
+
+    def test_seeded_and_split_invariant(self):
+        import monte_carlo
+
+        request = self._request(paths=2500, years=6, seed=7)
+        whole = monte_carlo.simulate(request)
+        self.assertEqual(monte_carlo.simulate(request), whole)
+        parts = [monte_carlo.simulate_range(request, start, stop) for start, stop in monte_carlo.ranges(request, 3)]
+        self.assertEqual(len(parts), 3)
+        self.assertEqual(monte_carlo.summarise(request, np.concatenate(parts)), whole)
+        self.assertNotEqual(monte_carlo.simulate(self._request(paths=2500, years=6, seed=8)), whole)
+
+        bands = whole["old_regime"]["cumulative_in_hand"]
+        self.assertEqual([band["percentile"] for band in bands], [5, 25, 50, 75, 95])
+        for low, high in zip(bands, bands[1:]):
+            self.assertTrue(all(a <= b for a, b in zip(low["values"], high["values"])))
+
+    def test_fixed_distributions_match_engine(self):
+        import monte_carlo
+        from models import Distribution
+
+        fixed = Distribution(mean=0.0)
+        request = self._request(paths=10, years=3, hike=fixed, rent_inflation=fixed,
+                                variable_payout=Distribution(mean=1.0))
+        result = monte_carlo.simulate(request)
+        expected = compare_tax_regimes(TaxRequest.model_validate(PAYLOAD))
+        for key in ("old_regime", "new_regime"):
+            annual = getattr(expected, key).in_hand_monthly * 12
+            for band in result[key]["cumulative_in_hand"]:
+                for year, value in enumerate(band["values"], 1):
+                    self.assertAlmostEqual(value, annual * year, places=4)
+        better = expected.old_regime.in_hand_monthly > expected.new_regime.in_hand_monthly
+        self.assertEqual(result["probability_old_better"], [float(better)] * 3)
+
+        # Raises compound from year 2 on
+        grow = monte_carlo.simulate(self._request(paths=10, years=2, hike=Distribution(mean=0.1),
+                                                  rent_inflation=fixed, variable_payout=Distribution(mean=1.0)))
+        scaled = json.loads(json.dumps(PAYLOAD))
+        for name in monte_carlo.GROWING_FIELDS + ("variable_pay",):
+            section = "salary" if name in scaled["salary"] else "investments"
+            scaled[section][name] *= 1.1
+        year2 = compare_tax_regimes(TaxRequest.model_validate(scaled)).new_regime.in_hand_monthly * 12
+        self.assertAlmostEqual(grow["new_regime"]["mean"][1] - grow["new_regime"]["mean"][0], year2, places=4)
+
+    def test_endpoint(self):
+        from fastapi.testclient import TestClient
+        import main
+        import monte_carlo
+
+        client = TestClient(main.app)
+        body = {"base": PAYLOAD, "paths": 1500, "years": 4, "seed": 3}
+        response = client.post("/api/monte-carlo", json=body)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), monte_carlo.simulate(self._request(paths=1500, years=4, seed=3)))
+        self.assertEqual(client.post("/api/monte-carlo", json={**body, "years": 0}).status_code, 400)
+        self.assertEqual(client.post("/api/monte-carlo", json={**body, "percentiles": [101]}).status_code, 400)
+        self.assertEqual(client.post("/api/monte-carlo", json={**body, "seed": -1}).status_code, 400)
+        for field, value in (("hike", {"mean": "nan"}), ("rent_inflation", {"mean": 0.05, "std": "inf"}),
+                             ("percentiles", [50, "nan"])):
+            response = client.post("/api/monte-carlo", json={**body, field: value})
+            self.assertEqual(response.status_code, 422, field)
+
+    def test_fan_out_bounded_by_free_slots(self):
+        from unittest import mock
+        from fastapi.testclient import TestClient
+        from job_pool import JobPool
+        import main
+        import monte_carlo
+
+        body = {"base": PAYLOAD, "paths": 3000, "years": 3}
+        expected = monte_carlo.simulate(self._request(paths=3000, years=3))
+        for max_pending, held, pieces in ((8, 0, 2), (4, 2, 1), (1, 0, 1)):
+            pool = JobPool(max_workers=2, max_pending=max_pending)
+            self.addCleanup(pool.shutdown)
+            pool.acquire(held)
+            with mock.patch.object(main, "jobs", pool), mock.patch.object(pool, "map", wraps=pool.map) as fan_out:
+                response = TestClient(main.app).post("/api/monte-carlo", json=body)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json(), expected)
+            self.assertEqual(len(fan_out.call_args.args[1]), pieces, max_pending)
+            self.assertEqual(pool.stats()["rejected"], 0)
+            self.assertEqual(pool.pending, held)
+
+        pool = JobPool(max_workers=2, max_pending=1)
+        pool.acquire()
+        with mock.patch.object(main, "jobs", pool):
+            self.assertEqual(TestClient(main.app).post("/api/monte-carlo", json=body).status_code, 429)
+
+
+class PlanTests(SimpleTestCase):
+    def _request(self, budget_delta: float, **policy):
+        from models import PlanRequest
+
+        low = json.loads(json.dumps(PAYLOAD))
+        low["salary"].update(basic=300000, hra=0, special_allowance=60000, lta=0, variable_pay=0, other_allowances=0)
+        high = json.loads(json.dumps(PAYLOAD))
+        high["salary"].update(basic=3000000, special_allowance=900000)
+        employees = [{"id": "low", **low}, {"id": "high", **high}]
+        cost = sum(sum(e["salary"][name] for name in EARNING_FIELDS) for e in employees)
+        return PlanRequest.model_validate({"employees": employees, "budget": cost + budget_delta, "policy": policy})
+
+    def test_budget_goes_to_highest_marginal_value(self):
+        from budget_planner import plan
+
+        result = plan(self._request(90000))
+        self.assertLessEqual(result["planned_cost"], result["budget"])
+        self.assertGreater(result["value_after"], result["value_before"])
+        low, high = result["recommendations"]
+        # Employer NPS is worth its tax saving on top to the 30% bracket, nothing extra below the rebate
+        self.assertEqual(low["nps_employer"], 0)
+        self.assertGreater(high["nps_employer"], 0)
+        self.assertGreater(high["value_change"] / high["cost_change"], 1.2)
+        self.assertGreater(result["marginal_value"], 1.2)
+
+        # Re-splitting into HRA and LTA is cost neutral and never costs in-hand pay
+        for rec, employee in zip(result["recommendations"], self._request(0).employees):
+            salary = employee.salary
+            self.assertEqual(rec["hra"] + rec["lta"] + rec["special_allowance"],
+                             salary.hra + salary.lta + salary.special_allowance)
+            self.assertLessEqual(rec["hra"], 0.5 * salary.basic)
+        flat = plan(self._request(0))
+        self.assertEqual([rec["cost_change"] for rec in flat["recommendations"]], [0, 0])
+        self.assertGreaterEqual(flat["value_after"], flat["value_before"])
+
+        # A bigger budget funds more, up to the band
+        wide = plan(self._request(10 ** 7))
+        self.assertEqual([rec["nps_employer"] for rec in wide["recommendations"]], [42000, 420000])
+
+    def test_endpoint(self):
+        from fastapi.testclient import TestClient
+        import main
+        from budget_planner import plan
+
+        client = TestClient(main.app)
+        request = self._request(50000, nps_levels=8)
+        response = client.post("/api/plan", json=request.model_dump())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), plan(request))
+        under = self._request(-1, min_nps_employer_pct=0.0)
+        self.assertEqual(client.post("/api/plan", json=under.model_dump()).status_code, 400)
+        banded = self._request(0, min_nps_employer_pct=0.2, max_nps_employer_pct=0.1)
+        self.assertEqual(client.post("/api/plan", json=banded.model_dump()).status_code, 400)
+        for field, value in (("budget", "nan"), ("budget", "inf"), ("policy", {"max_nps_employer_pct": "nan"})):
+            response = client.post("/api/plan", json={**request.model_dump(), field: value})
+            self.assertEqual(response.status_code, 422, (field, value))
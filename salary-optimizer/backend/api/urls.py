@@ -1,6 +1,9 @@
 from django.urls import path
-from .views import CalculateTaxView
+from .views import BatchCalculateTaxView, CalculateTaxView, ScenarioListView, StoredResultView
 
 urlpatterns = [
     path('calculate', CalculateTaxView.as_view(), name='calculate_tax'),
+    path('calculate/batch', BatchCalculateTaxView.as_view(), name='calculate_tax_batch'),
+    path('scenarios', ScenarioListView.as_view(), name='scenarios'),
+    path('results/<str:input_hash>', StoredResultView.as_view(), name='stored_result'),
 ]
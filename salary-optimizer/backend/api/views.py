@@ -1,49 +1,157 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from .serializers import TaxRequestSerializer, ComparisonResponseSerializer
-from tax_engine import compare_tax_regimes
-from types import SimpleNamespace
+from django.core.cache import caches
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+import metrics
+import tax_core
+from tax_core import InvalidInput, decode_request
+from tax_cache import TaxCache, canonical_inputs, canonical_key
+from batch_stream import BatchStream
+from tax_rules import DEFAULT_FY
+from . import store
+from .parsers import CodecJSONParser
+
+class PrerenderedResponse(Response):
+    # DRF Response whose JSON body was rendered once and cached; .data is kept
+    # for test clients and middleware but never re-rendered.
+    def __init__(self, data, content: bytes):
+        super().__init__(data)
+        self._content = content
+
+    @property
+    def rendered_content(self):
+        self['Content-Type'] = 'application/json'
+        return self._content
 
-def dict_to_namespace(d):
-    return SimpleNamespace(**{k: dict_to_namespace(v) if isinstance(v, dict) else v for k, v in d.items()})
 
 class CalculateTaxView(APIView):
+    parser_classes = [CodecJSONParser]
+    # Shared with other workers through the 'tax_results' Django cache
+    result_cache = TaxCache(backend=caches['tax_results'])
+    metrics.registry.register_cache('django_calculate', result_cache)
+
+    def post(self, request):
+        # Thin decode straight into tax_core's slotted inputs; the engine's
+        # output is encoded once without going back through a serializer.
+        try:
+            with metrics.stage('decode'):
+                inputs = decode_request(request.data)
+        except InvalidInput as e:
+            return Response(e.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        def compute():
+            # The engine runs on the rupee-rounded inputs the key is built from
+            with metrics.stage('compute'):
+                result = tax_core.compare(canonical_inputs(inputs))
+            with metrics.stage('encode'):
+                return result.as_dict(), result.to_json()
+
+        # Identical requests arriving together on other threads share one computation
+        cached = self.result_cache.get_or_set(canonical_key(inputs), compute)
+        response_data, content = cached
+        return PrerenderedResponse(response_data, content)
+
+
+class BatchCalculateTaxView(APIView):
+    # Streams NDJSON results for a JSON array / NDJSON body of TaxRequests.
+    # The body is read straight from the stream, bypassing DRF's parsers, so
+    # the upload is never held in memory as a whole.
+    read_size = 64 * 1024
+
+    def post(self, request):
+        body = request.stream
+
+        def results():
+            stream = BatchStream()
+            if body is not None:
+                while True:
+                    chunk = body.read(self.read_size)
+                    if not chunk:
+                        break
+                    yield from stream.feed(chunk)
+            yield from stream.finish()
+
+        return StreamingHttpResponse(results(), content_type='application/x-ndjson')
+
+
+class ScenarioListView(APIView):
+    # GET ?user=&fy=&limit=&before= lists a user's saved scenarios, newest
+    # first. POST stores one scenario ({user, fy?, name?, salary, investments,
+    # age_band?, metro?}) or many ({user, fy?, scenarios: [...]}, where fy is
+    # the default for every item) with a single bulk insert.
+    parser_classes = [CodecJSONParser]
+    max_limit = 500
+    # Stored as the scenario's request; fy has its own column
+    request_fields = ('salary', 'investments', 'age_band', 'metro')
+
+    def get(self, request):
+        user = request.query_params.get('user')
+        if not user:
+            return Response({'user': ['This field is required.']}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(int(request.query_params.get('limit', 50)), self.max_limit)
+            before = request.query_params.get('before')
+            before = int(before) if before else None
+        except ValueError:
+            return Response({'non_field_errors': ['limit and before must be integers.']},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if limit < 1:
+            return Response({'limit': ['Ensure this value is greater than or equal to 1.']},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        fy = request.query_params.get('fy', DEFAULT_FY)
+        scenarios = store.history(user, fy, limit, before)
+        return Response({
+            'results': [store.scenario_dict(s) for s in scenarios],
+            'next': scenarios[-1].id if len(scenarios) == limit else None,
+        })
+
     def post(self, request):
-        serializer = TaxRequestSerializer(data=request.data)
-        if serializer.is_valid():
-            # The tax_engine expects objects with dot notation (like Pydantic models)
-            # We can convert the validated data to nested SimpleNamespaces
-            data = serializer.validated_data
-            
-            # Create a mock request object that tax_engine expects
-            class MockRequest:
-                def __init__(self, data):
-                    self.salary = SimpleNamespace(**data['salary'])
-                    self.investments = SimpleNamespace(**data['investments'])
-            
-            mock_request = MockRequest(data)
-            
-            result = compare_tax_regimes(mock_request)
-            
-            # result is a ComparisonResponse (Pydantic model?) 
-            # Actually tax_engine returns ComparisonResponse(old_regime=TaxResult(...), ...)
-            # We can convert these to dicts for the serializer
-            
-            def pydantic_to_dict(obj):
-                if hasattr(obj, 'model_dump'):
-                    return obj.model_dump()
-                return obj.__dict__
-
-            response_data = {
-                'old_regime': pydantic_to_dict(result.old_regime),
-                'new_regime': pydantic_to_dict(result.new_regime)
-            }
-            
-            # Validate with response serializer (optional but good for consistency)
-            res_serializer = ComparisonResponseSerializer(data=response_data)
-            if res_serializer.is_valid():
-                return Response(res_serializer.data)
-            return Response(res_serializer.errors, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = request.data
+        if not isinstance(data, dict) or not data.get('user'):
+            return Response({'user': ['This field is required.']}, status=status.HTTP_400_BAD_REQUEST)
+        many = 'scenarios' in data
+        entries = data['scenarios'] if many else [data]
+        if not isinstance(entries, list):
+            return Response({'scenarios': ['Expected a list of items.']}, status=status.HTTP_400_BAD_REQUEST)
+
+        items, errors = [], {}
+        for i, entry in enumerate(entries):
+            if many and 'fy' in data and isinstance(entry, dict):
+                entry = {'fy': data['fy'], **entry}
+            try:
+                inputs = decode_request(entry)
+            except InvalidInput as e:
+                errors[i] = e.errors
+                continue
+            request_data = {name: entry[name] for name in self.request_fields if name in entry}
+            items.append((str(entry.get('name', '')), request_data, inputs))
+        if errors:
+            return Response(errors if many else errors[0], status=status.HTTP_400_BAD_REQUEST)
+
+        scenarios = store.save_scenarios(str(data['user']), items)
+
+        body = [store.scenario_dict(s) for s in scenarios]
+        return Response(body if many else body[0], status=status.HTTP_201_CREATED)
+
+
+class StoredResultView(APIView):
+    # ComparisonResponse previously stored for an input hash (see tax_cache.canonical_key)
+    def get(self, request, input_hash):
+        record = store.lookup(input_hash, request.query_params.get('fy', DEFAULT_FY))
+        if record is None:
+            return Response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(record.result)
+
+
+def metrics_exposition(request):
+    return HttpResponse(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+
+def metrics_profile(request, profile_id):
+    # Collapsed stacks of an X-Profile request (see metrics.py)
+    profile = metrics.get_profile(profile_id)
+    if profile is None:
+        raise Http404('Unknown or evicted profile')
+    return HttpResponse(profile, content_type='text/plain')
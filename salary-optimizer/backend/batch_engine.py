@@ -0,0 +1,216 @@
+import numpy as np
+
+from tax_core import INVESTMENT_FIELDS, SALARY_FIELDS
+from tax_rules import DEFAULT_PROFILE, RuleProfile, get_rules
+
+# Columnar counterpart of tax_engine.compare_tax_regimes.
+# Every step mirrors the scalar engine (tax_core) operation-for-operation so
+# the batch results match calculate_new_regime / calculate_old_regime exactly.
+
+INPUT_FIELDS = SALARY_FIELDS + INVESTMENT_FIELDS
+
+
+def _has_field(columns, name: str) -> bool:
+    names = getattr(getattr(columns, 'dtype', None), 'names', None)
+    if names is not None:
+        return name in names
+    return name in columns
+
+
+def load_columns(columns) -> dict:
+    """
+    Pull the SalaryInputs/Investments fields out of a dict of arrays, a numpy
+    structured array or a pandas DataFrame as float64 arrays of equal length.
+    Missing fields default to 0, like the Vercel handler does for JSON input.
+    """
+    present = [name for name in INPUT_FIELDS if _has_field(columns, name)]
+    if not present:
+        raise ValueError("No salary or investment columns found")
+
+    arrays = {name: np.asarray(columns[name], dtype=np.float64) for name in present}
+    size = arrays[present[0]].shape[0]
+    for name, arr in arrays.items():
+        if arr.ndim != 1 or arr.shape[0] != size:
+            raise ValueError(f"Column '{name}' must be 1-D with {size} rows")
+
+    for name in INPUT_FIELDS:
+        if name not in arrays:
+            arrays[name] = np.zeros(size, dtype=np.float64)
+    return arrays
+
+
+def income_tax_batch(rules, taxable_income: np.ndarray) -> np.ndarray:
+    # Vectorized RegimeRules.income_tax: one searchsorted into the compiled
+    # breakpoints, then cumulative tax plus the marginal slab.
+    slabs = rules.slabs
+    breakpoints = np.asarray(slabs.breakpoints)
+    i = np.searchsorted(breakpoints, taxable_income, side='right') - 1
+    slab_tax = np.take(slabs.cumulative, i) + (taxable_income - breakpoints[i]) * np.take(slabs.rates, i)
+
+    if rules.marginal_relief:
+        slab_tax = np.minimum(slab_tax, taxable_income - rules.rebate_limit)
+    return np.where(taxable_income <= rules.rebate_limit, 0.0, slab_tax)
+
+
+def surcharge_batch(rules, taxable_income: np.ndarray, tax: np.ndarray) -> np.ndarray:
+    # Vectorized SurchargeSchedule.amount: one searchsorted into the thresholds
+    # and the precomputed amount due at each, no per-band comparisons
+    schedule = rules.surcharge
+    if not schedule.thresholds:
+        return np.zeros_like(tax)
+    thresholds = np.asarray(schedule.thresholds)
+    i = np.searchsorted(thresholds, taxable_income, side='left') - 1
+    j = np.maximum(i, 0)
+    amount = np.minimum(tax * np.take(schedule.rates, j),
+                        np.take(schedule.base, j) + (taxable_income - thresholds[j]) - tax)
+    return np.where(i >= 0, amount, 0.0)
+
+
+def _gross_salary(c: dict) -> np.ndarray:
+    return (
+        c['basic'] +
+        c['hra'] +
+        c['special_allowance'] +
+        c['lta'] +
+        c['variable_pay'] +
+        c['other_allowances']
+    )
+
+
+def _result(regime, rules, c, gross_salary, deductions, taxable_income, tax) -> dict:
+    surcharge = surcharge_batch(rules, taxable_income, tax)
+    cess = (tax + surcharge) * rules.cess_rate
+    total_tax = tax + surcharge + cess
+    in_hand_monthly = (gross_salary - c['pf_deduction'] - c['professional_tax'] - total_tax) / 12
+
+    return {
+        'regime': regime,
+        'gross_salary': gross_salary,
+        'taxable_income': taxable_income,
+        'tax_amount': tax,
+        'surcharge': surcharge,
+        'cess': cess,
+        'total_tax': total_tax,
+        'in_hand_monthly': in_hand_monthly,
+        'deductions_breakdown': deductions,
+    }
+
+
+def calculate_tax_new_regime_batch(c: dict, gross_salary: np.ndarray, profile: RuleProfile = DEFAULT_PROFILE) -> dict:
+    rules = get_rules("new", *profile)
+    std_deduction = np.full_like(gross_salary, rules.standard_deduction)
+
+    deductions = {
+        'Standard Deduction': std_deduction,
+        'NPS Employer (80CCD(2))': c['nps_employer'],
+    }
+
+    total_deductions = sum(deductions.values())
+    taxable_income = np.maximum(0.0, gross_salary - total_deductions)
+
+    tax = income_tax_batch(rules, taxable_income)
+
+    return _result("New", rules, c, gross_salary, deductions, taxable_income, tax)
+
+
+def calculate_tax_old_regime_batch(c: dict, gross_salary: np.ndarray, profile: RuleProfile = DEFAULT_PROFILE) -> dict:
+    rules = get_rules("old", *profile)
+    caps = rules.caps
+    std_deduction = np.full_like(gross_salary, rules.standard_deduction)
+
+    hra_exemption = np.maximum(0.0, np.minimum(
+        np.minimum(c['hra'], c['hra_rent_paid'] - (caps['hra_rent_basic_pct'] * c['basic'])),
+        caps['hra_basic_pct'] * c['basic']
+    ))
+
+    deductions = {
+        'Standard Deduction': std_deduction,
+        'Professional Tax': c['professional_tax'],
+        'HRA Exemption': hra_exemption,
+        'Section 80C': np.minimum(c['section_80c'] + c['pf_deduction'], caps['section_80c']),
+        'Section 80D': np.minimum(c['section_80d'], caps['section_80d']),
+        'NPS Self (80CCD(1B))': np.minimum(c['nps_self'], caps['nps_self']),
+        'NPS Employer (80CCD(2))': c['nps_employer'],
+        'Home Loan Interest': np.minimum(c['home_loan_interest'], caps['home_loan_interest']),
+        'LTA Exemption': np.minimum(c['lta'], caps['lta']),
+    }
+
+    total_deductions = sum(deductions.values())
+    taxable_income = np.maximum(0.0, gross_salary - total_deductions)
+
+    tax = income_tax_batch(rules, taxable_income)
+
+    return _result("Old", rules, c, gross_salary, deductions, taxable_income, tax)
+
+
+def compare_tax_regimes_batch(columns, profile: RuleProfile = DEFAULT_PROFILE) -> dict:
+    """
+    Vectorized compare_tax_regimes over many employees at once.
+
+    Returns the ComparisonResponse shape with every numeric field (and every
+    deductions_breakdown entry) replaced by an array holding one value per row.
+    """
+    c = load_columns(columns)
+    gross_salary = _gross_salary(c)
+
+    return {
+        'old_regime': calculate_tax_old_regime_batch(c, gross_salary, profile),
+        'new_regime': calculate_tax_new_regime_batch(c, gross_salary, profile),
+    }
+
+
+def _scatter(out, part, idx, size: int):
+    # Copy a group's result (nested dicts of arrays) into rows idx of out, allocating on first use
+    for name, values in part.items():
+        if isinstance(values, dict):
+            _scatter(out.setdefault(name, {}), values, idx, size)
+        elif isinstance(values, np.ndarray):
+            out.setdefault(name, np.empty(size, dtype=values.dtype))[idx] = values
+        else:
+            out[name] = values
+
+
+def compare_tax_regimes_grouped(columns, profiles) -> dict:
+    """
+    compare_tax_regimes_batch where each row carries its own RuleProfile
+    (a sequence, one per row): rows are grouped by profile, each group runs
+    as one batch and the results are scattered back into row order.
+    """
+    c = load_columns(columns)
+    groups = {}
+    for i, profile in enumerate(profiles):
+        groups.setdefault(profile, []).append(i)
+    if len(groups) <= 1:
+        return compare_tax_regimes_batch(c, next(iter(groups), DEFAULT_PROFILE))
+
+    size = len(profiles)
+    out = {}
+    for profile, rows in groups.items():
+        idx = np.array(rows)
+        _scatter(out, compare_tax_regimes_batch({name: values[idx] for name, values in c.items()}, profile), idx, size)
+    return out
+
+
+def iter_records(result: dict):
+    """Yield one ComparisonResponse-shaped dict per row of a batch result."""
+    regimes = {}
+    for key in ('old_regime', 'new_regime'):
+        regime = result[key]
+        columns = {
+            name: regime[name].tolist()
+            for name in ('gross_salary', 'taxable_income', 'tax_amount', 'surcharge', 'cess', 'total_tax',
+                         'in_hand_monthly')
+        }
+        breakdown = {label: values.tolist() for label, values in regime['deductions_breakdown'].items()}
+        regimes[key] = (regime['regime'], columns, breakdown)
+
+    size = len(result['old_regime']['gross_salary'])
+    for i in range(size):
+        record = {}
+        for key, (label, columns, breakdown) in regimes.items():
+            row = {'regime': label}
+            for name, values in columns.items():
+                row[name] = values[i]
+            row['deductions_breakdown'] = {name: values[i] for name, values in breakdown.items()}
+            record[key] = row
+        yield record
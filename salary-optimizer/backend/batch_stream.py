@@ -0,0 +1,227 @@
+import codecs
+import json
+import time
+
+import numpy as np
+from pydantic import ValidationError
+
+from batch_engine import INVESTMENT_FIELDS, SALARY_FIELDS, compare_tax_regimes_grouped, iter_records
+import metrics
+from models import TaxRequest
+from tax_core import profile_of
+
+# Incremental decoder for POST /api/calculate/batch.
+# The body may be a JSON array of TaxRequests or NDJSON (one per line). Bytes
+# are pushed in as they arrive, rows are validated one at a time and computed
+# through the batch engine in fixed-size chunks, so memory stays bounded by
+# chunk_size regardless of the upload size. Output is NDJSON with one line per
+# input row, in order: a ComparisonResponse or {"index": i, "error": "..."}.
+# Each chunk's compute and encoding is one encode_chunk call, which the
+# server hands to its job pool's worker processes (see BatchStream compute).
+
+CHUNK_SIZE = 512
+MAX_RECORD_BYTES = 1 << 20
+
+_WHITESPACE = ' \t\r\n'
+
+
+def _encode(obj) -> bytes:
+    return json.dumps(obj, separators=(',', ':')).encode() + b'\n'
+
+
+def _validation_message(exc: ValidationError) -> str:
+    return '; '.join(
+        f"{'.'.join(str(p) for p in err['loc']) or 'body'}: {err['msg']}"
+        for err in exc.errors()
+    )
+
+
+def encode_chunk(columns: dict, profiles: list) -> list:
+    """NDJSON lines for one chunk of valid rows: input columns and one RuleProfile per row."""
+    return [_encode(record) for record in iter_records(compare_tax_regimes_grouped(columns, profiles))]
+
+
+class BatchStream:
+    def __init__(self, chunk_size: int = CHUNK_SIZE, max_record_bytes: int = MAX_RECORD_BYTES, compute=encode_chunk):
+        # compute(columns, profiles) -> lines: encode_chunk, or a wrapper running it in another process
+        self.chunk_size = chunk_size
+        self.max_record_bytes = max_record_bytes
+        self.compute = compute
+        self.rows = 0
+
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._json = json.JSONDecoder()
+        self._buffer = ''
+        self._mode = None  # 'array' or 'ndjson', detected from the first byte
+        self._expect_value = True
+        self._done = False
+        self._pending = []  # (index, TaxRequest | error message)
+
+    def feed(self, data: bytes):
+        """Consume a chunk of the request body, yielding any finished NDJSON lines."""
+        if self._done:
+            return
+        try:
+            self._buffer += self._decoder.decode(data)
+        except UnicodeDecodeError as exc:
+            yield from self._abort(f"Invalid UTF-8: {exc}")
+            return
+        yield from self._parse(final=False)
+
+    def finish(self):
+        """Flush everything once the request body is exhausted."""
+        if not self._done:
+            try:
+                self._buffer += self._decoder.decode(b'', final=True)
+            except UnicodeDecodeError as exc:
+                yield from self._abort(f"Invalid UTF-8: {exc}")
+                return
+            yield from self._parse(final=True)
+            if not self._done and self._mode == 'array':
+                yield from self._abort("Unterminated JSON array")
+                return
+        yield from self._flush()
+        self._done = True
+
+    def abort(self, message: str):
+        """Stop early: flush the rows read so far, then report message as a fatal error."""
+        if not self._done:
+            yield from self._abort(message)
+
+    # ---- parsing ----
+
+    def _parse(self, final: bool):
+        if self._mode is None:
+            stripped = self._buffer.lstrip(_WHITESPACE)
+            if not stripped:
+                self._buffer = ''
+                return
+            if stripped[0] == '[':
+                self._mode = 'array'
+                self._buffer = stripped[1:]
+            else:
+                self._mode = 'ndjson'
+                self._buffer = stripped
+
+        if self._mode == 'ndjson':
+            yield from self._parse_ndjson(final)
+        else:
+            yield from self._parse_array(final)
+
+    def _parse_ndjson(self, final: bool):
+        lines = self._buffer.split('\n')
+        self._buffer = '' if final else lines.pop()
+        if len(self._buffer) > self.max_record_bytes:
+            yield from self._abort(f"Row {self.rows} exceeds {self.max_record_bytes} bytes")
+            return
+
+        for line in lines:
+            if not line.strip(_WHITESPACE):
+                continue
+            try:
+                obj = json.loads(line)
+            except ValueError as exc:
+                yield from self._add_error(f"Invalid JSON: {exc}")
+                continue
+            yield from self._add(obj)
+
+    def _parse_array(self, final: bool):
+        buffer = self._buffer
+        pos = 0
+        while True:
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                pos += 1
+            if pos == len(buffer):
+                break
+
+            if not self._expect_value:
+                if buffer[pos] == ',':
+                    self._expect_value = True
+                    pos += 1
+                    continue
+                if buffer[pos] == ']':
+                    self._buffer = ''
+                    self._done = True
+                    return
+                self._buffer = ''
+                yield from self._abort(f"Expected ',' or ']' after row {self.rows - 1}")
+                return
+
+            if buffer[pos] == ']' and self.rows == 0:
+                self._buffer = ''
+                self._done = True
+                return
+
+            try:
+                obj, end = self._json.raw_decode(buffer, pos)
+            except ValueError as exc:
+                # Most likely the row continues in the next chunk
+                if not final and len(buffer) - pos <= self.max_record_bytes:
+                    break
+                self._buffer = ''
+                yield from self._abort(f"Invalid JSON in row {self.rows}: {exc}")
+                return
+            if end == len(buffer) and not final:
+                # A bare number could still be cut short; wait for more input
+                break
+
+            pos = end
+            self._expect_value = False
+            yield from self._add(obj)
+
+        self._buffer = buffer[pos:]
+
+    def _abort(self, message: str):
+        self._done = True
+        yield from self._flush()
+        yield _encode({"index": self.rows, "error": message})
+
+    # ---- rows ----
+
+    def _add(self, obj):
+        try:
+            request = TaxRequest.model_validate(obj)
+        except ValidationError as exc:
+            yield from self._add_error(_validation_message(exc))
+            return
+        yield from self._append(request)
+
+    def _add_error(self, message: str):
+        yield from self._append(message)
+
+    def _append(self, item):
+        self._pending.append((self.rows, item))
+        self.rows += 1
+        if len(self._pending) >= self.chunk_size:
+            yield from self._flush()
+
+    def _flush(self):
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+
+        requests = [item for _, item in pending if isinstance(item, TaxRequest)]
+        lines = iter(())
+        if requests:
+            started = time.perf_counter()
+            columns = {}
+            for name in SALARY_FIELDS:
+                columns[name] = np.fromiter((getattr(r.salary, name) for r in requests), np.float64, len(requests))
+            for name in INVESTMENT_FIELDS:
+                columns[name] = np.fromiter((getattr(r.investments, name) for r in requests), np.float64, len(requests))
+            lines = iter(self.compute(columns, [profile_of(r) for r in requests]))
+            metrics.record_batch('batch', len(requests), time.perf_counter() - started)
+
+        for index, item in pending:
+            if isinstance(item, TaxRequest):
+                yield next(lines)
+            else:
+                yield _encode({"index": index, "error": item})
+
+
+def stream_batch(chunks, chunk_size: int = CHUNK_SIZE):
+    """Run an iterable of request body chunks through a BatchStream."""
+    stream = BatchStream(chunk_size=chunk_size)
+    for chunk in chunks:
+        yield from stream.feed(chunk)
+    yield from stream.finish()
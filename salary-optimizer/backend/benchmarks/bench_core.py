@@ -0,0 +1,118 @@
+"""
+Per-request adapter overhead: the old per-framework paths vs the shared tax_core.
+
+The "before" functions reproduce what the Django view and the FastAPI route
+did around the engine (serializer round trips, SimpleNamespaces, validated
+Pydantic results); the arithmetic itself is the same in both columns. The
+Vercel handler already used plain dicts, so only its decode/encode is shown.
+
+Run from backend/:  python benchmarks/bench_core.py [--number N]
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'salary_optimizer.settings')
+
+import django
+from pydantic import TypeAdapter
+
+django.setup()
+
+import tax_core
+from api.serializers import ComparisonResponseSerializer, TaxRequestSerializer
+from models import ComparisonResponse, TaxRequest, TaxResult
+
+PAYLOAD = {
+    "salary": {
+        "basic": 500000, "hra": 200000, "special_allowance": 100000, "lta": 50000,
+        "variable_pay": 100000, "other_allowances": 50000, "pf_deduction": 21600,
+        "professional_tax": 2400,
+    },
+    "investments": {
+        "section_80c": 150000, "section_80d": 25000, "hra_rent_paid": 180000,
+        "nps_self": 50000, "nps_employer": 0, "home_loan_interest": 0,
+    },
+}
+BODY = json.dumps(PAYLOAD).encode()
+
+
+def _validated_comparison(result: tax_core.ComparisonResult) -> ComparisonResponse:
+    # What tax_engine used to do: build and validate a Pydantic object per result
+    return ComparisonResponse(
+        old_regime=TaxResult(**result.old_regime.as_dict()),
+        new_regime=TaxResult(**result.new_regime.as_dict()),
+    )
+
+
+def legacy_django():
+    serializer = TaxRequestSerializer(data=json.loads(BODY))
+    serializer.is_valid(raise_exception=True)
+    data = serializer.validated_data
+    salary = SimpleNamespace(**data['salary'])
+    investments = SimpleNamespace(**data['investments'])
+    result = _validated_comparison(tax_core.compare(tax_core.TaxInputs.from_objects(salary, investments)))
+    out = ComparisonResponseSerializer(data={
+        'old_regime': result.old_regime.model_dump(),
+        'new_regime': result.new_regime.model_dump(),
+    })
+    out.is_valid(raise_exception=True)
+    return json.dumps(out.data).encode()
+
+
+_response_model = TypeAdapter(ComparisonResponse)
+
+
+def legacy_fastapi():
+    # Route returning a model with response_model set: FastAPI re-validates
+    # the return value, dumps it to python and JSONResponse encodes that
+    request = TaxRequest.model_validate_json(BODY)
+    inputs = tax_core.TaxInputs.from_objects(request.salary, request.investments)
+    result = _response_model.validate_python(_validated_comparison(tax_core.compare(inputs)))
+    content = _response_model.dump_python(result, mode='json')
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(',', ':')).encode()
+
+
+_out = tax_core.ComparisonResult()
+
+
+def core_django():
+    return tax_core.compare(tax_core.decode_request(json.loads(BODY)), _out).to_json()
+
+
+def core_fastapi():
+    request = TaxRequest.model_validate_json(BODY)
+    return tax_core.compare(tax_core.TaxInputs.from_objects(request.salary, request.investments), _out).to_json()
+
+
+def core_vercel():
+    data = json.loads(BODY)
+    return tax_core.compare(tax_core.TaxInputs.from_mapping(data['salary'], data['investments']), _out).to_json()
+
+
+def _per_call(fn, number: int) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--number', type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'adapter':<10}{'before (us)':>14}{'after (us)':>14}{'speedup':>10}")
+    for name, before, after in (
+        ('django', legacy_django, core_django),
+        ('fastapi', legacy_fastapi, core_fastapi),
+    ):
+        assert json.loads(before()) == json.loads(after())
+        b, a = _per_call(before, args.number), _per_call(after, args.number)
+        print(f"{name:<10}{b:>14.1f}{a:>14.1f}{b / a:>9.1f}x")
+    print(f"{'vercel':<10}{'':>14}{_per_call(core_vercel, args.number):>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark suite for the tax engine and the HTTP layers (pytest-benchmark).
+
+Needs pytest and pytest-benchmark. Run from backend/:
+
+    pytest benchmarks --benchmark-save=baseline      # record a baseline
+    pytest benchmarks --benchmark-compare            # gate against the latest one
+
+Baselines live in benchmarks/.baselines/<machine>/. When comparing, any
+benchmark whose median is more than --regression-threshold percent slower
+(default 20, or $BENCHMARK_REGRESSION_THRESHOLD) fails the run. An explicit
+--benchmark-compare-fail expression takes precedence.
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'salary_optimizer.settings')
+
+POPULATION_SIZE = 1000
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        '--regression-threshold',
+        type=float,
+        default=float(os.environ.get('BENCHMARK_REGRESSION_THRESHOLD', 20)),
+        help='Fail --benchmark-compare runs when a median regresses by more than this percentage.',
+    )
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_configure(config):
+    from pytest_benchmark.utils import parse_compare_fail
+
+    if config.option.benchmark_storage == 'file://./.benchmarks':
+        config.option.benchmark_storage = 'file://' + os.path.join(BENCHMARK_DIR, '.baselines')
+    if config.option.benchmark_compare and not config.option.benchmark_compare_fail:
+        threshold = config.getoption('regression_threshold')
+        config.option.benchmark_compare_fail = [parse_compare_fail(f'median:{threshold:g}%')]
+
+    import django
+    from django.test.utils import setup_test_environment
+
+    django.setup()
+    setup_test_environment()
+
+
+def synthetic_population(size: int, seed: int = 7) -> dict:
+    """
+    Columns of a realistic salaried workforce: CTC is log-normal around 12L
+    (most between 5L and 40L), split into the usual components, with
+    investment declarations that scale with pay.
+    """
+    rng = np.random.default_rng(seed)
+    ctc = np.clip(rng.lognormal(np.log(1200000), 0.6, size), 300000, 20000000).round(-3)
+    basic = (ctc * rng.uniform(0.35, 0.5, size)).round()
+    hra = (basic * rng.choice([0.4, 0.5], size)).round()
+    lta = np.where(rng.random(size) < 0.4, rng.choice([20000, 50000], size), 0).astype(float)
+    variable_pay = (ctc * rng.uniform(0, 0.15, size)).round()
+    nps_employer = np.where(rng.random(size) < 0.2, (basic * 0.1).round(), 0)
+    special_allowance = np.maximum(ctc - basic - hra - lta - variable_pay - nps_employer, 0)
+    return {
+        'basic': basic,
+        'hra': hra,
+        'special_allowance': special_allowance,
+        'lta': lta,
+        'variable_pay': variable_pay,
+        'other_allowances': np.zeros(size),
+        'pf_deduction': np.minimum(basic * 0.12, 21600).round(),
+        'professional_tax': np.full(size, 2400.0),
+        'section_80c': rng.choice([0, 50000, 100000, 150000], size).astype(float),
+        'section_80d': rng.choice([0, 25000, 50000], size).astype(float),
+        'hra_rent_paid': np.where(rng.random(size) < 0.6, (hra * rng.uniform(0.8, 2.0, size)).round(), 0),
+        'nps_self': rng.choice([0, 50000], size, p=[0.8, 0.2]).astype(float),
+        'nps_employer': nps_employer,
+        'home_loan_interest': np.where(rng.random(size) < 0.15, rng.uniform(50000, 250000, size).round(), 0),
+    }
+
+
+@pytest.fixture(scope='session')
+def population() -> dict:
+    return synthetic_population(POPULATION_SIZE)
+
+
+@pytest.fixture(scope='session')
+def payloads(population) -> list:
+    from tax_core import INVESTMENT_FIELDS, SALARY_FIELDS
+
+    rows = []
+    for i in range(POPULATION_SIZE):
+        rows.append({
+            'salary': {name: float(population[name][i]) for name in SALARY_FIELDS},
+            'investments': {name: float(population[name][i]) for name in INVESTMENT_FIELDS},
+        })
+    return rows
@@ -0,0 +1,123 @@
+"""
+Cold-start import cost of each deployable entry point, via `python -X importtime`.
+
+Every entry is imported in a fresh interpreter (several runs, best kept) and
+the per-module self/cumulative times are aggregated into one report:
+
+    python benchmarks/importtime.py                   # table per entry
+    python benchmarks/importtime.py --top 25 --json importtime.json
+    python benchmarks/importtime.py --budget-ms serverless=80
+
+--budget-ms ENTRY=MS exits non-zero when an entry's total import time
+exceeds MS, so CI can track cold-start regressions.
+
+Run from backend/.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# name -> (working directory, statement)
+ENTRIES = {
+    'serverless': (BACKEND, 'import serverless'),
+    'vercel_calculate': (os.path.join(BACKEND, 'api'), 'import calculate'),
+    'vercel_index': (os.path.join(BACKEND, '..', 'api'), 'import index'),
+    'fastapi_main': (BACKEND, 'import main'),
+    'tax_core': (BACKEND, 'import tax_core'),
+}
+
+
+def parse_importtime(stderr: str) -> list:
+    """(module, self_us, cumulative_us, depth) per line of -X importtime output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def subtree(rows: list, target: str) -> list:
+    # Output is post-order: a top-level import is preceded by everything it pulled in
+    start = 0
+    for i, (name, _, _, depth) in enumerate(rows):
+        if depth == 0:
+            if name == target:
+                return rows[start:i + 1]
+            start = i + 1
+    return []
+
+
+def measure(cwd: str, statement: str, runs: int) -> dict:
+    """Best-of-runs import profile of the statement's module and everything it imports."""
+    best = None
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', statement],
+            cwd=cwd, capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(f"{statement!r} failed:\n{proc.stderr[-2000:]}")
+        # The interpreter's own startup (site, encodings) is the same for every entry and left out
+        rows = subtree(parse_importtime(proc.stderr), statement.split()[-1])
+        total = rows[-1][2] if rows else 0
+        if best is None or total < best['total_us']:
+            best = {'total_us': total, 'modules': rows}
+    return best
+
+
+def report(name: str, result: dict, top: int) -> None:
+    print(f"\n{name}: {result['total_us'] / 1000:.1f} ms")
+    print(f"  {'cumulative ms':>13} {'self ms':>9}  module")
+    modules = sorted(result['modules'], key=lambda row: row[2], reverse=True)
+    for module, self_us, cumulative_us, depth in modules[:top]:
+        print(f"  {cumulative_us / 1000:>13.1f} {self_us / 1000:>9.1f}  {module}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('entries', nargs='*', metavar='ENTRY',
+                        help=f"Entries to measure (default: all of {', '.join(ENTRIES)})")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--json', metavar='PATH', help='Also write totals and per-module times here')
+    parser.add_argument('--budget-ms', action='append', default=[], metavar='ENTRY=MS')
+    args = parser.parse_args()
+    for name in args.entries:
+        if name not in ENTRIES:
+            parser.error(f"Unknown entry {name!r}")
+
+    results = {}
+    for name in args.entries or ENTRIES:
+        cwd, statement = ENTRIES[name]
+        results[name] = measure(cwd, statement, args.runs)
+        report(name, results[name], args.top)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({
+                name: {
+                    'total_ms': result['total_us'] / 1000,
+                    'modules': {module: {'self_ms': s / 1000, 'cumulative_ms': c / 1000}
+                                for module, s, c, _ in result['modules']},
+                }
+                for name, result in results.items()
+            }, f, indent=2)
+
+    failed = False
+    for budget in args.budget_ms:
+        name, _, limit = budget.partition('=')
+        if name in results and results[name]['total_us'] / 1000 > float(limit):
+            print(f"\n{name} imports in {results[name]['total_us'] / 1000:.1f} ms, over its {limit} ms budget")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
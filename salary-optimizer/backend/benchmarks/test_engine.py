@@ -0,0 +1,132 @@
+import tax_core
+import tax_engine
+from batch_engine import compare_tax_regimes_batch
+from models import TaxRequest
+from tax_core import TaxInputs
+
+
+def _inputs(payloads):
+    return [TaxInputs.from_mapping(row['salary'], row['investments']) for row in payloads]
+
+
+def test_core_new_regime(benchmark, payloads):
+    rows = [(inputs, tax_core.gross_salary(inputs)) for inputs in _inputs(payloads)]
+    out = tax_core.RegimeResult()
+
+    def run():
+        for inputs, gross in rows:
+            tax_core.calculate_new_regime(inputs, gross, out)
+
+    benchmark(run)
+
+
+def test_core_old_regime(benchmark, payloads):
+    rows = [(inputs, tax_core.gross_salary(inputs)) for inputs in _inputs(payloads)]
+    out = tax_core.RegimeResult()
+
+    def run():
+        for inputs, gross in rows:
+            tax_core.calculate_old_regime(inputs, gross, out)
+
+    benchmark(run)
+
+
+def test_core_compare(benchmark, payloads):
+    rows = _inputs(payloads)
+    out = tax_core.ComparisonResult()
+
+    def run():
+        for inputs in rows:
+            tax_core.compare(inputs, out)
+
+    benchmark(run)
+
+
+def test_pydantic_compare(benchmark, payloads):
+    requests = [TaxRequest.model_validate(row) for row in payloads]
+
+    def run():
+        for request in requests:
+            tax_engine.compare_tax_regimes(request)
+
+    benchmark(run)
+
+
+def test_batch_compare(benchmark, population):
+    result = benchmark(compare_tax_regimes_batch, population)
+    assert result['new_regime']['total_tax'].shape == population['basic'].shape
+
+
+def test_fixed_point_batch(benchmark, population):
+    import fixed_point
+
+    result = benchmark(fixed_point.compare_tax_regimes_batch, population)
+    assert result['new_regime']['total_tax'].dtype == 'int64'
+
+
+def test_monte_carlo_10k_paths(benchmark, payloads):
+    import monte_carlo
+    from models import MonteCarloRequest
+
+    request = MonteCarloRequest(base=payloads[0], paths=10000, years=10)
+    result = benchmark(monte_carlo.simulate, request)
+    assert len(result['years']) == 10
+
+
+def test_budget_plan(benchmark, population):
+    from budget_planner import plan_columns
+    from tax_core import EARNING_FIELDS
+
+    cost = sum(population[name].sum() for name in EARNING_FIELDS) + population['nps_employer'].sum()
+    result = benchmark(plan_columns, population, cost + 0.05 * population['basic'].sum())
+    assert result['planned_cost'] <= cost + 0.05 * population['basic'].sum()
+
+
+def test_sweep_500x500(benchmark, payloads):
+    from models import SweepRequest
+    from sweep import sweep
+
+    request = SweepRequest.model_validate({
+        'base': payloads[0],
+        'axes': [
+            {'field': 'gross_salary', 'start': 500000, 'stop': 5490000, 'step': 10000},
+            {'field': 'hra_rent_paid', 'start': 0, 'stop': 499000, 'step': 1000},
+        ],
+    })
+    result = benchmark(sweep, request)
+    assert len(result['new_regime']['total_tax']) == 500
+
+
+def test_tds_monthly_run(benchmark, population):
+    # A company-wide run for October: seven months paid, five projected
+    import numpy as np
+    from tax_core import INVESTMENT_FIELDS, SALARY_FIELDS
+    from tds import monthly_run, projected_columns
+
+    month = 6
+    monthly = {name: population[name] / 12 for name in SALARY_FIELDS}
+    to_date = {name: values * month for name, values in monthly.items()}
+    annual = {name: population[name] for name in INVESTMENT_FIELDS}
+    size = population['basic'].shape[0]
+    tds_paid = np.zeros(size)
+    old_regime = np.arange(size) % 3 == 0
+
+    def run():
+        return monthly_run(projected_columns(to_date, monthly, month, annual), month, tds_paid, old_regime)
+
+    result = benchmark(run)
+    assert result['tds'].shape == (size,)
+
+
+def test_delta_slider(benchmark, payloads):
+    # One 80C slider step against a cached state, versus test_core_compare's full recompute
+    import delta
+
+    states = [delta._full(inputs) for inputs in _inputs(payloads)]
+    changes = {'section_80c': 100000.0}
+
+    def run():
+        for state in states:
+            delta.apply(state, changes)
+
+    benchmark(run)
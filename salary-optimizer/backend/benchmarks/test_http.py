@@ -0,0 +1,106 @@
+import io
+import itertools
+import json
+from unittest import mock
+
+from django.test import Client
+from fastapi.testclient import TestClient
+
+import main
+from api.calculate import handler
+from api.views import CalculateTaxView
+from tax_cache import TaxCache
+
+# One request per benchmark round, cycling through the synthetic population.
+# The uncached variants disable the result cache so every round reaches the
+# engine; the cached ones replay a single payload.
+
+
+def _bodies(payloads):
+    return itertools.cycle([json.dumps(row).encode() for row in payloads])
+
+
+def test_fastapi_calculate(benchmark, payloads):
+    client = TestClient(main.app)
+    bodies = _bodies(payloads)
+
+    def run():
+        return client.post('/api/calculate', content=next(bodies), headers={'Content-Type': 'application/json'})
+
+    with mock.patch.object(main, 'result_cache', TaxCache(maxsize=0)):
+        response = benchmark(run)
+    assert response.status_code == 200
+
+
+def test_fastapi_calculate_cached(benchmark, payloads):
+    client = TestClient(main.app)
+    body = json.dumps(payloads[0]).encode()
+
+    with mock.patch.object(main, 'result_cache', TaxCache()):
+        response = benchmark(client.post, '/api/calculate', content=body,
+                             headers={'Content-Type': 'application/json'})
+    assert response.status_code == 200
+
+
+def test_fastapi_ws_patch(benchmark, payloads):
+    # One slider step over /ws/calculate, versus a full POST per change
+    client = TestClient(main.app)
+    steps = itertools.cycle([json.dumps({'changes': {'section_80c': value}}) for value in (50000, 100000, 150000)])
+
+    with client.websocket_connect('/ws/calculate') as ws:
+        ws.send_json({'request': payloads[0]})
+        ws.receive_json()
+
+        def run():
+            ws.send_text(next(steps))
+            return ws.receive_json()
+
+        reply = benchmark(run)
+    assert 'changes' in reply
+
+
+def test_django_calculate(benchmark, payloads):
+    client = Client()
+    bodies = _bodies(payloads)
+
+    def run():
+        return client.post('/api/calculate', data=next(bodies), content_type='application/json')
+
+    with mock.patch.object(CalculateTaxView, 'result_cache', TaxCache(maxsize=0)):
+        response = benchmark(run)
+    assert response.status_code == 200
+
+
+def test_django_calculate_cached(benchmark, payloads):
+    client = Client()
+    body = json.dumps(payloads[0]).encode()
+
+    with mock.patch.object(CalculateTaxView, 'result_cache', TaxCache()):
+        response = benchmark(client.post, '/api/calculate', data=body, content_type='application/json')
+    assert response.status_code == 200
+
+
+class _VercelRequest(handler):
+    # Drives handler.do_POST without a socket
+    def __init__(self, body: bytes):
+        self.rfile = io.BytesIO(body)
+        self.wfile = io.BytesIO()
+        self.headers = {'Content-Length': str(len(body))}
+        self.request_version = 'HTTP/1.1'
+        self.requestline = 'POST /api/calculate HTTP/1.1'
+        self.command = 'POST'
+
+    def log_message(self, format, *args):
+        pass
+
+
+def test_vercel_calculate(benchmark, payloads):
+    bodies = _bodies(payloads)
+
+    def run():
+        request = _VercelRequest(next(bodies))
+        request.do_POST()
+        return request.wfile.getvalue()
+
+    response = benchmark(run)
+    assert response.startswith(b'HTTP/1.0 200')
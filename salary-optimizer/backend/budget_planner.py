@@ -0,0 +1,178 @@
+import numpy as np
+
+from batch_engine import (INVESTMENT_FIELDS, SALARY_FIELDS, compare_tax_regimes_batch, compare_tax_regimes_grouped,
+                          load_columns)
+from models import PlanPolicy, PlanRequest
+from tax_core import EARNING_FIELDS, profile_of
+
+# Org-wide CTC budget planner.
+#
+# An employee's cost is their CTC (earnings plus NPS Employer), and their
+# value is what they receive: yearly in-hand pay under the better regime
+# plus the employer NPS deposited in their account. Within the policy bands:
+#   - HRA and LTA are re-split out of the special allowance. This is cost
+#     neutral and never lowers in-hand pay (it only raises old-regime
+#     exemptions), so like the single-structure optimizer, HRA is filled to
+#     its band, then LTA.
+#   - Employer NPS (80CCD(2)) is the lever that moves cost. Every rupee adds
+#     a rupee of value plus the tax it saves, so it is worth the most to
+#     employees in high brackets.
+#
+# Each employee gets policy.nps_levels contribution levels across the band,
+# all scored in one batch-engine pass. The shared budget is the Lagrangian
+# relaxation solved greedily. Each employee's (cost, value) levels are
+# reduced to their upper concave hull, whose steps have falling value per
+# rupee. Everyone starts at the bottom of the band, and hull steps from all
+# employees are funded in order of value per rupee while they fit; an
+# employee whose next step doesn't fit gets no further steps. marginal_value
+# is the ratio of the last step funded, i.e. the budget's shadow price.
+
+PLAN_FIELDS = ('hra', 'lta', 'special_allowance', 'nps_employer')
+
+
+def _restructure(c: dict, policy: PlanPolicy) -> dict:
+    # HRA to its band, then LTA, out of the flexible pool; the rest stays special allowance
+    pool = c['hra'] + c['lta'] + c['special_allowance']
+    hra = np.minimum(np.floor(policy.max_hra_pct * c['basic']), pool)
+    lta = np.minimum(policy.lta_cap, pool - hra)
+    return {**c, 'hra': hra, 'lta': lta, 'special_allowance': pool - hra - lta}
+
+
+def _evaluate(columns: dict, profiles) -> tuple:
+    if profiles is None:
+        result = compare_tax_regimes_batch(columns)
+    else:
+        result = compare_tax_regimes_grouped(columns, profiles)
+    old = result['old_regime']['in_hand_monthly'] * 12
+    new = result['new_regime']['in_hand_monthly'] * 12
+    return np.maximum(old, new), old > new
+
+
+def _hull_steps(costs: np.ndarray, values: np.ndarray):
+    """(level, cost, gain) steps along the upper concave hull of one employee's levels, from level 0."""
+    hull = [0]
+    for k in range(1, len(costs)):
+        if costs[k] <= costs[hull[-1]]:
+            continue
+        while len(hull) >= 2:
+            a, b = hull[-2], hull[-1]
+            # Drop b when it lies below the chord from a to k; collinear levels stay as separate steps
+            if (values[b] - values[a]) * (costs[k] - costs[a]) < (values[k] - values[a]) * (costs[b] - costs[a]):
+                hull.pop()
+            else:
+                break
+        hull.append(k)
+    for a, b in zip(hull, hull[1:]):
+        gain = values[b] - values[a]
+        if gain <= 0:
+            break
+        yield b, costs[b] - costs[a], gain
+
+
+def plan_columns(columns, budget: float, policy: PlanPolicy = PlanPolicy(), profiles=None) -> dict:
+    """
+    Plan over input columns (see batch_engine.load_columns), one RuleProfile
+    per row in profiles when they differ. Returns the planned PLAN_FIELDS
+    columns plus per-row before/after figures and the totals.
+    """
+    if not 0 <= policy.min_nps_employer_pct <= policy.max_nps_employer_pct:
+        raise ValueError("NPS employer band must satisfy 0 <= min <= max")
+    if policy.nps_levels < 2:
+        raise ValueError("nps_levels must be at least 2")
+
+    c = load_columns(columns)
+    size = c['basic'].shape[0]
+    earnings = sum(c[name] for name in EARNING_FIELDS)
+    current_cost = float((earnings + c['nps_employer']).sum())
+    value_before = _evaluate(c, profiles)[0] + c['nps_employer']
+
+    # Every employee at every NPS level, level-major so row k * size + i is employee i at level k
+    levels = policy.nps_levels
+    fractions = np.linspace(policy.min_nps_employer_pct, policy.max_nps_employer_pct, levels)
+    nps = np.floor(fractions[:, None] * c['basic'][None, :])
+    restructured = _restructure(c, policy)
+    grid = {name: np.tile(values, levels) for name, values in restructured.items()}
+    grid['nps_employer'] = nps.ravel()
+    in_hand, old_better = _evaluate(grid, None if profiles is None else list(profiles) * levels)
+    values = (in_hand + grid['nps_employer']).reshape(levels, size)
+
+    base_cost = float(earnings.sum() + nps[0].sum())
+    if budget < base_cost:
+        raise ValueError(f"Budget is below the lowest cost the NPS band allows ({base_cost:,.0f})")
+
+    steps = []
+    for i in range(size):
+        for level, cost, gain in _hull_steps(nps[:, i], values[:, i]):
+            steps.append((gain / cost if cost > 0 else np.inf, i, level, cost))
+    # Stable sort: an employee's own steps stay in hull order on equal ratios
+    steps.sort(key=lambda step: -step[0])
+
+    chosen = np.zeros(size, dtype=np.int64)
+    blocked = np.zeros(size, dtype=bool)
+    remaining = budget - base_cost
+    marginal_value = 0.0
+    for ratio, i, level, cost in steps:
+        if blocked[i]:
+            continue
+        if cost > remaining:
+            blocked[i] = True
+            continue
+        remaining -= cost
+        chosen[i] = level
+        marginal_value = ratio
+
+    rows = np.arange(size)
+    pick = chosen * size + rows
+    planned = {name: restructured[name] for name in ('hra', 'lta', 'special_allowance')}
+    planned['nps_employer'] = nps[chosen, rows]
+    value_after = values[chosen, rows]
+    return {
+        **planned,
+        'old_better': old_better[pick],
+        'in_hand_before': value_before - c['nps_employer'],
+        'in_hand_after': in_hand[pick],
+        'value_change': value_after - value_before,
+        'cost_change': planned['nps_employer'] - c['nps_employer'],
+        'current_cost': current_cost,
+        'planned_cost': float((earnings + planned['nps_employer']).sum()),
+        'value_before': float(value_before.sum()),
+        'value_after': float(value_after.sum()),
+        'marginal_value': float(marginal_value),
+    }
+
+
+def plan(request: PlanRequest) -> dict:
+    """PlanResponse-shaped dict for a PlanRequest."""
+    employees = request.employees
+    if not employees:
+        raise ValueError("No employees to plan")
+    columns = {}
+    for name in SALARY_FIELDS:
+        columns[name] = np.fromiter((getattr(e.salary, name) for e in employees), np.float64, len(employees))
+    for name in INVESTMENT_FIELDS:
+        columns[name] = np.fromiter((getattr(e.investments, name) for e in employees), np.float64, len(employees))
+    result = plan_columns(columns, request.budget, request.policy, [profile_of(e) for e in employees])
+
+    per_row = {name: result[name].tolist() for name in
+               PLAN_FIELDS + ('old_better', 'in_hand_before', 'in_hand_after', 'value_change', 'cost_change')}
+    recommendations = [
+        {
+            'id': e.id,
+            **{name: per_row[name][i] for name in PLAN_FIELDS},
+            'regime': 'Old' if per_row['old_better'][i] else 'New',
+            'in_hand_before': per_row['in_hand_before'][i],
+            'in_hand_after': per_row['in_hand_after'][i],
+            'value_change': per_row['value_change'][i],
+            'cost_change': per_row['cost_change'][i],
+        }
+        for i, e in enumerate(employees)
+    ]
+    return {
+        'budget': request.budget,
+        'current_cost': result['current_cost'],
+        'planned_cost': result['planned_cost'],
+        'value_before': result['value_before'],
+        'value_after': result['value_after'],
+        'marginal_value': result['marginal_value'],
+        'recommendations': recommendations,
+    }
@@ -0,0 +1,75 @@
+import json
+import math
+import os
+
+# JSON encode/decode for the hot request paths.
+#
+# Uses msgspec or orjson when installed and falls back to the standard
+# library otherwise; JSON_CODEC=msgspec|orjson|json pins one. Every backend
+# emits compact output with the same keys in the same order, so responses
+# look the same to clients whichever one is active. Only the optional
+# imports live here, which keeps tax_core and the Vercel handler
+# stdlib-only.
+
+_PREFERENCE = ('msgspec', 'orjson', 'json')
+
+
+def _load_backend(requested: str):
+    names = _PREFERENCE if requested in ('', 'auto') else (requested,)
+    for name in names:
+        if name == 'msgspec':
+            try:
+                import msgspec
+            except ImportError:
+                continue
+            encoder = msgspec.json.Encoder()
+
+            def decode(data, _decode=msgspec.json.decode, _error=msgspec.DecodeError):
+                try:
+                    return _decode(data)
+                except _error as e:
+                    raise ValueError(str(e)) from None
+
+            return name, decode, encoder.encode
+        if name == 'orjson':
+            try:
+                import orjson
+            except ImportError:
+                continue
+            return name, orjson.loads, orjson.dumps
+        if name == 'json':
+            return name, json.loads, _stdlib_dumps
+        raise ValueError(f"Unknown JSON_CODEC {requested!r}")
+    # Pinned library is not installed
+    return 'json', json.loads, _stdlib_dumps
+
+
+def _stdlib_dumps(obj) -> bytes:
+    try:
+        return json.dumps(obj, separators=(',', ':'), allow_nan=False).encode()
+    except ValueError:
+        # NaN/Infinity are not JSON; write null for them as orjson and msgspec do
+        return json.dumps(_finite(obj), separators=(',', ':'), allow_nan=False).encode()
+
+
+def _finite(obj):
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {key: _finite(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_finite(value) for value in obj]
+    return obj
+
+
+BACKEND, _loads, _dumps = _load_backend(os.environ.get('JSON_CODEC', 'auto').lower())
+
+
+def loads(data):
+    """Decode a JSON document from bytes or str; raises ValueError if malformed."""
+    return _loads(data)
+
+
+def dumps(obj) -> bytes:
+    """Compact JSON encoding of plain dicts, lists, strings and numbers."""
+    return _dumps(obj)
@@ -0,0 +1,221 @@
+import os
+import threading
+
+import codec
+import tax_core
+from metrics import registry, stage
+from tax_cache import TaxCache, canonical_inputs, canonical_key
+from tax_core import (EARNING_FIELDS, INVESTMENT_FIELDS, NEW_REGIME_FIELDS, PROFILE_FIELDS, SALARY_FIELDS,
+                      InvalidInput, TaxInputs, decode_number, decode_profile)
+
+# Incremental recompute for slider traffic (POST /api/calculate/delta).
+#
+# A full request returns its result plus a token. The token is the request's
+# canonical key, so it is the same on every worker. The state behind it
+# (canonical inputs, gross salary and both regime results) is kept in a
+# TaxCache. Later requests send {"token", "changes": {field: value}} and only
+# the pieces a change can reach are recomputed:
+#   - gross salary only for earning fields,
+#   - the new regime only for fields it reads (tax_core.NEW_REGIME_FIELDS),
+#   - the old regime for any change.
+# Moving the 80C slider therefore re-runs one regime and skips gross. The
+# results are the ones tax_core.compare gives for the same canonical inputs.
+# An unknown or expired token raises UnknownToken, and the client then
+# resends the full request.
+#
+# LiveSession runs the same recompute for the /ws/calculate WebSocket. The
+# state lives on the connection instead of behind a token, and each patch
+# is answered with only the result fields that changed.
+
+INPUT_FIELDS = SALARY_FIELDS + INVESTMENT_FIELDS
+
+
+class UnknownToken(LookupError):
+    pass
+
+
+class DeltaState:
+    __slots__ = ('inputs', 'gross', 'result')
+
+    def __init__(self, inputs: TaxInputs, gross: float, result: tax_core.ComparisonResult):
+        self.inputs = inputs
+        self.gross = gross
+        self.result = result
+
+
+_states = None
+_states_lock = threading.Lock()
+
+
+def state_cache() -> TaxCache:
+    """Process-wide token -> DeltaState cache, sized by DELTA_CACHE_SIZE and DELTA_CACHE_TTL."""
+    global _states
+    with _states_lock:
+        if _states is None:
+            _states = TaxCache(
+                maxsize=int(os.environ.get("DELTA_CACHE_SIZE", 4096)),
+                ttl=float(os.environ.get("DELTA_CACHE_TTL", 900)),
+            )
+            registry.register_cache('delta', _states)
+        return _states
+
+
+def _full(inputs: TaxInputs) -> DeltaState:
+    gross = tax_core.gross_salary(inputs)
+    result = tax_core.ComparisonResult.__new__(tax_core.ComparisonResult)
+    result.new_regime = tax_core.calculate_new_regime(inputs, gross)
+    result.old_regime = tax_core.calculate_old_regime(inputs, gross)
+    return DeltaState(inputs, gross, result)
+
+
+def decode_changes(changes) -> dict:
+    """Validated {field: value} for a delta; profile fields are checked like a full request's."""
+    if not isinstance(changes, dict) or not changes:
+        raise InvalidInput({'changes': ['Expected a non-empty dictionary.']})
+    values, errors = {}, {}
+    for name, value in changes.items():
+        if name in PROFILE_FIELDS:
+            continue
+        if name not in INPUT_FIELDS:
+            errors[name] = ['Unknown field.']
+            continue
+        try:
+            values[name] = decode_number(value)
+        except (TypeError, ValueError):
+            errors[name] = ['A valid number is required.']
+    if errors:
+        raise InvalidInput({'changes': errors})
+    return values
+
+
+def _copy(inputs: TaxInputs) -> TaxInputs:
+    out = TaxInputs.__new__(TaxInputs)
+    for name in TaxInputs.__slots__:
+        setattr(out, name, getattr(inputs, name))
+    return out
+
+
+def apply(state: DeltaState, changes: dict, profile=None) -> DeltaState:
+    """State for state's inputs with changes (field -> float) applied, recomputing only what they reach."""
+    current = state.inputs
+    # State inputs are canonical already, so only the changed values need rounding
+    changed = {}
+    for name, value in changes.items():
+        value = float(round(value))
+        if value != getattr(current, name):
+            changed[name] = value
+    if profile is not None and profile != current.profile:
+        inputs = _copy(current)
+        for name, value in changed.items():
+            setattr(inputs, name, value)
+        inputs.profile = profile
+        return _full(inputs)
+    if not changed:
+        return state
+
+    inputs = _copy(current)
+    for name, value in changed.items():
+        setattr(inputs, name, value)
+    gross = tax_core.gross_salary(inputs) if changed.keys() & EARNING_FIELDS else state.gross
+    result = tax_core.ComparisonResult.__new__(tax_core.ComparisonResult)
+    if changed.keys() & NEW_REGIME_FIELDS:
+        result.new_regime = tax_core.calculate_new_regime(inputs, gross)
+    else:
+        result.new_regime = state.result.new_regime
+    # Every input reaches the old regime
+    result.old_regime = tax_core.calculate_old_regime(inputs, gross)
+    return DeltaState(inputs, gross, result)
+
+
+def _respond(cache: TaxCache, state: DeltaState) -> bytes:
+    token = canonical_key(state.inputs)
+    cache.set(token, state)
+    with stage('encode'):
+        return codec.dumps({'token': token, 'result': state.result.as_dict()})
+
+
+def start(inputs: TaxInputs, cache: TaxCache = None) -> bytes:
+    """{"token", "result"} JSON for a full request."""
+    cache = cache if cache is not None else state_cache()
+    with stage('compute'):
+        state = _full(canonical_inputs(inputs))
+    return _respond(cache, state)
+
+
+def update(data: dict, cache: TaxCache = None) -> bytes:
+    """{"token", "result"} JSON for a {"token", "changes"} body; raises InvalidInput or UnknownToken."""
+    cache = cache if cache is not None else state_cache()
+    token = data.get('token')
+    if not isinstance(token, str):
+        raise InvalidInput({'token': ['This field is required.']})
+    changes = data.get('changes')
+    with stage('decode'):
+        values = decode_changes(changes)
+
+    state = cache.get(token)
+    if state is None:
+        raise UnknownToken(token)
+    with stage('compute'):
+        state = apply(state, values, _changed_profile(state, changes))
+    return _respond(cache, state)
+
+
+def _changed_profile(state: DeltaState, changes: dict):
+    # The decoded profile when changes touch a profile field, else None
+    if not any(name in changes for name in PROFILE_FIELDS):
+        return None
+    current = dict(zip(PROFILE_FIELDS, state.inputs.profile))
+    return decode_profile({**current, **{k: v for k, v in changes.items() if k in PROFILE_FIELDS}})
+
+
+def changed_fields(before: tax_core.RegimeResult, after: tax_core.RegimeResult) -> dict:
+    """The as_dict() fields of after that differ from before."""
+    if after is before:
+        return {}
+    old = before.as_dict()
+    return {name: value for name, value in after.as_dict().items() if old[name] != value}
+
+
+class LiveSession:
+    """
+    Per-connection state for /ws/calculate. handle() takes one decoded
+    message and returns the reply dict:
+      {"request": TaxRequest}  -> {"result": ComparisonResponse}
+      {"changes": {field: value}} -> {"changes": {regime key: {changed fields}}}
+    An "id" in the message is echoed back. Invalid messages get {"error": ...}
+    and leave the state as it was.
+    """
+
+    def __init__(self):
+        self.state = None
+
+    def handle(self, message) -> dict:
+        if not isinstance(message, dict):
+            return {'error': {'non_field_errors': ['Expected a JSON object.']}}
+        reply = {'id': message['id']} if 'id' in message else {}
+        try:
+            if 'request' in message:
+                inputs = tax_core.decode_request(message['request'])
+                with stage('compute'):
+                    self.state = _full(canonical_inputs(inputs))
+                reply['result'] = self.state.result.as_dict()
+            elif 'changes' in message:
+                if self.state is None:
+                    raise InvalidInput({'non_field_errors': ['Send a full request before changes.']})
+                changes = message['changes']
+                with stage('decode'):
+                    values = decode_changes(changes)
+                before = self.state
+                with stage('compute'):
+                    self.state = apply(before, values, _changed_profile(before, changes))
+                patch = {}
+                for key in ('old_regime', 'new_regime'):
+                    fields = changed_fields(getattr(before.result, key), getattr(self.state.result, key))
+                    if fields:
+                        patch[key] = fields
+                reply['changes'] = patch
+            else:
+                raise InvalidInput({'non_field_errors': ['Expected "request" or "changes".']})
+        except InvalidInput as e:
+            reply['error'] = e.errors
+        return reply
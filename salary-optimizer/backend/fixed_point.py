@@ -0,0 +1,359 @@
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from typing import Mapping, NamedTuple, Tuple
+
+import numpy as np
+
+import tax_core
+from batch_engine import INPUT_FIELDS, _scatter, load_columns
+from tax_core import ComparisonResult, RegimeResult, TaxInputs
+from tax_rules import DEFAULT_PROFILE, RuleProfile, get_rules
+
+# Integer-paise arithmetic mode for both regimes, scalar and batch.
+#
+# Amounts are whole paise and rates are basis points, so every step is an
+# integer operation. The results are exact and the same on every run and
+# platform, with no float drift between slab products, cess and the
+# monthly division. Rounding follows the statute and happens at fixed points:
+#   - inputs are rounded to the paisa,
+#   - taxable income is rounded to the nearest Rs 10 (sec. 288A),
+#   - rate products and the monthly figure are rounded half up to the paisa,
+#   - total tax is rounded to the nearest Rs 10 (sec. 288B).
+# The total can therefore differ from the float engine (tax_core) by up to
+# about Rs 10. The float engine stays the default.
+#
+# The scalar functions mirror tax_core step for step. The batch functions
+# mirror them on int64 arrays, so bulk results match the scalar ones
+# exactly. Every amount here (fields and deductions_breakdown) is in paise;
+# as_rupees converts a result to the response shape. Products of paise and
+# basis points stay inside int64 for amounts up to MAX_RUPEES.
+
+PAISE = 100
+BASIS_POINTS = 10000
+ROUNDING_PAISE = 10 * PAISE
+MAX_RUPEES = 10 ** 12
+
+
+def to_paise(rupees: float) -> int:
+    return int(round(rupees * PAISE))
+
+
+def to_basis_points(rate: float) -> int:
+    return int(round(rate * BASIS_POINTS))
+
+
+def apply_rate(paise, basis_points):
+    """paise * rate rounded half up to the paisa; works on ints and int64 arrays."""
+    return (paise * basis_points + BASIS_POINTS // 2) // BASIS_POINTS
+
+
+def round_to_ten(paise):
+    """Nearest Rs 10, halves up (sec. 288A / 288B)."""
+    return (paise + ROUNDING_PAISE // 2) // ROUNDING_PAISE * ROUNDING_PAISE
+
+
+def monthly(paise):
+    return (paise + 6) // 12
+
+
+class FixedRules(NamedTuple):
+    fy: str
+    regime: str
+    breakpoints: Tuple[int, ...]
+    rates: Tuple[int, ...]
+    cumulative: Tuple[int, ...]
+    standard_deduction: int
+    rebate_limit: int
+    marginal_relief: bool
+    surcharge_thresholds: Tuple[int, ...]
+    surcharge_rates: Tuple[int, ...]
+    # Income tax plus surcharge due at each threshold, as in SurchargeSchedule.base
+    surcharge_base: Tuple[int, ...]
+    cess_rate: int
+    # Amount caps in paise, *_pct caps in basis points
+    caps: Mapping[str, int]
+
+    def income_tax(self, taxable_income: int) -> int:
+        if taxable_income <= self.rebate_limit:
+            return 0
+        i = bisect_right(self.breakpoints, taxable_income) - 1
+        tax = self.cumulative[i] + apply_rate(taxable_income - self.breakpoints[i], self.rates[i])
+        if self.marginal_relief:
+            tax = min(tax, taxable_income - self.rebate_limit)
+        return tax
+
+    def surcharge(self, taxable_income: int, tax: int) -> int:
+        i = bisect_left(self.surcharge_thresholds, taxable_income) - 1
+        if i < 0:
+            return 0
+        return min(apply_rate(tax, self.surcharge_rates[i]),
+                   self.surcharge_base[i] + (taxable_income - self.surcharge_thresholds[i]) - tax)
+
+
+@lru_cache(maxsize=None)
+def fixed_rules(regime: str, profile: RuleProfile = DEFAULT_PROFILE) -> FixedRules:
+    """The compiled RegimeRules for regime and profile in paise and basis points."""
+    rules = get_rules(regime, *profile)
+    slabs = rules.slabs
+    breakpoints = tuple(to_paise(b) for b in slabs.breakpoints)
+    rates = tuple(to_basis_points(r) for r in slabs.rates)
+    cumulative = [0]
+    for i in range(1, len(breakpoints)):
+        cumulative.append(cumulative[-1] + apply_rate(breakpoints[i] - breakpoints[i - 1], rates[i - 1]))
+    caps = {
+        name: to_basis_points(value) if name.endswith('_pct') else to_paise(value)
+        for name, value in rules.caps.items()
+    }
+
+    fixed = FixedRules(
+        fy=rules.fy,
+        regime=rules.regime,
+        breakpoints=breakpoints,
+        rates=rates,
+        cumulative=tuple(cumulative),
+        standard_deduction=to_paise(rules.standard_deduction),
+        rebate_limit=to_paise(rules.rebate_limit),
+        marginal_relief=rules.marginal_relief,
+        surcharge_thresholds=(),
+        surcharge_rates=(),
+        surcharge_base=(),
+        cess_rate=to_basis_points(rules.cess_rate),
+        caps=caps,
+    )
+    # Amount due at each threshold, recomputed in paise the way compile_surcharge does in rupees
+    for threshold, rate in zip(rules.surcharge.thresholds, rules.surcharge.rates):
+        threshold = to_paise(threshold)
+        tax = fixed.income_tax(threshold)
+        due = tax + fixed.surcharge(threshold, tax)
+        fixed = fixed._replace(
+            surcharge_thresholds=fixed.surcharge_thresholds + (threshold,),
+            surcharge_rates=fixed.surcharge_rates + (to_basis_points(rate),),
+            surcharge_base=fixed.surcharge_base + (due,),
+        )
+    return fixed
+
+
+# ---- Scalar ----
+
+def paise_inputs(inputs: TaxInputs) -> dict:
+    return {name: to_paise(getattr(inputs, name)) for name in INPUT_FIELDS}
+
+
+def gross_salary(p: dict) -> int:
+    return (
+        p['basic'] +
+        p['hra'] +
+        p['special_allowance'] +
+        p['lta'] +
+        p['variable_pay'] +
+        p['other_allowances']
+    )
+
+
+def _finish(out: RegimeResult, regime: str, rules: FixedRules, p: dict, gross: int,
+            deductions: dict, taxable_income: int, tax: int) -> RegimeResult:
+    surcharge = rules.surcharge(taxable_income, tax)
+    cess = apply_rate(tax + surcharge, rules.cess_rate)
+    total_tax = round_to_ten(tax + surcharge + cess)
+
+    out.regime = regime
+    out.gross_salary = gross
+    out.taxable_income = taxable_income
+    out.tax_amount = tax
+    out.surcharge = surcharge
+    out.cess = cess
+    out.total_tax = total_tax
+    out.in_hand_monthly = monthly(gross - p['pf_deduction'] - p['professional_tax'] - total_tax)
+    out.deductions_breakdown = deductions
+    return out
+
+
+def calculate_new_regime(p: dict, gross: int, profile: RuleProfile = DEFAULT_PROFILE,
+                         out: RegimeResult = None) -> RegimeResult:
+    rules = fixed_rules("new", profile)
+
+    deductions = {
+        'Standard Deduction': rules.standard_deduction,
+        'NPS Employer (80CCD(2))': p['nps_employer'],
+    }
+
+    taxable_income = round_to_ten(max(0, gross - sum(deductions.values())))
+    tax = rules.income_tax(taxable_income)
+
+    return _finish(out or RegimeResult(), "New", rules, p, gross, deductions, taxable_income, tax)
+
+
+def calculate_old_regime(p: dict, gross: int, profile: RuleProfile = DEFAULT_PROFILE,
+                         out: RegimeResult = None) -> RegimeResult:
+    rules = fixed_rules("old", profile)
+    caps = rules.caps
+
+    hra_exemption = max(0, min(
+        p['hra'],
+        p['hra_rent_paid'] - apply_rate(p['basic'], caps['hra_rent_basic_pct']),
+        apply_rate(p['basic'], caps['hra_basic_pct'])
+    ))
+
+    deductions = {
+        'Standard Deduction': rules.standard_deduction,
+        'Professional Tax': p['professional_tax'],
+        'HRA Exemption': hra_exemption,
+        'Section 80C': min(p['section_80c'] + p['pf_deduction'], caps['section_80c']),
+        'Section 80D': min(p['section_80d'], caps['section_80d']),
+        'NPS Self (80CCD(1B))': min(p['nps_self'], caps['nps_self']),
+        'NPS Employer (80CCD(2))': p['nps_employer'],
+        'Home Loan Interest': min(p['home_loan_interest'], caps['home_loan_interest']),
+        'LTA Exemption': min(p['lta'], caps['lta'])
+    }
+
+    taxable_income = round_to_ten(max(0, gross - sum(deductions.values())))
+    tax = rules.income_tax(taxable_income)
+
+    return _finish(out or RegimeResult(), "Old", rules, p, gross, deductions, taxable_income, tax)
+
+
+def compare(inputs: TaxInputs, out: ComparisonResult = None) -> ComparisonResult:
+    """Both regimes in paise, reusing out's result structs when given."""
+    if out is None:
+        out = ComparisonResult()
+    p = paise_inputs(inputs)
+    gross = gross_salary(p)
+    calculate_new_regime(p, gross, inputs.profile, out.new_regime)
+    calculate_old_regime(p, gross, inputs.profile, out.old_regime)
+    return out
+
+
+def as_rupees(result: ComparisonResult) -> dict:
+    """ComparisonResponse-shaped dict of a paise result."""
+    out = {}
+    for key, regime in (('old_regime', result.old_regime), ('new_regime', result.new_regime)):
+        row = regime.as_dict()
+        for name in tax_core.RESULT_FIELDS:
+            if name not in ('regime', 'deductions_breakdown'):
+                row[name] = row[name] / PAISE
+        row['deductions_breakdown'] = {label: value / PAISE for label, value in row['deductions_breakdown'].items()}
+        out[key] = row
+    return out
+
+
+# ---- Batch (int64) ----
+
+def load_paise(columns) -> dict:
+    """load_columns as int64 paise; raises ValueError past MAX_RUPEES, where int64 products could overflow."""
+    c = load_columns(columns)
+    for name, values in c.items():
+        if values.size and not np.all(np.abs(values) <= MAX_RUPEES):
+            raise ValueError(f"Column '{name}' has values beyond the fixed-point range of {MAX_RUPEES:,} rupees")
+    return {name: np.rint(values * PAISE).astype(np.int64) for name, values in c.items()}
+
+
+def income_tax_batch(rules: FixedRules, taxable_income: np.ndarray) -> np.ndarray:
+    breakpoints = np.asarray(rules.breakpoints, dtype=np.int64)
+    i = np.searchsorted(breakpoints, taxable_income, side='right') - 1
+    slab_tax = (np.take(np.asarray(rules.cumulative, dtype=np.int64), i)
+                + apply_rate(taxable_income - breakpoints[i], np.take(np.asarray(rules.rates, dtype=np.int64), i)))
+
+    if rules.marginal_relief:
+        slab_tax = np.minimum(slab_tax, taxable_income - rules.rebate_limit)
+    return np.where(taxable_income <= rules.rebate_limit, 0, slab_tax)
+
+
+def surcharge_batch(rules: FixedRules, taxable_income: np.ndarray, tax: np.ndarray) -> np.ndarray:
+    if not rules.surcharge_thresholds:
+        return np.zeros_like(tax)
+    thresholds = np.asarray(rules.surcharge_thresholds, dtype=np.int64)
+    i = np.searchsorted(thresholds, taxable_income, side='left') - 1
+    j = np.maximum(i, 0)
+    amount = np.minimum(apply_rate(tax, np.take(np.asarray(rules.surcharge_rates, dtype=np.int64), j)),
+                        np.take(np.asarray(rules.surcharge_base, dtype=np.int64), j)
+                        + (taxable_income - thresholds[j]) - tax)
+    return np.where(i >= 0, amount, 0)
+
+
+def _result(regime, rules: FixedRules, c, gross, deductions, taxable_income, tax) -> dict:
+    surcharge = surcharge_batch(rules, taxable_income, tax)
+    cess = apply_rate(tax + surcharge, rules.cess_rate)
+    total_tax = round_to_ten(tax + surcharge + cess)
+
+    return {
+        'regime': regime,
+        'gross_salary': gross,
+        'taxable_income': taxable_income,
+        'tax_amount': tax,
+        'surcharge': surcharge,
+        'cess': cess,
+        'total_tax': total_tax,
+        'in_hand_monthly': monthly(gross - c['pf_deduction'] - c['professional_tax'] - total_tax),
+        'deductions_breakdown': deductions,
+    }
+
+
+def calculate_tax_new_regime_batch(c: dict, gross: np.ndarray, profile: RuleProfile = DEFAULT_PROFILE) -> dict:
+    rules = fixed_rules("new", profile)
+
+    deductions = {
+        'Standard Deduction': np.full_like(gross, rules.standard_deduction),
+        'NPS Employer (80CCD(2))': c['nps_employer'],
+    }
+
+    taxable_income = round_to_ten(np.maximum(0, gross - sum(deductions.values())))
+    tax = income_tax_batch(rules, taxable_income)
+
+    return _result("New", rules, c, gross, deductions, taxable_income, tax)
+
+
+def calculate_tax_old_regime_batch(c: dict, gross: np.ndarray, profile: RuleProfile = DEFAULT_PROFILE) -> dict:
+    rules = fixed_rules("old", profile)
+    caps = rules.caps
+
+    hra_exemption = np.maximum(0, np.minimum(
+        np.minimum(c['hra'], c['hra_rent_paid'] - apply_rate(c['basic'], caps['hra_rent_basic_pct'])),
+        apply_rate(c['basic'], caps['hra_basic_pct'])
+    ))
+
+    deductions = {
+        'Standard Deduction': np.full_like(gross, rules.standard_deduction),
+        'Professional Tax': c['professional_tax'],
+        'HRA Exemption': hra_exemption,
+        'Section 80C': np.minimum(c['section_80c'] + c['pf_deduction'], caps['section_80c']),
+        'Section 80D': np.minimum(c['section_80d'], caps['section_80d']),
+        'NPS Self (80CCD(1B))': np.minimum(c['nps_self'], caps['nps_self']),
+        'NPS Employer (80CCD(2))': c['nps_employer'],
+        'Home Loan Interest': np.minimum(c['home_loan_interest'], caps['home_loan_interest']),
+        'LTA Exemption': np.minimum(c['lta'], caps['lta']),
+    }
+
+    taxable_income = round_to_ten(np.maximum(0, gross - sum(deductions.values())))
+    tax = income_tax_batch(rules, taxable_income)
+
+    return _result("Old", rules, c, gross, deductions, taxable_income, tax)
+
+
+def _compare_batch(c: dict, profile: RuleProfile) -> dict:
+    gross = gross_salary(c)
+    return {
+        'old_regime': calculate_tax_old_regime_batch(c, gross, profile),
+        'new_regime': calculate_tax_new_regime_batch(c, gross, profile),
+    }
+
+
+def compare_tax_regimes_batch(columns, profile: RuleProfile = DEFAULT_PROFILE) -> dict:
+    """batch_engine.compare_tax_regimes_batch in fixed point: every amount is an int64 array of paise."""
+    return _compare_batch(load_paise(columns), profile)
+
+
+def compare_tax_regimes_grouped(columns, profiles) -> dict:
+    """compare_tax_regimes_batch with one RuleProfile per row (see batch_engine.compare_tax_regimes_grouped)."""
+    c = load_paise(columns)
+    groups = {}
+    for i, profile in enumerate(profiles):
+        groups.setdefault(profile, []).append(i)
+    if len(groups) <= 1:
+        return _compare_batch(c, next(iter(groups), DEFAULT_PROFILE))
+
+    size = len(profiles)
+    out = {}
+    for profile, rows in groups.items():
+        idx = np.array(rows)
+        _scatter(out, _compare_batch({name: values[idx] for name, values in c.items()}, profile), idx, size)
+    return out
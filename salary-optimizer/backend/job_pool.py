@@ -0,0 +1,177 @@
+import asyncio
+import concurrent.futures
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Process pool for CPU-heavy API work (sweeps, optimisation).
+#
+# The event loop only ever awaits these jobs, so interactive requests and
+# static files keep being served while a large job runs. Admission is
+# bounded: once max_pending jobs are queued or running (streamed batches
+# hold a slot too, see acquire/release), new ones are refused
+# with JobPoolSaturated (HTTP 429) instead of queueing without limit. A job
+# that exceeds its timeout raises JobTimeout (HTTP 504); its slot is only
+# given back when the worker is actually free again, so timed-out work still
+# counts against the bound. map runs a request that splits into several
+# jobs (Monte Carlo path blocks) with one all-or-nothing admission, and
+# submit/call let a streamed upload send each chunk to the workers under the
+# slot it already holds.
+#
+# Configured through JOB_POOL_WORKERS (default: CPU count),
+# JOB_POOL_MAX_PENDING (default: 2 x workers), JOB_TIMEOUT (seconds,
+# default 30) and JOB_POOL_START_METHOD (default: spawn).
+
+
+class JobPoolSaturated(RuntimeError):
+    pass
+
+
+class JobTimeout(RuntimeError):
+    pass
+
+
+class JobPool:
+    def __init__(self, max_workers: int = None, max_pending: int = None, timeout: float = 30,
+                 start_method: str = 'spawn'):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending or 2 * self.max_workers
+        self.timeout = timeout
+        self.start_method = start_method
+        self.pending = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context(self.start_method),
+                )
+            return self._executor
+
+    @property
+    def available(self) -> int:
+        with self._lock:
+            return max(0, self.max_pending - self.pending)
+
+    def acquire(self, count: int = 1) -> None:
+        """Take count slots, all or none, or raise JobPoolSaturated."""
+        with self._lock:
+            if self.pending + count > self.max_pending:
+                self.rejected += 1
+                raise JobPoolSaturated(f"{self.pending} jobs already pending")
+            self.pending += count
+
+    def release(self, count: int = 1) -> None:
+        with self._lock:
+            self.pending -= count
+
+    async def run(self, fn, *args, timeout: float = None):
+        """Run fn(*args) in a worker process; fn and args must be picklable."""
+        return (await self.map(fn, [args], timeout=timeout))[0]
+
+    async def map(self, fn, calls: list, timeout: float = None) -> list:
+        """
+        fn(*args) for every args tuple in calls, one job each, results in
+        order. The slots are taken together, so the call is admitted or
+        refused as a whole; when one job fails the rest are cancelled.
+        """
+        self.acquire(len(calls))
+        executor = self.executor
+        futures = []
+        try:
+            for args in calls:
+                future = executor.submit(fn, *args)
+                future.add_done_callback(lambda _: self.release())
+                futures.append(future)
+        except BaseException as e:
+            self.release(len(calls) - len(futures))
+            self._cancel(futures)
+            if isinstance(e, BrokenProcessPool):
+                self._discard(executor)
+            raise
+
+        try:
+            return await asyncio.wait_for(
+                asyncio.gather(*(asyncio.wrap_future(future) for future in futures)), timeout or self.timeout)
+        except BrokenProcessPool:
+            # A worker died (OOM, segfault); start a fresh pool for the next job
+            self._cancel(futures)
+            self._discard(executor)
+            raise
+        except asyncio.TimeoutError:
+            # Jobs that have not started yet are cancelled; running ones
+            # finish in the background and free their slots then
+            self._cancel(futures)
+            with self._lock:
+                self.timed_out += 1
+            raise JobTimeout(f"Job did not finish within {timeout or self.timeout:g}s") from None
+        except BaseException:
+            self._cancel(futures)
+            raise
+
+    def submit(self, fn, *args) -> concurrent.futures.Future:
+        """
+        Start fn(*args) in a worker process for work that already holds a
+        slot (streamed uploads send their chunks this way), so it is not
+        admitted again. The caller waits on the returned future.
+        """
+        executor = self.executor
+        try:
+            return executor.submit(fn, *args)
+        except BrokenProcessPool:
+            self._discard(executor)
+            raise
+
+    def call(self, fn, *args):
+        """submit, then block the calling thread until the result is in or the timeout passes."""
+        try:
+            return self.submit(fn, *args).result(timeout=self.timeout)
+        except concurrent.futures.TimeoutError:
+            with self._lock:
+                self.timed_out += 1
+            raise JobTimeout(f"Job did not finish within {self.timeout:g}s") from None
+
+    @staticmethod
+    def _cancel(futures: list) -> None:
+        # A cancelled future runs its done callback, which gives its slot back
+        for future in futures:
+            future.cancel()
+
+    def _discard(self, executor: ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'workers': self.max_workers,
+                'max_pending': self.max_pending,
+                'pending': self.pending,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def from_environ() -> JobPool:
+    return JobPool(
+        max_workers=int(os.environ.get('JOB_POOL_WORKERS', 0)) or None,
+        max_pending=int(os.environ.get('JOB_POOL_MAX_PENDING', 0)) or None,
+        timeout=float(os.environ.get('JOB_TIMEOUT', 30)),
+        start_method=os.environ.get('JOB_POOL_START_METHOD', 'spawn'),
+    )
@@ -1,9 +1,56 @@
-from fastapi import FastAPI
+import functools
+import io
+import logging
+import os
+import tempfile
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException, Request, Response, WebSocket
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from models import TaxRequest, ComparisonResponse
-from tax_engine import compare_tax_regimes
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from pydantic import ValidationError
+import codec
+import metrics
+from models import (TaxRequest, ComparisonResponse, OptimizeRequest, OptimizeResponse, AnalyticsResponse,
+                    SweepRequest, SweepResponse, TdsRequest, TdsResponse, MonteCarloRequest, MonteCarloResponse,
+                    PlanRequest, PlanResponse)
+from analytics import analyse
+from tax_cache import cached_comparison_json, shared_cache
+from tax_core import InvalidInput, TaxInputs, decode_request
+import job_pool
+from job_pool import JobPoolSaturated, JobTimeout
+
+# Cheap single calculations run inline on the event loop; batch, sweep and
+# optimisation jobs go through a bounded process pool (see job_pool.py).
+# Their modules (and numpy) are imported on first use to keep cold starts short.
+jobs = job_pool.from_environ()
+
+logger = logging.getLogger(__name__)
+
+# Uploads larger than this are spooled to a temporary file
+SPOOL_BYTES = 8 * 1024 * 1024
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    jobs.shutdown()
+
+app = FastAPI(title="Salary Optimizer API", lifespan=lifespan)
 
-app = FastAPI(title="Salary Optimizer API")
+@app.exception_handler(JobPoolSaturated)
+async def job_pool_saturated(request: Request, exc: JobPoolSaturated):
+    return JSONResponse({"detail": "Server busy, retry shortly"}, status_code=429, headers={"Retry-After": "1"})
+
+@app.exception_handler(JobTimeout)
+async def job_timeout(request: Request, exc: JobTimeout):
+    return JSONResponse({"detail": str(exc)}, status_code=504)
+
+# Memo of encoded /api/calculate responses keyed on rupee-rounded inputs,
+# shared with the serverless entry (serverless.py)
+result_cache = shared_cache()
 
 # Enable CORS for frontend
 app.add_middleware(
@@ -12,37 +59,341 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[metrics.PROFILE_ID_HEADER],
 )
 
+# Request count/latency per route and the X-Profile sampling hook (see metrics.py)
+app.add_middleware(metrics.MetricsMiddleware)
+
 @app.get("/")
 def read_root():
     return {"message": "Salary Optimizer API is running"}
 
-@app.post("/api/calculate", response_model=ComparisonResponse)
-def calculate_tax(request: TaxRequest):
-    return compare_tax_regimes(request)
+@app.get("/metrics", include_in_schema=False)
+def metrics_exposition():
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
 
-# Serve React App (SPA)
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-import os
+@app.get("/metrics/profiles/{profile_id}", include_in_schema=False)
+def metrics_profile(profile_id: str):
+    # Collapsed stacks of an X-Profile request, for flamegraph.pl or speedscope
+    profile = metrics.get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Unknown or evicted profile")
+    return Response(content=profile, media_type="text/plain")
+
+def _decode_tax_request(body: bytes) -> TaxInputs:
+    with metrics.stage("decode"):
+        return _decode_body(body)
+
+def _decode_body(body: bytes) -> TaxInputs:
+    # Fast path: codec decode straight into tax_core's slotted inputs. Bodies
+    # it rejects get the same 422 payloads FastAPI's own validation produces.
+    try:
+        data = codec.loads(body)
+    except ValueError as e:
+        raise RequestValidationError([{
+            "type": "json_invalid",
+            "loc": ("body", getattr(e, "pos", 0)),
+            "msg": "JSON decode error",
+            "input": {},
+            "ctx": {"error": getattr(e, "msg", str(e))},
+        }], body=body)
+    try:
+        return decode_request(data)
+    except InvalidInput:
+        pass
+    try:
+        request = TaxRequest.model_validate(data)
+    except ValidationError as e:
+        errors = [{**err, "loc": ("body", *err["loc"])} for err in e.errors(include_url=False)]
+        raise RequestValidationError(errors, body=data)
+    return TaxInputs.from_request(request)
+
+@app.post(
+    "/api/calculate",
+    response_model=ComparisonResponse,
+    openapi_extra={"requestBody": {
+        "required": True,
+        "content": {"application/json": {"schema": {"$ref": "#/components/schemas/TaxRequest"}}},
+    }},
+)
+async def calculate_tax(request: Request):
+    # Cached bytes are returned as-is, skipping both the engine and response_model encoding
+    inputs = _decode_tax_request(await request.body())
+    body = cached_comparison_json(result_cache, inputs)
+    return Response(content=body, media_type="application/json")
+
+@app.post("/api/calculate/delta")
+async def calculate_delta(request: Request):
+    # A full TaxRequest answers {"token", "result"}; {"token", "changes"}
+    # then recomputes only what the changed fields reach (see delta.py).
+    # 409 means the token expired: resend the full request.
+    import delta
+
+    body = await request.body()
+    try:
+        data = codec.loads(body)
+    except ValueError:
+        data = None
+    if isinstance(data, dict) and "token" in data:
+        try:
+            content = delta.update(data)
+        except InvalidInput as e:
+            raise HTTPException(status_code=422, detail=e.errors)
+        except delta.UnknownToken:
+            raise HTTPException(status_code=409, detail="Unknown or expired token; send the full request")
+    else:
+        content = delta.start(_decode_tax_request(body))
+    return Response(content=content, media_type="application/json")
+
+@app.websocket("/ws/calculate")
+async def calculate_live(websocket: WebSocket):
+    # Live recalculation over one connection: it keeps the current
+    # TaxRequest, the client sends {"changes": {field: value}} patches and
+    # gets back only the result fields that changed (see delta.LiveSession).
+    # Errors are replies too; the connection stays open.
+    import delta
+
+    await websocket.accept()
+    session = delta.LiveSession()
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            return
+        started = time.perf_counter()
+        data = message.get("text")
+        try:
+            parsed = codec.loads(data if data is not None else message.get("bytes") or b"")
+        except ValueError:
+            reply = {"error": {"non_field_errors": ["JSON decode error"]}}
+        else:
+            reply = session.handle(parsed)
+        await websocket.send_text(codec.dumps(reply).decode())
+        metrics.record_request("/ws/calculate", "WS", 400 if "error" in reply else 200,
+                               time.perf_counter() - started)
+
+class JobStreamingResponse(StreamingResponse):
+    # Streams a body while holding the job slot its endpoint took. The slot
+    # is released once the response is sent or fails, even if the body is
+    # never iterated (e.g. the client disconnected first), so it can't leak.
+    def __init__(self, content, release, **kwargs):
+        super().__init__(content, **kwargs)
+        self.release = release
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await self.respond(scope, receive, send)
+        finally:
+            self.release()
+
+    async def respond(self, scope, receive, send):
+        await super().__call__(scope, receive, send)
+
+class RequestStreamingResponse(JobStreamingResponse):
+    # The body iterator reads request.stream() itself, so Starlette's
+    # concurrent disconnect listener must not consume receive() messages.
+    # A client that drops mid-upload surfaces as ClientDisconnect instead.
+    async def respond(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+@app.post("/api/calculate/batch")
+async def calculate_tax_batch(request: Request):
+    # Accepts a JSON array or NDJSON of TaxRequests and streams back one
+    # ComparisonResponse (or inline row error) per line as chunks complete.
+    # The stream holds a job slot. Rows are parsed in a thread and each
+    # chunk is computed and encoded in a job pool worker; a stream running
+    # past JOB_TIMEOUT ends with an error line.
+    from batch_stream import BatchStream, encode_chunk
+
+    jobs.acquire()
 
-# Check if the build directory exists (it will in Docker)
+    stream = BatchStream(compute=functools.partial(jobs.call, encode_chunk))
+
+    def drain(lines) -> list:
+        # Keeps the lines written before a chunk timed out, then ends the stream on it
+        out = []
+        try:
+            for line in lines:
+                out.append(line)
+        except JobTimeout as e:
+            out.extend(stream.abort(str(e)))
+        return out
+
+    async def results():
+        deadline = time.monotonic() + jobs.timeout
+        async for chunk in request.stream():
+            for line in await run_in_threadpool(drain, stream.feed(chunk)):
+                yield line
+            if time.monotonic() > deadline:
+                for line in stream.abort(f"Batch did not finish within {jobs.timeout:g}s"):
+                    yield line
+                return
+        for line in await run_in_threadpool(drain, stream.finish()):
+            yield line
+
+    return RequestStreamingResponse(results(), jobs.release, media_type="application/x-ndjson")
+
+@app.post("/api/payroll")
+async def payroll(request: Request):
+    # Raw CSV or Parquet upload (Parquet detected by its magic bytes) in,
+    # the same file with tax result columns out. The upload is spooled to
+    # disk past SPOOL_BYTES and processed in payroll_io chunks, so memory
+    # stays flat for any file size. Holds a job slot while it runs; the file
+    # is read in a thread and every chunk is computed in a job pool worker.
+    # ?fixed_point=1 computes in integer paise (see fixed_point.py).
+    import payroll_io
+
+    fixed = request.query_params.get("fixed_point", "").lower() in ("1", "true", "yes")
+
+    jobs.acquire()
+    try:
+        upload = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES)
+        async for chunk in request.stream():
+            upload.write(chunk)
+        upload.seek(0)
+        parquet = payroll_io.is_parquet(upload.read(4))
+        upload.seek(0)
+
+        if parquet:
+            output = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES)
+            try:
+                stats = await run_in_threadpool(payroll_io.process_parquet, upload, output,
+                                                payroll_io.CHUNK_SIZE, fixed,
+                                                functools.partial(jobs.call, payroll_io.compute_chunk))
+            except JobTimeout:
+                raise
+            except RuntimeError as e:
+                raise HTTPException(status_code=415, detail=str(e))
+            finally:
+                upload.close()
+            output.seek(0)
+            logger.info("payroll: %s", stats.as_dict())
+            headers = {
+                "Content-Disposition": 'attachment; filename="payroll_tax.parquet"',
+                "X-Rows": str(stats.rows),
+                "X-Rows-Per-Second": f"{stats.rows_per_second:.0f}",
+            }
+            return JobStreamingResponse(_stream_file(output), jobs.release,
+                                        media_type="application/vnd.apache.parquet", headers=headers)
+
+        # Encoding and header problems are a 400 here; once rows stream the status is sent
+        try:
+            await run_in_threadpool(payroll_io.check_csv, upload)
+        except ValueError as e:
+            upload.close()
+            raise HTTPException(status_code=400, detail=str(e))
+    except BaseException:
+        jobs.release()
+        raise
+
+    def rows():
+        stats = payroll_io.PayrollStats()
+        try:
+            text = io.TextIOWrapper(upload, encoding="utf-8-sig", newline="")
+            for piece in payroll_io.iter_csv(text, stats=stats, fixed=fixed, submit=jobs.submit):
+                yield piece.encode()
+            logger.info("payroll: %s", stats.as_dict())
+        finally:
+            upload.close()
+
+    return JobStreamingResponse(rows(), jobs.release, media_type="text/csv",
+                                headers={"Content-Disposition": 'attachment; filename="payroll_tax.csv"'})
+
+def _stream_file(f, size: int = 64 * 1024):
+    try:
+        while True:
+            piece = f.read(size)
+            if not piece:
+                break
+            yield piece
+    finally:
+        f.close()
+
+@app.post("/api/optimize", response_model=OptimizeResponse)
+async def optimize(request: OptimizeRequest):
+    from optimizer import optimize_salary_structure
+
+    try:
+        return await jobs.run(optimize_salary_structure, request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/api/analytics", response_model=AnalyticsResponse)
+async def analytics(request: TaxRequest):
+    return analyse(request)
+
+@app.post("/api/sweep", response_model=SweepResponse)
+async def sensitivity_sweep(request: SweepRequest):
+    # Grids can hold a million points, so the worker encodes them once with
+    # codec rather than having them validated again through response_model
+    from sweep import sweep_json
+
+    try:
+        body = await jobs.run(sweep_json, request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return Response(content=body, media_type="application/json")
+
+@app.post("/api/tds", response_model=TdsResponse)
+async def tds_projection(request: TdsRequest):
+    from tds import project
+
+    try:
+        return project(request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/api/monte-carlo", response_model=MonteCarloResponse)
+async def monte_carlo_projection(request: MonteCarloRequest):
+    # Path blocks are split over the job pool's workers, but over no more
+    # than half its free slots so one projection can't crowd out other jobs;
+    # a seed gives the same bands however they are split (see monte_carlo.py)
+    import numpy as np
+    import monte_carlo
+
+    try:
+        monte_carlo.validate(request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    width = min(jobs.max_workers, max(1, jobs.available // 2))
+    pieces = monte_carlo.ranges(request, width)
+    parts = await jobs.map(monte_carlo.simulate_range, [(request, start, stop) for start, stop in pieces])
+    return monte_carlo.summarise(request, np.concatenate(parts))
+
+@app.post("/api/plan", response_model=PlanResponse)
+async def budget_plan(request: PlanRequest):
+    # Org-wide CTC budget allocation (see budget_planner.py)
+    from budget_planner import plan
+
+    try:
+        return await jobs.run(plan, request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# Serve React App (SPA)
+# The build directory exists in Docker. It is indexed once into memory
+# (see static_delivery.py): precompressed, ETagged, cached by hash.
 if os.path.exists("input_dist"):
-    app.mount("/assets", StaticFiles(directory="input_dist/assets"), name="assets")
+    from fastapi.responses import FileResponse
+    from static_delivery import StaticSite
+
+    site = StaticSite("input_dist")
 
-    @app.get("/{full_path:path}")
-    async def serve_react_app(full_path: str):
+    @app.api_route("/{full_path:path}", methods=["GET", "HEAD"], include_in_schema=False)
+    async def serve_react_app(full_path: str, request: Request):
         # Serve index.html for any non-API route to allow React Router to handle paths
         if full_path.startswith("api"):
             return {"error": "API route not found"}
-        
-        # Determine strict file path
-        file_path = f"input_dist/{full_path}"
-        if os.path.exists(file_path) and os.path.isfile(file_path):
-            return FileResponse(file_path)
-            
-        return FileResponse("input_dist/index.html")
+
+        static = site.respond(full_path, request.headers.get("accept-encoding", ""),
+                              request.headers.get("if-none-match", ""))
+        if static is None:
+            raise HTTPException(status_code=404)
+        if static.file_path is not None:
+            return FileResponse(static.file_path, headers=static.headers)
+        return Response(content=static.body, status_code=static.status, headers=static.headers)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,357 @@
+import itertools
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter as SampleCounter, OrderedDict
+from contextlib import contextmanager
+
+# Built-in instrumentation, served as Prometheus text exposition at /metrics.
+#
+# Standard library only, so serverless.py and the Django app can record into
+# it without extra imports. Everything lives in one process-wide registry:
+#   - request count and latency per endpoint (route template, not raw path),
+#     recorded by MetricsMiddleware (ASGI) and api.middleware (Django),
+#   - stage timers (decode, compute, encode) around the calculation path,
+#   - hit/miss counters of every registered TaxCache,
+#   - rows and seconds spent in batch work, per source, plus their ratio.
+# Observations take one short lock, so the hot path pays about a microsecond.
+#
+# Sending "X-Profile: 1" runs a sampling profiler on the thread serving the
+# request. The response gets an X-Profile-Id header and the collapsed stacks
+# (flamegraph.pl / speedscope format) are kept for GET /metrics/profiles/<id>.
+# On the ASGI side that thread is the event loop, so samples cover whatever
+# it ran meanwhile, and work sent to the job process pool is not seen.
+# The header is ignored unless PROFILE_REQUESTS=1, since profiles expose
+# source paths and call stacks to whoever asks for them.
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STAGE_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.01, 0.1, 1.0)
+
+PROFILE_HEADER = 'x-profile'
+PROFILE_ID_HEADER = 'X-Profile-Id'
+PROFILE_INTERVAL = 0.001
+PROFILE_CONCURRENCY = 2
+PROFILES_KEPT = 32
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = '') -> str:
+    parts = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values) -> float:
+        return self._values.get(label_values, 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            yield self.name, _format_labels(self.labels, label_values), value
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts (last is +Inf), sum]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, *label_values) -> None:
+        i = bisect_left(self.buckets, seconds)
+        with self._lock:
+            entry = self._values.get(label_values)
+            if entry is None:
+                entry = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][i] += 1
+            entry[1] += seconds
+
+    def count(self, *label_values) -> int:
+        entry = self._values.get(label_values)
+        return sum(entry[0]) if entry else 0
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        for label_values, (counts, total) in items:
+            cumulative = itertools.accumulate(counts)
+            for bound, value in zip(self.buckets + (float('inf'),), cumulative):
+                labels = _format_labels(self.labels, label_values, f'le="{_number(bound)}"')
+                yield f'{self.name}_bucket', labels, value
+            labels = _format_labels(self.labels, label_values)
+            yield f'{self.name}_sum', labels, total
+            yield f'{self.name}_count', labels, sum(counts)
+
+
+class Gauge:
+    # Read at render time from a callback returning {label values: value};
+    # kind='counter' for monotonic values kept elsewhere (cache hit counts)
+    def __init__(self, name: str, help: str, labels: tuple, read, kind: str = 'gauge'):
+        self.kind = kind
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._read = read
+
+    def samples(self):
+        for label_values, value in sorted(self._read().items()):
+            yield self.name, _format_labels(self.labels, label_values), value
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._caches = {}
+
+    def add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labels: tuple = ()) -> Counter:
+        return self.add(Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self.add(Histogram(name, help, labels, buckets))
+
+    def gauge(self, name: str, help: str, labels: tuple, read, kind: str = 'gauge') -> Gauge:
+        return self.add(Gauge(name, help, labels, read, kind))
+
+    def register_cache(self, name: str, cache) -> None:
+        """Report cache (anything with TaxCache.stats()) under cache="name"."""
+        self._caches[name] = cache
+
+    def cache_stats(self) -> dict:
+        return {name: cache.stats() for name, cache in list(self._caches.items())}
+
+    def render(self) -> bytes:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{labels} {_number(value)}')
+        return ('\n'.join(lines) + '\n').encode()
+
+
+registry = Registry()
+
+REQUESTS = registry.counter(
+    'salary_optimizer_requests_total', 'HTTP requests served', ('endpoint', 'method', 'status'))
+LATENCY = registry.histogram(
+    'salary_optimizer_request_seconds', 'HTTP request latency', ('endpoint',))
+STAGES = registry.histogram(
+    'salary_optimizer_stage_seconds', 'Time per calculation stage', ('stage',), STAGE_BUCKETS)
+BATCH_ROWS = registry.counter(
+    'salary_optimizer_batch_rows_total', 'Rows computed by batch work', ('source',))
+BATCH_SECONDS = registry.counter(
+    'salary_optimizer_batch_seconds_total', 'Seconds spent computing batch rows', ('source',))
+
+
+def _cache_stat(stat: str):
+    return lambda: {(name,): stats[stat] for name, stats in registry.cache_stats().items()}
+
+
+registry.gauge('salary_optimizer_cache_hits_total', 'Cache hits', ('cache',), _cache_stat('hits'), 'counter')
+registry.gauge('salary_optimizer_cache_misses_total', 'Cache misses', ('cache',), _cache_stat('misses'), 'counter')
+registry.gauge('salary_optimizer_cache_coalesced_total', 'Misses that waited on an identical in-flight computation',
+               ('cache',), _cache_stat('coalesced'), 'counter')
+registry.gauge('salary_optimizer_cache_entries', 'Entries held in this process', ('cache',), _cache_stat('size'))
+registry.gauge('salary_optimizer_cache_hit_ratio', 'Hits over lookups', ('cache',), _cache_stat('hit_ratio'))
+registry.gauge(
+    'salary_optimizer_batch_rows_per_second', 'Batch rows over batch compute seconds', ('source',),
+    lambda: {key: rows / BATCH_SECONDS.value(*key)
+             for key, rows in list(BATCH_ROWS._values.items()) if BATCH_SECONDS.value(*key) > 0},
+)
+
+
+@contextmanager
+def stage(name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGES.observe(time.perf_counter() - started, name)
+
+
+def record_batch(source: str, rows: int, seconds: float) -> None:
+    BATCH_ROWS.inc(source, amount=rows)
+    BATCH_SECONDS.inc(source, amount=seconds)
+
+
+def record_request(endpoint: str, method: str, status: int, seconds: float) -> None:
+    REQUESTS.inc(endpoint, method, str(status))
+    LATENCY.observe(seconds, endpoint)
+
+
+def render() -> bytes:
+    return registry.render()
+
+
+# ---- Sampling profiler ----
+
+def profiling_enabled() -> bool:
+    return os.environ.get('PROFILE_REQUESTS', '0') == '1'
+
+
+def wants_profile(value) -> bool:
+    if isinstance(value, bytes):
+        value = value.decode('latin-1')
+    return bool(value) and value.strip().lower() not in ('0', 'false', 'no', 'off') and profiling_enabled()
+
+
+class SamplingProfiler:
+    """Counts the stacks of one thread every interval seconds from a background thread."""
+
+    def __init__(self, thread_id: int = None, interval: float = PROFILE_INTERVAL):
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = interval
+        self.stacks = SampleCounter()
+        self.started = self.seconds = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> 'SamplingProfiler':
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> 'SamplingProfiler':
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.seconds = time.perf_counter() - self.started
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                return
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)})')
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        """One "root;...;leaf count" line per distinct stack, most sampled first."""
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+_profiles = OrderedDict()
+_profiles_lock = threading.Lock()
+_profile_ids = itertools.count(1)
+_profile_slots = threading.BoundedSemaphore(PROFILE_CONCURRENCY)
+
+
+def start_profile():
+    """A running SamplingProfiler for the current thread, or None when all slots are busy."""
+    if not _profile_slots.acquire(blocking=False):
+        return None
+    try:
+        return SamplingProfiler().start()
+    except BaseException:
+        _profile_slots.release()
+        raise
+
+
+def finish_profile(profiler: SamplingProfiler, endpoint: str) -> str:
+    """Stop profiler, keep its stacks and return the id to fetch them by."""
+    try:
+        profiler.stop()
+    finally:
+        _profile_slots.release()
+    profile_id = str(next(_profile_ids))
+    header = f'# {endpoint}: {sum(profiler.stacks.values())} samples over {profiler.seconds * 1000:.1f} ms\n'
+    with _profiles_lock:
+        _profiles[profile_id] = header + profiler.collapsed()
+        while len(_profiles) > PROFILES_KEPT:
+            _profiles.popitem(last=False)
+    return profile_id
+
+
+def get_profile(profile_id: str):
+    with _profiles_lock:
+        return _profiles.get(profile_id)
+
+
+# ---- ASGI ----
+
+class MetricsMiddleware:
+    """Pure ASGI middleware: request count and latency per route, plus the X-Profile hook."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        profiler = None
+        if wants_profile(dict(scope.get('headers') or ()).get(PROFILE_HEADER.encode())):
+            profiler = start_profile()
+
+        async def send_wrapper(message):
+            nonlocal status, profiler
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                if profiler is not None:
+                    # Headers go out now, so the profile ends with the handler
+                    profile_id = finish_profile(profiler, _endpoint(scope))
+                    profiler = None
+                    message = {**message, 'headers': [
+                        *message.get('headers', ()), (PROFILE_ID_HEADER.lower().encode(), profile_id.encode()),
+                    ]}
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if profiler is not None:
+                finish_profile(profiler, _endpoint(scope))
+            record_request(_endpoint(scope), scope['method'], status, time.perf_counter() - started)
+
+
+def _endpoint(scope) -> str:
+    # The matched route's template keeps label cardinality bounded
+    route = scope.get('route')
+    path = getattr(route, 'path', None)
+    return path if path is not None else 'unmatched'
@@ -1,7 +1,14 @@
-from pydantic import BaseModel
-from typing import Dict, Optional
+from pydantic import BaseModel, ConfigDict
+from typing import Dict, List, Literal, Optional, Union
+
+from tax_rules import AGE_BANDS, DEFAULT_AGE_BAND, DEFAULT_FY, TAX_RULES
+
+FinancialYear = Literal[tuple(TAX_RULES)]
+AgeBand = Literal[AGE_BANDS]
 
 class SalaryInputs(BaseModel):
+    model_config = ConfigDict(allow_inf_nan=False) # "nan"/"inf" would poison the cache key and the engine
+
     basic: float
     hra: float
     special_allowance: float
@@ -12,6 +19,8 @@ class SalaryInputs(BaseModel):
     professional_tax: float
 
 class Investments(BaseModel):
+    model_config = ConfigDict(allow_inf_nan=False)
+
     section_80c: float # Cap 1.5L usually
     section_80d: float # Health Ins
     hra_rent_paid: float # Yearly Rent
@@ -22,12 +31,16 @@ class Investments(BaseModel):
 class TaxRequest(BaseModel):
     salary: SalaryInputs
     investments: Investments
+    fy: FinancialYear = DEFAULT_FY
+    age_band: AgeBand = DEFAULT_AGE_BAND # Old-regime slabs differ for seniors
+    metro: bool = True # HRA exemption: 50% of basic in metros, 40% elsewhere
 
 class TaxResult(BaseModel):
     regime: str
     gross_salary: float
     taxable_income: float
     tax_amount: float
+    surcharge: float # On tax_amount above 50L taxable income, after marginal relief
     cess: float
     total_tax: float
     in_hand_monthly: float
@@ -36,3 +49,202 @@ class TaxResult(BaseModel):
 class ComparisonResponse(BaseModel):
     old_regime: TaxResult
     new_regime: TaxResult
+
+class OptimizeConstraints(BaseModel):
+    model_config = ConfigDict(allow_inf_nan=False)
+
+    min_basic_pct: float = 0.40 # Basic as a share of CTC
+    max_hra_pct: float = 0.50 # HRA as a share of Basic
+    lta_cap: float = 50000
+    max_nps_employer_pct: float = 0.14 # 80CCD(2) as a share of Basic
+    pf_rate: float = 0.12 # Employee PF as a share of Basic
+
+class OptimizeRequest(BaseModel):
+    model_config = ConfigDict(allow_inf_nan=False)
+
+    ctc: float # Yearly, includes NPS Employer
+    variable_pay: float = 0 # Fixed by policy, not optimised
+    other_allowances: float = 0
+    professional_tax: float = 2400
+    max_section_80c: float = 150000 # What the employee can invest
+    section_80d: float = 0
+    hra_rent_paid: float = 0
+    nps_self: float = 0
+    home_loan_interest: float = 0
+    fy: FinancialYear = DEFAULT_FY
+    age_band: AgeBand = DEFAULT_AGE_BAND
+    metro: bool = True
+    constraints: OptimizeConstraints = OptimizeConstraints()
+
+class OptimizeResponse(BaseModel):
+    recommended_regime: str
+    structure: TaxRequest
+    comparison: ComparisonResponse
+
+class RegimeAnalytics(BaseModel):
+    regime: str
+    taxable_income: float
+    total_tax: float
+    effective_rate: float # total_tax / gross_salary
+    marginal_rate: float # Tax incl. cess on the next rupee of taxable income
+    band: str # "rebate", "marginal_relief", "surcharge_relief" or "slab"
+    slab_rate: float
+    next_boundary: Optional[float] = None # Next taxable income where the rate changes
+    distance_to_next_boundary: Optional[float] = None
+    rebate_limit: float
+    rebate_cliff: float # Tax incl. cess due one rupee past the rebate limit
+    marginal_relief_end: Optional[float] = None
+    reduction_to_rebate: float # Taxable income to shed for nil tax
+
+class BreakevenPoint(BaseModel):
+    deduction: str # Investments field
+    current: float
+    cap: float
+    breakeven: Optional[float] = None # Amount at which both regimes cost the same; None if out of reach
+
+class AnalyticsResponse(BaseModel):
+    old_regime: RegimeAnalytics
+    new_regime: RegimeAnalytics
+    better_regime: str
+    breakeven_taxable_income: float # Old-regime taxable income that matches the new-regime tax
+    additional_old_deductions: float # Negative when the old regime already wins by that margin
+    breakevens: List[BreakevenPoint]
+
+class SweepAxis(BaseModel):
+    model_config = ConfigDict(allow_inf_nan=False)
+
+    field: str # SalaryInputs/Investments field, or "gross_salary" to scale every earning
+    start: float
+    stop: float # Inclusive
+    step: float
+
+class SweepRequest(BaseModel):
+    base: TaxRequest
+    axes: List[SweepAxis] # One or two
+
+class SweepAxisValues(BaseModel):
+    model_config = ConfigDict(allow_inf_nan=False)
+
+    field: str
+    values: List[float]
+
+class SweepGrid(BaseModel):
+    # 1-D list, or rows over the first axis and columns over the second
+    total_tax: Union[List[float], List[List[float]]]
+    in_hand_monthly: Union[List[float], List[List[float]]]
+
+class SweepResponse(BaseModel):
+    axes: List[SweepAxisValues]
+    old_regime: SweepGrid
+    new_regime: SweepGrid
+
+RegimeName = Literal["old", "new"]
+
+class TdsActual(BaseModel):
+    model_config = ConfigDict(allow_inf_nan=False)
+
+    month: int # 0 = April ... 11 = March
+    earnings: Dict[str, float] = {} # SalaryInputs fields actually paid this month; the rest as projected
+    tds: float # Tax actually withheld
+
+class TdsRequest(BaseModel):
+    base: TaxRequest # Annual structure; variable_pay is the year's total
+    regime: RegimeName = "new"
+    regime_switches: Dict[int, RegimeName] = {} # month -> regime declared from that month on
+    join_month: int = 0 # Mid-year joiners earn nothing before this month
+    variable_pay_months: List[int] = [] # Months variable pay is paid in; spread over the year if empty
+    actuals: List[TdsActual] = []
+
+class TdsMonth(BaseModel):
+    month: int
+    label: str
+    regime: str
+    gross: float
+    tds: float
+    net: float # gross - PF - professional tax - TDS
+    projected_annual_tax: float
+    actual: bool
+
+class TdsResponse(BaseModel):
+    months: List[TdsMonth]
+    annual_gross: float
+    annual_tax: float # Under the regime in force in March
+    total_tds: float
+
+class Distribution(BaseModel):
+    # Normal draws, clipped to [low, high] when given; std 0 for a fixed value
+    model_config = ConfigDict(allow_inf_nan=False)
+
+    mean: float
+    std: float = 0.0
+    low: Optional[float] = None
+    high: Optional[float] = None
+
+class MonteCarloRequest(BaseModel):
+    model_config = ConfigDict(allow_inf_nan=False)
+
+    base: TaxRequest # This year's structure; its FY's rules apply to every year
+    years: int = 10
+    paths: int = 10000
+    seed: int = 0
+    hike: Distribution = Distribution(mean=0.08, std=0.03, low=0.0) # Yearly raise, from year 2 on
+    variable_payout: Distribution = Distribution(mean=1.0, std=0.2, low=0.0, high=2.0) # Share of target variable pay
+    rent_inflation: Distribution = Distribution(mean=0.05, std=0.02, low=0.0) # Yearly rent increase, from year 2 on
+    percentiles: List[float] = [5, 25, 50, 75, 95]
+
+class MonteCarloBand(BaseModel):
+    percentile: float
+    values: List[float] # One per year
+
+class MonteCarloRegime(BaseModel):
+    cumulative_in_hand: List[MonteCarloBand]
+    mean: List[float]
+
+class MonteCarloResponse(BaseModel):
+    years: List[int]
+    paths: int
+    seed: int
+    old_regime: MonteCarloRegime
+    new_regime: MonteCarloRegime
+    old_minus_new: List[MonteCarloBand] # Percentiles of the cumulative difference
+    probability_old_better: List[float] # Share of paths where old is ahead, per year
+
+class PlanPolicy(BaseModel):
+    model_config = ConfigDict(allow_inf_nan=False)
+
+    max_hra_pct: float = 0.50 # HRA as a share of Basic
+    lta_cap: float = 50000
+    min_nps_employer_pct: float = 0.0 # 80CCD(2) band, as a share of Basic
+    max_nps_employer_pct: float = 0.14
+    nps_levels: int = 15 # Contribution levels tried per employee across the band
+
+class PlanEmployee(TaxRequest):
+    id: str
+
+class PlanRequest(BaseModel):
+    model_config = ConfigDict(allow_inf_nan=False)
+
+    employees: List[PlanEmployee]
+    budget: float # Total yearly employer cost: every CTC including NPS Employer
+    policy: PlanPolicy = PlanPolicy()
+
+class PlanRecommendation(BaseModel):
+    id: str
+    hra: float
+    lta: float
+    special_allowance: float
+    nps_employer: float
+    regime: str # Better regime for the planned structure
+    in_hand_before: float # Yearly
+    in_hand_after: float
+    value_change: float # In-hand plus employer NPS, after minus before
+    cost_change: float
+
+class PlanResponse(BaseModel):
+    budget: float
+    current_cost: float
+    planned_cost: float
+    value_before: float # Sum of yearly in-hand plus employer NPS
+    value_after: float
+    marginal_value: float # Value per rupee of the last NPS step funded
+    recommendations: List[PlanRecommendation]
@@ -0,0 +1,131 @@
+import numpy as np
+
+from batch_engine import INPUT_FIELDS, compare_tax_regimes_batch
+from models import Distribution, MonteCarloRequest
+from tax_core import TaxInputs
+
+# Monte Carlo projection of cumulative in-hand pay under each regime.
+#
+# Every path draws a yearly raise, a variable pay payout ratio and a rent
+# increase for each year. Year 1 is the request's structure with only the
+# payout drawn. From year 2 on:
+#   - earnings and the basic-linked PF and employer NPS grow with the raise,
+#   - rent grows with rent inflation,
+#   - professional tax and the investment commitments (80C, 80D, home loan
+#     interest, NPS self) stay as given.
+# Each block of paths runs all its years as one batch-engine call, so the
+# whole run is vectorized over paths and years. The rules of the request's
+# FY apply to every year.
+#
+# Paths come in fixed blocks of BLOCK_PATHS, and block i draws from
+# SeedSequence(seed, spawn_key=(i,)). A seed gives the same result whether
+# the blocks run in one process or are split across workers (see ranges).
+
+BLOCK_PATHS = 1000
+MAX_PATHS = 200_000
+MAX_YEARS = 40
+GROWING_FIELDS = ('basic', 'hra', 'special_allowance', 'lta', 'other_allowances', 'pf_deduction', 'nps_employer')
+
+
+def validate(request: MonteCarloRequest) -> None:
+    if not 1 <= request.years <= MAX_YEARS:
+        raise ValueError(f"years must be between 1 and {MAX_YEARS}")
+    if not 1 <= request.paths <= MAX_PATHS:
+        raise ValueError(f"paths must be between 1 and {MAX_PATHS}")
+    if request.seed < 0:
+        raise ValueError("seed must not be negative")
+    if not request.percentiles or not all(0 <= p <= 100 for p in request.percentiles):
+        raise ValueError("percentiles must be between 0 and 100")
+    for name in ('hike', 'variable_payout', 'rent_inflation'):
+        dist = getattr(request, name)
+        if dist.std < 0:
+            raise ValueError(f"{name}.std must not be negative")
+        if dist.low is not None and dist.high is not None and dist.low > dist.high:
+            raise ValueError(f"{name}.low must not be above {name}.high")
+
+
+def block_count(request: MonteCarloRequest) -> int:
+    return -(-request.paths // BLOCK_PATHS)
+
+
+def ranges(request: MonteCarloRequest, parts: int) -> list:
+    """(first block, end block) pairs splitting the run into at most parts contiguous pieces."""
+    blocks = block_count(request)
+    parts = max(1, min(parts, blocks))
+    bounds = np.linspace(0, blocks, parts + 1).round().astype(int)
+    return [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:])]
+
+
+def _draw(rng: np.random.Generator, dist: Distribution, shape: tuple) -> np.ndarray:
+    values = rng.normal(dist.mean, dist.std, shape) if dist.std > 0 else np.full(shape, dist.mean)
+    if dist.low is not None or dist.high is not None:
+        values = np.clip(values, dist.low, dist.high)
+    return values
+
+
+def _growth(rng: np.random.Generator, dist: Distribution, paths: int, years: int) -> np.ndarray:
+    # Compounded factor per (path, year); year 1 is the base
+    rates = _draw(rng, dist, (paths, years - 1))
+    return np.cumprod(np.concatenate([np.ones((paths, 1)), 1 + rates], axis=1), axis=1)
+
+
+def simulate_block(request: MonteCarloRequest, block: int) -> np.ndarray:
+    """Cumulative in-hand pay, shape (paths in block, years, 2) with old then new regime."""
+    paths = min(BLOCK_PATHS, request.paths - block * BLOCK_PATHS)
+    years = request.years
+    rng = np.random.default_rng(np.random.SeedSequence(request.seed, spawn_key=(block,)))
+    salary = _growth(rng, request.hike, paths, years)
+    payout = _draw(rng, request.variable_payout, (paths, years))
+    rent = _growth(rng, request.rent_inflation, paths, years)
+
+    base = TaxInputs.from_request(request.base)
+    columns = {name: np.full(paths * years, float(getattr(base, name))) for name in INPUT_FIELDS}
+    for name in GROWING_FIELDS:
+        columns[name] = getattr(base, name) * salary.ravel()
+    columns['variable_pay'] = base.variable_pay * (salary * payout).ravel()
+    columns['hra_rent_paid'] = base.hra_rent_paid * rent.ravel()
+
+    result = compare_tax_regimes_batch(columns, base.profile)
+    annual = np.stack([result[key]['in_hand_monthly'].reshape(paths, years) * 12
+                       for key in ('old_regime', 'new_regime')], axis=-1)
+    return np.cumsum(annual, axis=1)
+
+
+def simulate_range(request: MonteCarloRequest, start: int, stop: int) -> np.ndarray:
+    """simulate_block for blocks start..stop-1, stacked; the unit of work for one worker."""
+    return np.concatenate([simulate_block(request, block) for block in range(start, stop)])
+
+
+def summarise(request: MonteCarloRequest, cumulative: np.ndarray) -> dict:
+    """MonteCarloResponse-shaped dict from every path's cumulative in-hand pay."""
+    percentiles = list(request.percentiles)
+
+    def bands(values: np.ndarray) -> list:
+        table = np.percentile(values, percentiles, axis=0)
+        return [{'percentile': p, 'values': row.tolist()} for p, row in zip(percentiles, table)]
+
+    old, new = cumulative[..., 0], cumulative[..., 1]
+    return {
+        'years': list(range(1, request.years + 1)),
+        'paths': request.paths,
+        'seed': request.seed,
+        'old_regime': {'cumulative_in_hand': bands(old), 'mean': old.mean(axis=0).tolist()},
+        'new_regime': {'cumulative_in_hand': bands(new), 'mean': new.mean(axis=0).tolist()},
+        'old_minus_new': bands(old - new),
+        'probability_old_better': (old > new).mean(axis=0).tolist(),
+    }
+
+
+def simulate(request: MonteCarloRequest, executor=None, workers: int = 1) -> dict:
+    """
+    Run the whole projection. With a concurrent.futures executor the block
+    ranges are mapped over it (workers pieces); the result is the same
+    either way.
+    """
+    validate(request)
+    pieces = ranges(request, workers if executor is not None else 1)
+    if executor is None:
+        parts = [simulate_range(request, start, stop) for start, stop in pieces]
+    else:
+        parts = list(executor.map(simulate_range, *zip(*((request, start, stop) for start, stop in pieces))))
+    return summarise(request, np.concatenate(parts))
@@ -0,0 +1,207 @@
+import itertools
+import math
+
+import numpy as np
+
+from batch_engine import compare_tax_regimes_batch
+from models import OptimizeRequest, OptimizeResponse, SalaryInputs, Investments, TaxRequest
+from tax_core import profile_of
+from tax_engine import compare_tax_regimes
+from tax_rules import get_rules
+
+# Salary structure optimizer.
+#
+# CTC = basic + hra + lta + special_allowance + variable_pay + other_allowances
+#       + nps_employer
+#
+# For a given basic (B) and employer NPS (N) every other choice is dominated:
+# HRA goes up to its cap (it only ever raises the old-regime exemption), then
+# LTA up to its cap, special allowance takes the rest, and 80C is topped up to
+# the statutory limit net of employee PF. That leaves in-hand pay as a
+# piecewise-linear function of (B, N), so its maximum sits on a vertex of the
+# arrangement formed by
+#   - the constraint lines (min basic, N >= 0, N <= pct * B, pool exhausted),
+#   - the lines where a cap or min() in the deductions switches branch, and
+#   - the level sets where taxable income crosses a slab kink (breakpoints,
+#     rebate limit, end of marginal relief).
+# The first two families are enumerated directly. Taxable income is affine
+# between consecutive vertices on any of those lines, so the level-set
+# crossings are found by interpolation. All candidates, rounded to whole
+# rupees, are then scored in one batch-engine call.
+
+TOLERANCE = 1e-6
+
+
+def _pool(request: OptimizeRequest) -> float:
+    return request.ctc - request.variable_pay - request.other_allowances
+
+
+def _columns(request: OptimizeRequest, basic: np.ndarray, nps_employer: np.ndarray) -> dict:
+    c = request.constraints
+    cap_80c = get_rules("old", *profile_of(request)).caps['section_80c']
+
+    remaining = _pool(request) - basic - nps_employer
+    hra = np.minimum(np.floor(c.max_hra_pct * basic), remaining)
+    lta = np.minimum(c.lta_cap, remaining - hra)
+    pf = np.round(c.pf_rate * basic)
+    size = basic.shape[0]
+
+    return {
+        'basic': basic,
+        'hra': hra,
+        'special_allowance': remaining - hra - lta,
+        'lta': lta,
+        'variable_pay': np.full(size, float(request.variable_pay)),
+        'other_allowances': np.full(size, float(request.other_allowances)),
+        'pf_deduction': pf,
+        'professional_tax': np.full(size, float(request.professional_tax)),
+        'section_80c': np.minimum(request.max_section_80c, np.maximum(0.0, cap_80c - pf)),
+        'section_80d': np.full(size, float(request.section_80d)),
+        'hra_rent_paid': np.full(size, float(request.hra_rent_paid)),
+        'nps_self': np.full(size, float(request.nps_self)),
+        'nps_employer': nps_employer,
+        'home_loan_interest': np.full(size, float(request.home_loan_interest)),
+    }
+
+
+def _lines(request: OptimizeRequest, pool: float, min_basic: float) -> list:
+    # Each line is (a, b, c) for a * basic + b * nps_employer = c
+    c = request.constraints
+    caps = get_rules("old", *profile_of(request)).caps
+    h = c.max_hra_pct
+    rent = request.hra_rent_paid
+    rent_pct = caps['hra_rent_basic_pct']
+    hra_pct = caps['hra_basic_pct']
+
+    lines = [
+        # Feasible region
+        (1.0, 0.0, min_basic),
+        (0.0, 1.0, 0.0),
+        (-c.max_nps_employer_pct, 1.0, 0.0),
+        (1.0, 1.0, pool),
+        # HRA, then LTA, squeezed by the remaining pool
+        (1 + h, 1.0, pool),
+        (1 + h, 1.0, pool - c.lta_cap),
+        (1 + h, 1.0, pool - min(c.lta_cap, caps['lta'])),
+        # HRA exemption: min(HRA, rent - 10% basic, 50% basic) switching branch
+        (1.0, 0.0, rent / (h + rent_pct)),
+        (1.0, 0.0, rent / (hra_pct + rent_pct)),
+        (1.0, 0.0, rent / rent_pct),
+        (1 - rent_pct, 1.0, pool - rent),
+        (1 + hra_pct, 1.0, pool),
+    ]
+    if c.pf_rate > 0:
+        # 80C: employee PF plus investments reaching the cap
+        lines.append((1.0, 0.0, (caps['section_80c'] - request.max_section_80c) / c.pf_rate))
+        lines.append((1.0, 0.0, caps['section_80c'] / c.pf_rate))
+    return lines
+
+
+def _feasible(request: OptimizeRequest, pool: float, min_basic: float, basic, nps_employer, tolerance=TOLERANCE):
+    pct = request.constraints.max_nps_employer_pct
+    return (
+        (basic >= min_basic - tolerance) &
+        (nps_employer >= -tolerance) &
+        (nps_employer <= pct * basic + tolerance) &
+        (basic + nps_employer <= pool + tolerance)
+    )
+
+
+def _raw_taxable_income(regime: dict) -> np.ndarray:
+    # Taxable income before the max(0, ...) clamp, which is affine between vertices
+    return regime['gross_salary'] - sum(regime['deductions_breakdown'].values())
+
+
+def _vertices(request: OptimizeRequest, pool: float, min_basic: float) -> np.ndarray:
+    lines = _lines(request, pool, min_basic)
+
+    points = []
+    for (a1, b1, c1), (a2, b2, c2) in itertools.combinations(lines, 2):
+        det = a1 * b2 - a2 * b1
+        if abs(det) < TOLERANCE:
+            continue
+        points.append(((c1 * b2 - c2 * b1) / det, (a1 * c2 - a2 * c1) / det))
+
+    points = np.array(points)
+    points = points[_feasible(request, pool, min_basic, points[:, 0], points[:, 1])]
+    points = np.unique(np.round(points, 6), axis=0)
+
+    # Slab kinks crossed along each line between consecutive vertices
+    profile = profile_of(request)
+    result = compare_tax_regimes_batch(_columns(request, points[:, 0], points[:, 1]), profile)
+    taxable = {
+        regime: _raw_taxable_income(result[f'{regime}_regime'])
+        for regime in ('old', 'new')
+    }
+    levels = {regime: np.array(get_rules(regime, *profile).kinks()) for regime in ('old', 'new')}
+
+    crossings = [points]
+    for a, b, c in lines:
+        on_line = np.abs(a * points[:, 0] + b * points[:, 1] - c) <= TOLERANCE * (1 + abs(c))
+        if on_line.sum() < 2:
+            continue
+        idx = np.flatnonzero(on_line)
+        idx = idx[np.argsort(-b * points[idx, 0] + a * points[idx, 1])]
+        start, end = points[idx[:-1]], points[idx[1:]]
+
+        for regime in ('old', 'new'):
+            t0 = taxable[regime][idx[:-1]][:, None]
+            t1 = taxable[regime][idx[1:]][:, None]
+            level = levels[regime][None, :]
+            crosses = (t0 - level) * (t1 - level) < 0
+            if not crosses.any():
+                continue
+            # Only crossing segments, where t0 != t1; flat ones would divide by zero
+            seg, k = np.nonzero(crosses)
+            lo, hi = taxable[regime][idx[seg]], taxable[regime][idx[seg + 1]]
+            frac = ((levels[regime][k] - lo) / (hi - lo))[:, None]
+            crossings.append(start[seg] + frac * (end[seg] - start[seg]))
+
+    return np.concatenate(crossings)
+
+
+def _round_candidates(request: OptimizeRequest, pool: float, min_basic: float, vertices: np.ndarray) -> np.ndarray:
+    # Whole-rupee neighbours of every vertex, so cliffs such as the 87A rebate
+    # are approached from the right side
+    candidates = np.vstack([
+        np.column_stack([round_basic(vertices[:, 0]), round_nps(vertices[:, 1])])
+        for round_basic, round_nps in itertools.product((np.floor, np.ceil), repeat=2)
+    ])
+    candidates = np.vstack([candidates, [math.ceil(min_basic), 0.0]])
+    candidates = candidates[_feasible(request, pool, min_basic, candidates[:, 0], candidates[:, 1], tolerance=0)]
+    return np.unique(candidates, axis=0)
+
+
+def optimize_salary_structure(request: OptimizeRequest) -> OptimizeResponse:
+    """Split a fixed CTC to maximise in_hand_monthly under the better regime."""
+    pool = _pool(request)
+    min_basic = request.constraints.min_basic_pct * request.ctc
+    if pool < 0:
+        raise ValueError("variable_pay and other_allowances exceed the CTC")
+    if math.ceil(min_basic) > pool:
+        raise ValueError("Minimum basic does not fit in the CTC")
+
+    vertices = _vertices(request, pool, min_basic)
+    candidates = _round_candidates(request, pool, min_basic, vertices)
+
+    columns = _columns(request, candidates[:, 0], candidates[:, 1])
+    result = compare_tax_regimes_batch(columns, profile_of(request))
+    in_hand = np.maximum(result['old_regime']['in_hand_monthly'], result['new_regime']['in_hand_monthly'])
+    best = int(np.argmax(in_hand))
+
+    row = {name: float(values[best]) for name, values in columns.items()}
+    structure = TaxRequest(
+        salary=SalaryInputs(**{name: row[name] for name in SalaryInputs.model_fields}),
+        investments=Investments(**{name: row[name] for name in Investments.model_fields}),
+        fy=request.fy,
+        age_band=request.age_band,
+        metro=request.metro,
+    )
+    comparison = compare_tax_regimes(structure)
+    recommended = "Old" if comparison.old_regime.in_hand_monthly > comparison.new_regime.in_hand_monthly else "New"
+
+    return OptimizeResponse(
+        recommended_regime=recommended,
+        structure=structure,
+        comparison=comparison,
+    )
@@ -0,0 +1,393 @@
+"""
+Bulk payroll runs: CSV or Parquet in, the same rows plus tax results out.
+
+Input columns are the SalaryInputs/Investments field names; missing ones
+default to 0 and any other columns are passed through untouched. Optional
+fy, age_band and metro columns pick each row's rule set, so one file can
+mix years, senior employees and non-metro offices. Rows are
+read, computed through the batch engine and written in fixed-size chunks, so
+memory stays bounded by the chunk size whatever the file size. Each output
+row gains old_/new_ total_tax and in_hand_monthly, the recommended regime and
+one column per deduction in each regime's breakdown. Rows with unparseable
+numbers keep their input, get an error message and no results.
+--fixed-point computes in integer paise with statutory rounding (see
+fixed_point.py) for results that are reproducible to the paisa.
+
+    python payroll_io.py payroll.csv results.csv [--chunk-size 10000] [--fixed-point]
+
+Parquet (by .parquet extension) needs pyarrow.
+"""
+import argparse
+import codecs
+import collections
+import csv
+import io
+import itertools
+import re
+import sys
+import time
+
+import numpy as np
+
+import batch_engine
+import fixed_point
+import metrics
+from batch_engine import INPUT_FIELDS, compare_tax_regimes_batch
+from tax_core import PROFILE_FIELDS
+from tax_rules import DEFAULT_PROFILE, RuleProfile, profile_errors
+
+CHUNK_SIZE = 10000
+REGIMES = ('old', 'new')
+PARQUET_MAGIC = b'PAR1'
+TRUE_VALUES = {'true', '1', 'yes', 'y', 'metro'}
+FALSE_VALUES = {'false', '0', 'no', 'n', 'non-metro', 'non_metro'}
+
+
+class PayrollStats:
+    __slots__ = ('rows', 'errors', 'seconds')
+
+    def __init__(self):
+        self.rows = 0
+        self.errors = 0
+        self.seconds = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            'rows': self.rows,
+            'errors': self.errors,
+            'seconds': round(self.seconds, 3),
+            'rows_per_second': round(self.rows_per_second, 1),
+        }
+
+
+def _slug(label: str) -> str:
+    return re.sub(r'[^a-z0-9]+', '_', label.lower()).strip('_')
+
+
+def _breakdown_labels() -> dict:
+    # Labels as the engine emits them, read off a one-row run
+    result = compare_tax_regimes_batch({'basic': np.zeros(1)})
+    return {regime: list(result[f'{regime}_regime']['deductions_breakdown']) for regime in REGIMES}
+
+
+def result_columns() -> list:
+    columns = []
+    for regime in REGIMES:
+        columns += [f'{regime}_total_tax', f'{regime}_in_hand_monthly']
+    columns.append('recommended_regime')
+    for regime, labels in _breakdown_labels().items():
+        columns += [f'{regime}_{_slug(label)}' for label in labels]
+    columns.append('error')
+    return columns
+
+
+def _metro(value):
+    if isinstance(value, str):
+        text = value.strip().lower()
+        if text in TRUE_VALUES:
+            return True
+        if text in FALSE_VALUES:
+            return False
+    return value
+
+
+def _profiles(columns: dict, size: int, errors: list):
+    # Per-row RuleProfile, or None when the chunk has no profile columns; blanks take the default
+    if not any(name in columns for name in PROFILE_FIELDS):
+        return None
+    fields = [columns.get(name) or [None] * size for name in PROFILE_FIELDS]
+    profiles = []
+    for i, values in enumerate(zip(*fields)):
+        fy, age_band, metro = (
+            default if value is None or value == '' else value
+            for value, default in zip(values, DEFAULT_PROFILE)
+        )
+        profile = RuleProfile(fy, age_band, _metro(metro))
+        problems = profile_errors(profile)
+        if problems:
+            errors[i] = errors[i] or '; '.join(f"{name}: {' '.join(msgs)}" for name, msgs in problems.items())
+            profile = DEFAULT_PROFILE
+        profiles.append(profile)
+    return profiles
+
+
+def compute_chunk(columns: dict, size: int, fixed: bool = False) -> dict:
+    """
+    Results for one chunk of input columns (field -> sequence, values may be
+    strings). Returns output column -> list; failed rows get '' results.
+    fixed runs the integer-paise engine; its results are still in rupees.
+    Arguments and result pickle, so a server can run it in a worker process.
+    """
+    arrays = {}
+    errors = [''] * size
+    for name in INPUT_FIELDS:
+        values = columns.get(name)
+        if values is None:
+            continue
+        try:
+            arrays[name] = np.array(values, dtype=np.float64) # A copy: parquet columns are read-only
+        except (TypeError, ValueError):
+            # Fall back to per-value parsing to find the bad rows
+            parsed = np.zeros(size)
+            for i, value in enumerate(values):
+                try:
+                    parsed[i] = float(value) if str(value).strip() else 0.0
+                except (TypeError, ValueError):
+                    errors[i] = errors[i] or f"{name}: invalid number {value!r}"
+            arrays[name] = parsed
+    for name, values in arrays.items():
+        # "nan"/"inf" parse as floats but would give NaN taxes; the paise engine also has a range limit
+        for i in np.flatnonzero(~np.isfinite(values)):
+            errors[i] = errors[i] or f"{name}: invalid number {str(columns[name][i])!r}"
+            values[i] = 0.0
+        if fixed:
+            for i in np.flatnonzero(~(np.abs(values) <= fixed_point.MAX_RUPEES)):
+                errors[i] = errors[i] or f"{name}: {str(columns[name][i])!r} is out of range"
+                values[i] = 0.0
+    if not arrays:
+        arrays['basic'] = np.zeros(size)
+
+    profiles = _profiles(columns, size, errors)
+    engine = fixed_point if fixed else batch_engine
+    if profiles is None:
+        result = engine.compare_tax_regimes_batch(arrays)
+    else:
+        result = engine.compare_tax_regimes_grouped(arrays, profiles)
+    out = {}
+    for regime in REGIMES:
+        r = result[f'{regime}_regime']
+        out[f'{regime}_total_tax'] = r['total_tax']
+        out[f'{regime}_in_hand_monthly'] = r['in_hand_monthly']
+    better_old = result['old_regime']['in_hand_monthly'] > result['new_regime']['in_hand_monthly']
+    out['recommended_regime'] = np.where(better_old, 'Old', 'New')
+    for regime in REGIMES:
+        for label, values in result[f'{regime}_regime']['deductions_breakdown'].items():
+            out[f'{regime}_{_slug(label)}'] = values
+
+    if fixed:
+        out = {name: values if name == 'recommended_regime' else values / fixed_point.PAISE
+               for name, values in out.items()}
+    out = {name: values.tolist() for name, values in out.items()}
+    failed = [i for i, error in enumerate(errors) if error]
+    for values in out.values():
+        for i in failed:
+            values[i] = ''
+    out['error'] = errors
+    return out
+
+
+# ---- CSV ----
+
+def _csv_chunks(reader, chunk_size: int):
+    rows = []
+    for row in reader:
+        if not row:
+            continue
+        rows.append(row)
+        if len(rows) == chunk_size:
+            yield rows
+            rows = []
+    if rows:
+        yield rows
+
+
+def _timed(compute, size: int, *args):
+    started = time.perf_counter()
+    out = compute(*args)
+    metrics.record_batch('payroll', size, time.perf_counter() - started)
+    return out
+
+
+def csv_chunk(rows: list, index: dict, out_columns: list, fixed: bool = False) -> tuple:
+    """
+    (output CSV text, rows with errors) for one chunk of parsed input rows;
+    index maps input field -> column position. Arguments and result pickle,
+    so a server can run it in a worker process.
+    """
+    # Transpose in C; short rows simply lack the trailing columns
+    transposed = list(itertools.zip_longest(*rows, fillvalue=''))
+    out = compute_chunk({name: transposed[i] for name, i in index.items()}, len(rows), fixed)
+    buffer = _TextBuffer()
+    results = zip(*(out[name] for name in out_columns))
+    csv.writer(buffer, lineterminator='\n').writerows(row + list(result) for row, result in zip(rows, results))
+    return buffer.take(), sum(1 for error in out['error'] if error)
+
+
+def iter_csv(lines, chunk_size: int = CHUNK_SIZE, stats: PayrollStats = None, fixed: bool = False,
+             submit=None, ahead: int = 2):
+    """
+    Yield output CSV text, one piece per chunk, for an iterable of input CSV
+    lines. With submit(fn, *args) -> future (e.g. a process pool's), chunks
+    are rendered there, up to ahead at a time while the next ones are read,
+    and still come out in order.
+    """
+    stats = stats if stats is not None else PayrollStats()
+    started = time.perf_counter()
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if header is None:
+        return
+    index = {name: i for i, name in enumerate(header) if name in INPUT_FIELDS + PROFILE_FIELDS}
+    out_columns = result_columns()
+
+    buffer = _TextBuffer()
+    csv.writer(buffer, lineterminator='\n').writerow(header + out_columns)
+    yield buffer.take()
+
+    def finish(size, result):
+        text, errors = result
+        stats.rows += size
+        stats.errors += errors
+        stats.seconds = time.perf_counter() - started
+        return text
+
+    in_flight = collections.deque()
+    try:
+        for rows in _csv_chunks(reader, chunk_size):
+            if submit is None:
+                yield finish(len(rows), _timed(csv_chunk, len(rows), rows, index, out_columns, fixed))
+                continue
+            in_flight.append((len(rows), time.perf_counter(), submit(csv_chunk, rows, index, out_columns, fixed)))
+            if len(in_flight) >= ahead:
+                yield _collect(in_flight, finish)
+        while in_flight:
+            yield _collect(in_flight, finish)
+    finally:
+        # The consumer stopped early (e.g. the client went away): drop what hasn't started
+        for _, _, future in in_flight:
+            future.cancel()
+
+
+def _collect(in_flight, finish) -> str:
+    size, submitted, future = in_flight.popleft()
+    result = future.result()
+    metrics.record_batch('payroll', size, time.perf_counter() - submitted)
+    return finish(size, result)
+
+
+def check_csv(upload) -> None:
+    """
+    Raise ValueError unless a binary CSV upload is UTF-8 throughout and its
+    header names at least one input column; leaves it rewound. Lets a server
+    answer 400 before it starts streaming results.
+    """
+    upload.seek(0)
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    try:
+        for block in iter(lambda: upload.read(1 << 20), b''):
+            decoder.decode(block)
+        decoder.decode(b'', final=True)
+    except UnicodeDecodeError:
+        raise ValueError("CSV upload is not valid UTF-8") from None
+
+    upload.seek(0)
+    text = io.TextIOWrapper(upload, encoding='utf-8-sig', newline='')
+    try:
+        header = next(csv.reader(text), None)
+    except csv.Error as e:
+        raise ValueError(f"Malformed CSV header: {e}") from None
+    finally:
+        text.detach()
+        upload.seek(0)
+    if not header:
+        raise ValueError("CSV upload is empty")
+    if not any(name in INPUT_FIELDS for name in header):
+        raise ValueError("CSV header names none of the salary or investment columns")
+
+
+class _TextBuffer:
+    # Minimal file object for csv.writer that hands back what was written
+    def __init__(self):
+        self._parts = []
+
+    def write(self, text: str):
+        self._parts.append(text)
+
+    def take(self) -> str:
+        text, self._parts = ''.join(self._parts), []
+        return text
+
+
+def process_csv(src_path: str, dst_path: str, chunk_size: int = CHUNK_SIZE, fixed: bool = False) -> PayrollStats:
+    stats = PayrollStats()
+    with open(src_path, newline='', encoding='utf-8-sig') as src, open(dst_path, 'w', newline='') as dst:
+        for text in iter_csv(src, chunk_size, stats, fixed):
+            dst.write(text)
+    return stats
+
+
+# ---- Parquet ----
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Parquet support needs pyarrow (pip install pyarrow)") from None
+    return pyarrow
+
+
+def process_parquet(src, dst, chunk_size: int = CHUNK_SIZE, fixed: bool = False,
+                    compute=compute_chunk) -> PayrollStats:
+    """src/dst are paths or binary file objects; compute stands in for compute_chunk."""
+    pa = _pyarrow()
+    stats = PayrollStats()
+    started = time.perf_counter()
+    reader = pa.parquet.ParquetFile(src)
+    writer = None
+    try:
+        for batch in reader.iter_batches(batch_size=chunk_size):
+            columns = {
+                name: batch.column(name).fill_null(0).to_numpy(zero_copy_only=False)
+                for name in INPUT_FIELDS if name in batch.schema.names
+            }
+            columns.update({
+                name: batch.column(name).to_pylist() for name in PROFILE_FIELDS if name in batch.schema.names
+            })
+            out = _timed(compute, batch.num_rows, columns, batch.num_rows, fixed)
+            for name, values in out.items():
+                if name not in ('recommended_regime', 'error'):
+                    # Failed rows become nulls rather than ''
+                    values = [None if v == '' else v for v in values]
+                batch = batch.append_column(name, pa.array(values))
+            if writer is None:
+                writer = pa.parquet.ParquetWriter(dst, batch.schema)
+            writer.write_batch(batch)
+            stats.rows += batch.num_rows
+            stats.errors += sum(1 for error in out['error'] if error)
+            stats.seconds = time.perf_counter() - started
+    finally:
+        if writer is not None:
+            writer.close()
+    return stats
+
+
+def is_parquet(head: bytes) -> bool:
+    return head[:4] == PARQUET_MAGIC
+
+
+def process_file(src_path: str, dst_path: str, chunk_size: int = CHUNK_SIZE, fixed: bool = False) -> PayrollStats:
+    if src_path.endswith('.parquet') or dst_path.endswith('.parquet'):
+        return process_parquet(src_path, dst_path, chunk_size, fixed)
+    return process_csv(src_path, dst_path, chunk_size, fixed)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('input')
+    parser.add_argument('output')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--fixed-point', action='store_true', help='Integer-paise arithmetic (fixed_point.py)')
+    args = parser.parse_args(argv)
+
+    stats = process_file(args.input, args.output, args.chunk_size, args.fixed_point)
+    print(f"{stats.rows} rows ({stats.errors} with errors) in {stats.seconds:.2f}s, "
+          f"{stats.rows_per_second:,.0f} rows/s", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
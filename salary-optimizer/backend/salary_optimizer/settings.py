@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -43,6 +44,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -80,10 +82,36 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # WAL lets history reads run alongside scenario writes; IMMEDIATE
+        # transactions take the write lock up front instead of failing on upgrade
+        'OPTIONS': {
+            'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;',
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
 
+# Caches
+# 'tax_results' memoizes /api/calculate responses. Point TAX_CACHE_BACKEND at
+# django.core.cache.backends.filebased.FileBasedCache (with TAX_CACHE_LOCATION
+# set to a directory) to share entries between worker processes.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'tax_results': {
+        'BACKEND': os.environ.get('TAX_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('TAX_CACHE_LOCATION', 'tax-results'),
+        'TIMEOUT': int(os.environ.get('TAX_CACHE_TTL', 300)),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('TAX_CACHE_SIZE', 4096)),
+        },
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -121,3 +149,4 @@ USE_TZ = True
 STATIC_URL = 'static/'
 
 CORS_ALLOW_ALL_ORIGINS = True # For development, match FastAPI's lax policy
+CORS_EXPOSE_HEADERS = ['X-Profile-Id']  # Set on X-Profile requests (metrics.py)
@@ -17,7 +17,11 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from api.views import metrics_exposition, metrics_profile
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('api.urls')),
+    path('metrics', metrics_exposition, name='metrics'),
+    path('metrics/profiles/<str:profile_id>', metrics_profile, name='metrics_profile'),
 ]
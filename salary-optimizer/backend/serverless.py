@@ -0,0 +1,123 @@
+import time
+
+import codec
+import metrics
+from tax_cache import cached_comparison_json, shared_cache
+from tax_core import InvalidInput, decode_request
+
+# Cold-start friendly ASGI entry for serverless deployments (api/index.py).
+#
+# POST /api/calculate, the interactive hot path, is answered here with
+# tax_core alone, sharing main's response cache. Every other request is
+# handed to main.app, and so is any calculate body the fast decode rejects,
+# so clients still get FastAPI's 422 payloads. main (FastAPI, Pydantic,
+# numpy) is only imported on first use, which keeps it off the cold-start
+# path of a function that mostly serves calculations. Lifespan events are
+# answered here for the same reason. Fast-path requests are counted in
+# metrics directly (main's middleware never sees them); X-Profile requests
+# go to main, which runs the profiler.
+
+CALCULATE_PATH = '/api/calculate'
+
+
+async def _read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            raise ConnectionError("Client disconnected")
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body', False):
+            return b''.join(chunks)
+
+
+def _replay(body: bytes, receive):
+    # Hand an already-read body to the full app, then fall through to receive
+    sent = False
+
+    async def replay():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+        return await receive()
+
+    return replay
+
+
+def _headers(scope, content: bytes) -> list:
+    headers = [
+        (b'content-length', str(len(content)).encode()),
+        (b'content-type', b'application/json'),
+    ]
+    # Same answer main's CORSMiddleware (all origins, credentials) gives a simple request
+    request_headers = dict(scope.get('headers') or ())
+    origin = request_headers.get(b'origin')
+    if origin is not None:
+        if b'cookie' in request_headers:
+            headers.append((b'access-control-allow-origin', origin))
+            headers.append((b'vary', b'Origin'))
+        else:
+            headers.append((b'access-control-allow-origin', b'*'))
+        headers.append((b'access-control-allow-credentials', b'true'))
+    return headers
+
+
+def _profiled(scope) -> bool:
+    for name, value in scope.get('headers') or ():
+        if name == b'x-profile':
+            return metrics.wants_profile(value)
+    return False
+
+
+class ServerlessApp:
+    def __init__(self):
+        self._app = None
+
+    @property
+    def full_app(self):
+        if self._app is None:
+            from main import app
+            self._app = app
+        return self._app
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self._app is not None:
+                    import main
+                    main.jobs.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+
+        if (scope['type'] == 'http' and scope['method'] == 'POST' and scope['path'] == CALCULATE_PATH
+                and not _profiled(scope)):
+            started = time.perf_counter()
+            try:
+                body = await _read_body(receive)
+            except ConnectionError:
+                return
+            try:
+                with metrics.stage('decode'):
+                    inputs = decode_request(codec.loads(body))
+            except (InvalidInput, ValueError):
+                receive = _replay(body, receive)
+            else:
+                content = cached_comparison_json(shared_cache(), inputs)
+                await send({'type': 'http.response.start', 'status': 200, 'headers': _headers(scope, content)})
+                await send({'type': 'http.response.body', 'body': content})
+                metrics.record_request(CALCULATE_PATH, 'POST', 200, time.perf_counter() - started)
+                return
+
+        await self.full_app(scope, receive, send)
+
+
+app = ServerlessApp()
@@ -0,0 +1,211 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+from typing import NamedTuple, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# In-memory delivery of the built frontend (input_dist) for main.py.
+#
+# The directory is indexed once at startup into a manifest of path -> Asset,
+# so a request is one dict lookup with no filesystem calls. Each asset keeps
+# its bytes, a content-hash ETag and its compressed variants. .br / .gz
+# files shipped next to an asset are used as they are. Otherwise
+# compressible types are gzipped at startup (and brotli-compressed when the
+# optional brotli package is installed). Variants that don't shrink the
+# file are dropped.
+#
+# Vite puts content-hashed bundles under assets/, so those are cached for a
+# year as immutable. index.html is revalidated on every load (no-cache plus
+# ETag, answered with 304), and other files are cached for an hour. Unknown
+# paths get index.html so client-side routes work, except under assets/
+# where a missing bundle is a 404 and not HTML. Files over MAX_MEMORY_BYTES
+# keep only their metadata and are streamed from disk.
+
+INDEX = 'index.html'
+HASHED_PREFIX = 'assets/'
+MAX_MEMORY_BYTES = 4 * 1024 * 1024
+MIN_COMPRESS_BYTES = 512
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+SHORT = 'public, max-age=3600'
+
+COMPRESSIBLE = ('text/', 'application/javascript', 'application/json', 'application/xml',
+                'image/svg+xml', 'application/wasm', 'application/manifest+json')
+# Preference order when the client accepts several
+ENCODINGS = ('br', 'gzip')
+_SUFFIXES = {'.br': 'br', '.gz': 'gzip'}
+
+
+class Asset(NamedTuple):
+    path: str  # on disk
+    content_type: str
+    etag: str  # without quotes; variants append their encoding
+    cache_control: str
+    body: Optional[bytes]  # None when too large to keep in memory
+    # encoding -> compressed bytes
+    variants: dict
+
+
+class StaticResponse(NamedTuple):
+    status: int
+    headers: dict
+    body: bytes
+    # Set instead of body for assets served from disk
+    file_path: Optional[str] = None
+
+
+def _content_type(name: str) -> str:
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    if content_type.startswith('text/') or content_type in ('application/javascript', 'application/json'):
+        content_type += '; charset=utf-8'
+    return content_type
+
+
+def _compressible(content_type: str) -> bool:
+    return content_type.startswith(COMPRESSIBLE)
+
+
+def _compress(body: bytes) -> dict:
+    variants = {'gzip': gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['br'] = brotli.compress(body, quality=11)
+    return variants
+
+
+def _digest(f) -> str:
+    h = hashlib.blake2b(digest_size=12)
+    for block in iter(lambda: f.read(1 << 20), b''):
+        h.update(block)
+    return h.hexdigest()
+
+
+def accepted_encodings(header: str) -> Tuple[str, ...]:
+    """Encodings from an Accept-Encoding header with a non-zero q, e.g. ('br', 'gzip')."""
+    accepted = []
+    for part in (header or '').split(','):
+        name, _, params = part.strip().partition(';')
+        params = params.replace(' ', '')
+        if not name or params in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        accepted.append(name.lower())
+    if '*' in accepted:
+        accepted.extend(ENCODINGS)
+    return tuple(accepted)
+
+
+class StaticSite:
+    def __init__(self, root: str):
+        self.root = root
+        self.manifest = {}
+        self.index()
+
+    def index(self) -> None:
+        """(Re)build the manifest from the files under root."""
+        manifest = {}
+        shipped = {}
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                full = os.path.join(directory, name)
+                rel = os.path.relpath(full, self.root).replace(os.sep, '/')
+                base, suffix = os.path.splitext(rel)
+                if suffix in _SUFFIXES:
+                    # Precompressed sibling of base, attached below
+                    shipped.setdefault(base, {})[_SUFFIXES[suffix]] = (rel, full)
+                    continue
+                manifest[rel] = self._load(rel, full)
+
+        for rel, files in shipped.items():
+            asset = manifest.get(rel)
+            if asset is None:
+                # No uncompressed original: an archive served as itself
+                for name, full in files.values():
+                    manifest[name] = self._load(name, full)
+                continue
+            if asset.body is None:
+                continue
+            variants = dict(asset.variants)
+            for encoding, (_, full) in files.items():
+                with open(full, 'rb') as f:
+                    variants[encoding] = f.read()
+            manifest[rel] = asset._replace(variants=self._smaller(asset.body, variants))
+        self.manifest = manifest
+
+    def _load(self, rel: str, full: str) -> Asset:
+        content_type = _content_type(rel)
+        if rel == INDEX:
+            cache_control = REVALIDATE
+        elif rel.startswith(HASHED_PREFIX):
+            cache_control = IMMUTABLE
+        else:
+            cache_control = SHORT
+
+        if os.path.getsize(full) > MAX_MEMORY_BYTES:
+            with open(full, 'rb') as f:
+                etag = _digest(f)
+            return Asset(full, content_type, etag, cache_control, None, {})
+
+        with open(full, 'rb') as f:
+            body = f.read()
+        variants = {}
+        if len(body) >= MIN_COMPRESS_BYTES and _compressible(content_type):
+            variants = self._smaller(body, _compress(body))
+        etag = hashlib.blake2b(body, digest_size=12).hexdigest()
+        return Asset(full, content_type, etag, cache_control, body, variants)
+
+    @staticmethod
+    def _smaller(body: bytes, variants: dict) -> dict:
+        return {encoding: data for encoding, data in variants.items() if len(data) < len(body)}
+
+    def lookup(self, path: str) -> Optional[Asset]:
+        """The asset for a request path, with the SPA fallback to index.html; None means 404."""
+        path = path.lstrip('/')
+        asset = self.manifest.get(path or INDEX)
+        if asset is None and not path.startswith(HASHED_PREFIX):
+            asset = self.manifest.get(INDEX)
+        return asset
+
+    def respond(self, path: str, accept_encoding: str = '', if_none_match: str = '') -> Optional[StaticResponse]:
+        """Status, headers and body for a GET of path; None when there is nothing to serve."""
+        asset = self.lookup(path)
+        if asset is None:
+            return None
+
+        encoding = None
+        if asset.variants:
+            accepted = accepted_encodings(accept_encoding)
+            encoding = next((e for e in ENCODINGS if e in accepted and e in asset.variants), None)
+        etag = f'"{asset.etag}-{encoding}"' if encoding else f'"{asset.etag}"'
+        headers = {'etag': etag, 'cache-control': asset.cache_control}
+        if asset.variants:
+            headers['vary'] = 'Accept-Encoding'
+
+        if if_none_match and _etag_matches(if_none_match, asset.etag):
+            return StaticResponse(304, headers, b'')
+
+        headers['content-type'] = asset.content_type
+        if encoding:
+            headers['content-encoding'] = encoding
+            return StaticResponse(200, headers, asset.variants[encoding])
+        if asset.body is None:
+            return StaticResponse(200, headers, b'', asset.path)
+        return StaticResponse(200, headers, asset.body)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    # Any representation of the same content matches, whatever its encoding
+    if header.strip() == '*':
+        return True
+    for candidate in header.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        candidate = candidate.strip('"')
+        if candidate == etag or candidate.rpartition('-')[0] == etag:
+            return True
+    return False
@@ -0,0 +1,90 @@
+import numpy as np
+
+import codec
+from batch_engine import INPUT_FIELDS, compare_tax_regimes_batch
+from models import SweepRequest
+from tax_core import EARNING_FIELDS, TaxInputs
+
+# Sensitivity sweeps for the "what if" charts.
+#
+# A base TaxRequest is expanded into a 1-D or 2-D grid over one or two input
+# fields and the whole grid goes through the batch engine in a single call,
+# so a 500 x 500 sweep costs one vectorized pass instead of 250k requests.
+#
+# Besides the SalaryInputs/Investments fields, an axis can sweep
+# "gross_salary": every earning component (basic, HRA, special allowance,
+# LTA, variable pay, other allowances) is scaled in proportion so the
+# structure of the base salary is kept. PF and professional tax stay as given.
+
+GROSS_SALARY = 'gross_salary'
+SWEEP_FIELDS = INPUT_FIELDS + (GROSS_SALARY,)
+GRID_FIELDS = ('total_tax', 'in_hand_monthly')
+
+MAX_AXIS_POINTS = 2000
+MAX_GRID_POINTS = 1_000_000
+
+
+def axis_values(start: float, stop: float, step: float) -> np.ndarray:
+    """start, start + step, ... up to and including stop (within rounding)."""
+    if step <= 0:
+        raise ValueError("step must be positive")
+    if stop < start:
+        raise ValueError("stop must not be below start")
+    count = int(np.floor((stop - start) / step + 1e-9)) + 1
+    if count > MAX_AXIS_POINTS:
+        raise ValueError(f"An axis may have at most {MAX_AXIS_POINTS} points")
+    return start + step * np.arange(count, dtype=np.float64)
+
+
+def _grid_columns(base: TaxInputs, axes: list, values: list) -> dict:
+    grids = np.meshgrid(*values, indexing='ij')
+    size = grids[0].size
+    columns = {name: np.full(size, float(getattr(base, name))) for name in INPUT_FIELDS}
+
+    for axis, grid in zip(axes, grids):
+        if axis.field != GROSS_SALARY:
+            continue
+        base_gross = sum(getattr(base, name) for name in EARNING_FIELDS)
+        if base_gross <= 0:
+            raise ValueError("gross_salary can only be swept from a base salary above zero")
+        scale = grid.ravel() / base_gross
+        for name in EARNING_FIELDS:
+            columns[name] = getattr(base, name) * scale
+
+    for axis, grid in zip(axes, grids):
+        if axis.field != GROSS_SALARY:
+            columns[axis.field] = grid.ravel()
+    return columns
+
+
+def sweep(request: SweepRequest) -> dict:
+    """SweepResponse-shaped dict; grids are nested lists indexed [axis0][axis1]."""
+    axes = request.axes
+    if not 1 <= len(axes) <= 2:
+        raise ValueError("Sweep one or two fields")
+    fields = [axis.field for axis in axes]
+    for field in fields:
+        if field not in SWEEP_FIELDS:
+            raise ValueError(f"Cannot sweep '{field}'")
+    if len(set(fields)) != len(fields):
+        raise ValueError("Each field can only be swept once")
+
+    values = [axis_values(axis.start, axis.stop, axis.step) for axis in axes]
+    shape = tuple(len(v) for v in values)
+    if int(np.prod(shape)) > MAX_GRID_POINTS:
+        raise ValueError(f"A sweep may have at most {MAX_GRID_POINTS} points")
+
+    base = TaxInputs.from_request(request.base)
+    result = compare_tax_regimes_batch(_grid_columns(base, axes, values), base.profile)
+
+    response = {
+        'axes': [{'field': axis.field, 'values': v.tolist()} for axis, v in zip(axes, values)],
+    }
+    for key in ('old_regime', 'new_regime'):
+        response[key] = {name: result[key][name].reshape(shape).tolist() for name in GRID_FIELDS}
+    return response
+
+
+def sweep_json(request: SweepRequest) -> bytes:
+    """sweep() encoded with codec; run in a worker process, bytes are cheap to send back."""
+    return codec.dumps(sweep(request))
@@ -0,0 +1,188 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable
+
+import tax_core
+from metrics import registry, stage
+from tax_core import INVESTMENT_FIELDS, SALARY_FIELDS, TaxInputs
+from tax_rules import DEFAULT_PROFILE
+
+# In-process memo of encoded /api/calculate responses.
+# Slider-driven traffic resends the same TaxRequest over and over, so
+# requests are reduced to a canonical form (every field rounded to the
+# rupee) and hashed. The engine then runs on the canonical form, which makes
+# a cached response exact for every request that maps to the same key.
+#
+# Misses are coalesced: while one thread computes a key, identical
+# concurrent requests wait for its result instead of running the engine
+# again (counted as coalesced). The frontend debounces and cancels
+# superseded requests, so what does arrive in a burst tends to be identical.
+
+_MISSING = object()
+
+
+class _Flight:
+    # One in-progress computation that identical concurrent misses wait on
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+def canonical_values(inputs: TaxInputs) -> tuple:
+    """Rupee-rounded field values in a fixed order."""
+    return tuple(int(round(getattr(inputs, name))) for name in SALARY_FIELDS + INVESTMENT_FIELDS)
+
+
+def canonical_key(inputs: TaxInputs) -> str:
+    source = ','.join(map(str, canonical_values(inputs)))
+    if inputs.profile != DEFAULT_PROFILE:
+        # Default-profile keys stay as they were, so stored results remain addressable
+        source += '|' + ','.join(map(str, inputs.profile))
+    return hashlib.blake2b(source.encode(), digest_size=16).hexdigest()
+
+
+def canonical_inputs(inputs: TaxInputs) -> TaxInputs:
+    return TaxInputs(*(float(value) for value in canonical_values(inputs)), profile=inputs.profile)
+
+
+class TaxCache:
+    """
+    Bounded LRU with a per-entry TTL and hit/miss counters.
+
+    Pass a Django cache (e.g. django.core.cache.caches['tax_results']) as
+    backend to share entries between workers; eviction and expiry are then
+    left to that backend.
+    """
+
+    def __init__(self, maxsize: int = 4096, ttl: float = 300, backend=None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._clock = clock
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._flights = {}  # key -> _Flight, while a miss is being computed
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default=None):
+        if self.backend is not None:
+            value = self.backend.get(key, _MISSING)
+            with self._lock:
+                if value is _MISSING:
+                    self.misses += 1
+                    return default
+                self.hits += 1
+                return value
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > self._clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: str, value) -> None:
+        if self.backend is not None:
+            self.backend.set(key, value)
+            return
+
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get_or_set(self, key: str, compute: Callable[[], object]):
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.coalesced += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = compute()
+            self.set(key, flight.value)
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def clear(self) -> None:
+        if self.backend is not None:
+            self.backend.clear()
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'size': len(self._entries),
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared_cache() -> TaxCache:
+    """The process-wide /api/calculate cache, sized by TAX_CACHE_SIZE and TAX_CACHE_TTL."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = TaxCache(
+                maxsize=int(os.environ.get("TAX_CACHE_SIZE", 4096)),
+                ttl=float(os.environ.get("TAX_CACHE_TTL", 300)),
+            )
+            registry.register_cache('calculate', _shared)
+        return _shared
+
+
+def cached_comparison_json(cache: TaxCache, inputs: TaxInputs) -> bytes:
+    """JSON-encoded ComparisonResponse, computed at most once per key and TTL."""
+    def compute():
+        with stage('compute'):
+            result = tax_core.compare(canonical_inputs(inputs))
+        with stage('encode'):
+            return result.to_json()
+
+    return cache.get_or_set(canonical_key(inputs), compute)
@@ -0,0 +1,300 @@
+import math
+
+import codec
+from tax_rules import DEFAULT_PROFILE, RuleProfile, get_rules, profile_errors
+
+# Allocation-light tax core shared by every entry point.
+#
+# FastAPI (main.py), Django (api/views.py) and the Vercel handler
+# (api/calculate.py) only decode into TaxInputs and encode a
+# ComparisonResult; the arithmetic lives here once. It only uses the
+# standard library so the Vercel function can import it.
+
+SALARY_FIELDS = (
+    'basic',
+    'hra',
+    'special_allowance',
+    'lta',
+    'variable_pay',
+    'other_allowances',
+    'pf_deduction',
+    'professional_tax',
+)
+
+# Salary fields that count towards gross salary (PF and professional tax are deductions)
+EARNING_FIELDS = ('basic', 'hra', 'special_allowance', 'lta', 'variable_pay', 'other_allowances')
+
+INVESTMENT_FIELDS = (
+    'section_80c',
+    'section_80d',
+    'hra_rent_paid',
+    'nps_self',
+    'nps_employer',
+    'home_loan_interest',
+)
+
+# Inputs the new regime's result depends on (the old regime reads every input)
+NEW_REGIME_FIELDS = EARNING_FIELDS + ('pf_deduction', 'professional_tax', 'nps_employer')
+
+# Optional top-level request fields selecting the rule set (see tax_rules.RuleProfile)
+PROFILE_FIELDS = RuleProfile._fields
+
+RESULT_FIELDS = (
+    'regime',
+    'gross_salary',
+    'taxable_income',
+    'tax_amount',
+    'surcharge',
+    'cess',
+    'total_tax',
+    'in_hand_monthly',
+    'deductions_breakdown',
+)
+
+
+class InvalidInput(ValueError):
+    """Raised by decode_request; errors mirrors DRF's nested field -> [messages] shape."""
+
+    def __init__(self, errors: dict):
+        super().__init__(errors)
+        self.errors = errors
+
+
+class TaxInputs:
+    __slots__ = SALARY_FIELDS + INVESTMENT_FIELDS + ('profile',)
+
+    def __init__(self, basic=0.0, hra=0.0, special_allowance=0.0, lta=0.0, variable_pay=0.0,
+                 other_allowances=0.0, pf_deduction=0.0, professional_tax=0.0, section_80c=0.0,
+                 section_80d=0.0, hra_rent_paid=0.0, nps_self=0.0, nps_employer=0.0,
+                 home_loan_interest=0.0, profile=DEFAULT_PROFILE):
+        self.basic = basic
+        self.hra = hra
+        self.special_allowance = special_allowance
+        self.lta = lta
+        self.variable_pay = variable_pay
+        self.other_allowances = other_allowances
+        self.pf_deduction = pf_deduction
+        self.professional_tax = professional_tax
+        self.section_80c = section_80c
+        self.section_80d = section_80d
+        self.hra_rent_paid = hra_rent_paid
+        self.nps_self = nps_self
+        self.nps_employer = nps_employer
+        self.home_loan_interest = home_loan_interest
+        self.profile = profile
+
+    @classmethod
+    def from_objects(cls, salary, investments, profile: RuleProfile = DEFAULT_PROFILE) -> 'TaxInputs':
+        """Copy fields off attribute-style objects (Pydantic models, namespaces)."""
+        inputs = cls.__new__(cls)
+        for name in SALARY_FIELDS:
+            setattr(inputs, name, getattr(salary, name))
+        for name in INVESTMENT_FIELDS:
+            setattr(inputs, name, getattr(investments, name))
+        inputs.profile = profile
+        return inputs
+
+    @classmethod
+    def from_request(cls, request) -> 'TaxInputs':
+        """From a TaxRequest (or anything with salary, investments and the profile fields)."""
+        return cls.from_objects(request.salary, request.investments, profile_of(request))
+
+    @classmethod
+    def from_mapping(cls, salary: dict, investments: dict, profile: RuleProfile = DEFAULT_PROFILE) -> 'TaxInputs':
+        """Lenient decode: missing fields default to 0 (the Vercel handler's behaviour)."""
+        inputs = cls.__new__(cls)
+        for name in SALARY_FIELDS:
+            setattr(inputs, name, float(salary.get(name, 0)))
+        for name in INVESTMENT_FIELDS:
+            setattr(inputs, name, float(investments.get(name, 0)))
+        inputs.profile = profile
+        return inputs
+
+    def rules(self, regime: str):
+        return get_rules(regime, *self.profile)
+
+
+def profile_of(obj) -> RuleProfile:
+    """RuleProfile from the fy/age_band/metro attributes of a request model."""
+    return RuleProfile(*(getattr(obj, name, default) for name, default in zip(PROFILE_FIELDS, DEFAULT_PROFILE)))
+
+
+def decode_profile(data: dict) -> RuleProfile:
+    """RuleProfile from a request body's optional top-level fields; raises InvalidInput."""
+    if not any(name in data for name in PROFILE_FIELDS):
+        return DEFAULT_PROFILE
+    profile = RuleProfile(*(data.get(name, default) for name, default in zip(PROFILE_FIELDS, DEFAULT_PROFILE)))
+    errors = profile_errors(profile)
+    if errors:
+        raise InvalidInput(errors)
+    return profile
+
+
+def decode_number(value) -> float:
+    """A finite float from a JSON value; raises TypeError or ValueError (float() alone accepts "nan" and "inf")."""
+    if isinstance(value, (dict, list)) or value is None:
+        raise TypeError
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError
+    return number
+
+
+def _decode_section(data, fields, errors: dict, section: str, inputs: TaxInputs):
+    if not isinstance(data, dict):
+        errors[section] = {'non_field_errors': ['Invalid data. Expected a dictionary.']}
+        return
+    section_errors = {}
+    for name in fields:
+        if name not in data:
+            section_errors[name] = ['This field is required.']
+            continue
+        try:
+            setattr(inputs, name, decode_number(data[name]))
+        except (TypeError, ValueError):
+            section_errors[name] = ['A valid number is required.']
+    if section_errors:
+        errors[section] = section_errors
+
+
+def decode_request(data) -> TaxInputs:
+    """Strict decode of a {"salary": {...}, "investments": {...}, "fy"?, "age_band"?, "metro"?} body."""
+    if not isinstance(data, dict):
+        raise InvalidInput({'non_field_errors': ['Invalid data. Expected a dictionary.']})
+
+    inputs = TaxInputs.__new__(TaxInputs)
+    errors = {}
+    for section, fields in (('salary', SALARY_FIELDS), ('investments', INVESTMENT_FIELDS)):
+        if section not in data:
+            errors[section] = ['This field is required.']
+            continue
+        _decode_section(data[section], fields, errors, section, inputs)
+    try:
+        inputs.profile = decode_profile(data)
+    except InvalidInput as e:
+        errors.update(e.errors)
+    if errors:
+        raise InvalidInput(errors)
+    return inputs
+
+
+class RegimeResult:
+    __slots__ = RESULT_FIELDS
+
+    def as_dict(self) -> dict:
+        return {
+            'regime': self.regime,
+            'gross_salary': self.gross_salary,
+            'taxable_income': self.taxable_income,
+            'tax_amount': self.tax_amount,
+            'surcharge': self.surcharge,
+            'cess': self.cess,
+            'total_tax': self.total_tax,
+            'in_hand_monthly': self.in_hand_monthly,
+            'deductions_breakdown': self.deductions_breakdown,
+        }
+
+
+class ComparisonResult:
+    __slots__ = ('old_regime', 'new_regime')
+
+    def __init__(self):
+        self.old_regime = RegimeResult()
+        self.new_regime = RegimeResult()
+
+    def as_dict(self) -> dict:
+        return {
+            'old_regime': self.old_regime.as_dict(),
+            'new_regime': self.new_regime.as_dict(),
+        }
+
+    def to_json(self) -> bytes:
+        return codec.dumps(self.as_dict())
+
+
+def gross_salary(inputs: TaxInputs) -> float:
+    return (
+        inputs.basic +
+        inputs.hra +
+        inputs.special_allowance +
+        inputs.lta +
+        inputs.variable_pay +
+        inputs.other_allowances
+    )
+
+
+def _finish(out: RegimeResult, regime: str, rules, inputs: TaxInputs, gross: float,
+            deductions: dict, taxable_income: float, tax: float) -> RegimeResult:
+    surcharge = rules.surcharge.amount(taxable_income, tax)
+    cess = (tax + surcharge) * rules.cess_rate
+    total_tax = tax + surcharge + cess
+
+    out.regime = regime
+    out.gross_salary = gross
+    out.taxable_income = taxable_income
+    out.tax_amount = tax
+    out.surcharge = surcharge
+    out.cess = cess
+    out.total_tax = total_tax
+    out.in_hand_monthly = (gross - inputs.pf_deduction - inputs.professional_tax - total_tax) / 12
+    out.deductions_breakdown = deductions
+    return out
+
+
+def calculate_new_regime(inputs: TaxInputs, gross: float, out: RegimeResult = None) -> RegimeResult:
+    rules = inputs.rules("new")
+
+    # Deductions allowed: 80CCD(2) (NPS Employer) + Std Deduction
+    deductions = {
+        'Standard Deduction': rules.standard_deduction,
+        'NPS Employer (80CCD(2))': inputs.nps_employer
+    }
+
+    taxable_income = max(0.0, gross - sum(deductions.values()))
+
+    # Rebate 87A up to the limit, marginal relief just above it
+    tax = rules.income_tax(taxable_income)
+
+    return _finish(out or RegimeResult(), "New", rules, inputs, gross, deductions, taxable_income, tax)
+
+
+def calculate_old_regime(inputs: TaxInputs, gross: float, out: RegimeResult = None) -> RegimeResult:
+    rules = inputs.rules("old")
+    caps = rules.caps
+
+    # HRA Exemption
+    # Min of: HRA Received, Rent Paid - 10% Basic, 50% (metro) or 40% Basic
+    hra_exemption = max(0.0, min(
+        inputs.hra,
+        inputs.hra_rent_paid - (caps['hra_rent_basic_pct'] * inputs.basic),
+        caps['hra_basic_pct'] * inputs.basic
+    ))
+
+    deductions = {
+        'Standard Deduction': rules.standard_deduction,
+        'Professional Tax': inputs.professional_tax,
+        'HRA Exemption': hra_exemption,
+        'Section 80C': min(inputs.section_80c + inputs.pf_deduction, caps['section_80c']),  # 80C + PF
+        'Section 80D': min(inputs.section_80d, caps['section_80d']),
+        'NPS Self (80CCD(1B))': min(inputs.nps_self, caps['nps_self']),
+        'NPS Employer (80CCD(2))': inputs.nps_employer,
+        'Home Loan Interest': min(inputs.home_loan_interest, caps['home_loan_interest']),
+        'LTA Exemption': min(inputs.lta, caps['lta'])
+    }
+
+    taxable_income = max(0.0, gross - sum(deductions.values()))
+
+    # Rebate 87A (Old): If TI <= 5L, Rebate 12500 (Tax becomes 0)
+    tax = rules.income_tax(taxable_income)
+
+    return _finish(out or RegimeResult(), "Old", rules, inputs, gross, deductions, taxable_income, tax)
+
+
+def compare(inputs: TaxInputs, out: ComparisonResult = None) -> ComparisonResult:
+    """Evaluate both regimes, reusing out's result structs when given."""
+    if out is None:
+        out = ComparisonResult()
+    gross = gross_salary(inputs)
+    calculate_new_regime(inputs, gross, out.new_regime)
+    calculate_old_regime(inputs, gross, out.old_regime)
+    return out
@@ -0,0 +1,465 @@
+import hashlib
+import json
+import os
+from bisect import bisect_left, bisect_right
+from types import MappingProxyType
+from typing import Mapping, NamedTuple, Tuple
+
+# Declarative tax rules, one entry per financial year and regime.
+# Slabs are (lower bound, rate) pairs; the last slab is open ended. Adding a
+# year means adding an entry here - the engines only ever read the compiled
+# form below, one RegimeRules per (FY, regime, age band, metro), built once
+# and looked up by get_rules. age_slabs override slabs for an age band, and
+# hra_basic_pct_non_metro replaces hra_basic_pct for non-metro cities.
+# surcharge bands are (income threshold, rate) pairs: the rate applies to the
+# income tax once taxable income exceeds the threshold, with marginal relief
+# so crossing a threshold never costs more than the income above it.
+#
+# This module only uses the standard library so the Vercel handler can
+# import it too. At import the compiled tables are read from a prebuilt
+# artifact (tax_rules.compiled.json) when it matches TAX_RULES, so cold
+# starts skip compilation; rebuild it with `python tax_rules.py` after
+# editing the rules. A stale or missing artifact falls back to compiling.
+# The same command regenerates the frontend's offline rule table
+# (TYPESCRIPT_PATH), so its fallback calculator uses these slabs too.
+
+DEFAULT_FY = "2025-26"
+# Old-regime basic exemption rises with age; the new regime has one schedule
+AGE_BANDS = ("general", "senior", "super_senior")  # <60, 60-79, 80+
+DEFAULT_AGE_BAND = "general"
+
+# Unchanged across the years below
+OLD_REGIME = {
+    "slabs": [
+        (0, 0.0),
+        (250000, 0.05),
+        (500000, 0.20),
+        (1000000, 0.30),
+    ],
+    "age_slabs": {
+        "senior": [(0, 0.0), (300000, 0.05), (500000, 0.20), (1000000, 0.30)],
+        "super_senior": [(0, 0.0), (500000, 0.20), (1000000, 0.30)],
+    },
+    "standard_deduction": 50000,
+    "rebate_limit": 500000,
+    "marginal_relief": False,
+    "surcharge": [(5000000, 0.10), (10000000, 0.15), (20000000, 0.25), (50000000, 0.37)],
+    "cess_rate": 0.04,
+    "caps": {
+        "section_80c": 150000,
+        "section_80d": 75000,  # Assumed max
+        "nps_self": 50000,  # 80CCD(1B)
+        "home_loan_interest": 200000,
+        "lta": 50000,  # Simplified
+        "hra_basic_pct": 0.50,  # Metro
+        "hra_basic_pct_non_metro": 0.40,
+        "hra_rent_basic_pct": 0.10,
+    },
+}
+
+# The new regime caps surcharge at 25%
+NEW_REGIME_SURCHARGE = [(5000000, 0.10), (10000000, 0.15), (20000000, 0.25)]
+
+TAX_RULES = {
+    "2023-24": {
+        "new": {
+            "slabs": [
+                (0, 0.0),
+                (300000, 0.05),
+                (600000, 0.10),
+                (900000, 0.15),
+                (1200000, 0.20),
+                (1500000, 0.30),
+            ],
+            "standard_deduction": 50000,
+            "rebate_limit": 700000,
+            "marginal_relief": True,
+            "surcharge": NEW_REGIME_SURCHARGE,
+            "cess_rate": 0.04,
+            "caps": {},
+        },
+        "old": OLD_REGIME,
+    },
+    "2024-25": {
+        "new": {
+            "slabs": [
+                (0, 0.0),
+                (300000, 0.05),
+                (700000, 0.10),
+                (1000000, 0.15),
+                (1200000, 0.20),
+                (1500000, 0.30),
+            ],
+            "standard_deduction": 75000,
+            "rebate_limit": 700000,
+            "marginal_relief": True,
+            "surcharge": NEW_REGIME_SURCHARGE,
+            "cess_rate": 0.04,
+            "caps": {},
+        },
+        "old": OLD_REGIME,
+    },
+    "2025-26": {
+        "new": {
+            "slabs": [
+                (0, 0.0),
+                (400000, 0.05),
+                (800000, 0.10),
+                (1200000, 0.15),
+                (1600000, 0.20),
+                (2000000, 0.25),
+                (2400000, 0.30),
+            ],
+            "standard_deduction": 75000,
+            # Rebate 87A: no tax up to the limit, marginal relief just above it
+            "rebate_limit": 1200000,
+            "marginal_relief": True,
+            "surcharge": NEW_REGIME_SURCHARGE,
+            "cess_rate": 0.04,
+            "caps": {},
+        },
+        "old": OLD_REGIME,
+    },
+}
+
+
+class RuleProfile(NamedTuple):
+    """What besides the regime selects a rule set; carried by every request."""
+    fy: str = DEFAULT_FY
+    age_band: str = DEFAULT_AGE_BAND
+    metro: bool = True
+
+
+DEFAULT_PROFILE = RuleProfile()
+
+
+def profile_errors(profile: RuleProfile) -> dict:
+    """Field -> [messages] for an unsupported profile, in DRF's error shape; empty when valid."""
+    errors = {}
+    if not isinstance(profile.fy, str) or profile.fy not in TAX_RULES:
+        errors["fy"] = [f'"{profile.fy}" is not a valid choice.']
+    if not isinstance(profile.age_band, str) or profile.age_band not in AGE_BANDS:
+        errors["age_band"] = [f'"{profile.age_band}" is not a valid choice.']
+    if not isinstance(profile.metro, bool):
+        errors["metro"] = ["Must be a valid boolean."]
+    return errors
+
+
+class SlabSchedule(NamedTuple):
+    breakpoints: Tuple[float, ...]
+    rates: Tuple[float, ...]
+    # Tax accrued on all income below each breakpoint
+    cumulative: Tuple[float, ...]
+
+    def tax(self, income: float) -> float:
+        i = bisect_right(self.breakpoints, income) - 1
+        if i < 0:
+            return 0.0
+        return self.cumulative[i] + (income - self.breakpoints[i]) * self.rates[i]
+
+    def rate(self, income: float) -> float:
+        """Rate of the slab income falls in."""
+        return self.rates[max(0, bisect_right(self.breakpoints, income) - 1)]
+
+
+class SurchargeSchedule(NamedTuple):
+    thresholds: Tuple[float, ...]
+    rates: Tuple[float, ...]
+    # Income tax plus surcharge due at each threshold (marginal relief caps
+    # what is due just above it at this plus the income over the threshold)
+    base: Tuple[float, ...]
+    # Income past each threshold at which marginal relief stops binding
+    relief_end: Tuple[float, ...]
+
+    def amount(self, income: float, tax: float) -> float:
+        """Surcharge on tax (the income tax due on income), after marginal relief."""
+        i = bisect_left(self.thresholds, income) - 1
+        if i < 0:
+            return 0.0
+        return min(tax * self.rates[i], self.base[i] + (income - self.thresholds[i]) - tax)
+
+
+class RegimeRules(NamedTuple):
+    fy: str
+    regime: str
+    age_band: str
+    metro: bool
+    slabs: SlabSchedule
+    standard_deduction: float
+    rebate_limit: float
+    marginal_relief: bool
+    surcharge: SurchargeSchedule
+    cess_rate: float
+    caps: Mapping[str, float]
+
+    def income_tax(self, taxable_income: float) -> float:
+        """Slab tax after the 87A rebate and any marginal relief, before cess."""
+        if taxable_income <= self.rebate_limit:
+            return 0.0
+        tax = self.slabs.tax(taxable_income)
+        if self.marginal_relief:
+            # Tax payable should not exceed the income above the rebate limit
+            tax = min(tax, taxable_income - self.rebate_limit)
+        return tax
+
+    def tax_with_surcharge(self, taxable_income: float) -> float:
+        """income_tax plus surcharge, before cess."""
+        tax = self.income_tax(taxable_income)
+        return tax + self.surcharge.amount(taxable_income, tax)
+
+    def marginal_relief_end(self) -> float:
+        """Income at which marginal relief stops binding (slab tax == excess over the rebate limit)."""
+        if not self.marginal_relief:
+            return self.rebate_limit
+        slabs = self.slabs
+        for i, lower in enumerate(slabs.breakpoints):
+            rate = slabs.rates[i]
+            if rate >= 1:
+                continue
+            # cumulative + (x - lower) * rate == x - rebate_limit
+            x = (slabs.cumulative[i] - lower * rate + self.rebate_limit) / (1 - rate)
+            upper = slabs.breakpoints[i + 1] if i + 1 < len(slabs.breakpoints) else float("inf")
+            if max(lower, self.rebate_limit) <= x < upper:
+                return x
+        return self.rebate_limit
+
+    def marginal_rate(self, taxable_income: float) -> float:
+        """Slope of tax_with_surcharge just above taxable_income, before cess (a rebate cliff's jump is not a slope)."""
+        if taxable_income < self.rebate_limit:
+            return 0.0
+        if self.marginal_relief and taxable_income < self.marginal_relief_end():
+            return 1.0
+        surcharge = self.surcharge
+        i = bisect_right(surcharge.thresholds, taxable_income) - 1
+        if i < 0:
+            return self.slabs.rate(taxable_income)
+        if taxable_income < surcharge.relief_end[i]:
+            return 1.0
+        return self.slabs.rate(taxable_income) * (1 + surcharge.rates[i])
+
+    def income_for_tax(self, tax: float) -> float:
+        """Largest taxable income whose tax_with_surcharge does not exceed tax (inverse of the slab walk)."""
+        if tax < 0:
+            raise ValueError("tax must be non-negative")
+        surcharge = self.surcharge
+        i = bisect_right(surcharge.base, tax) - 1
+        if i < 0:
+            return self._income_for_income_tax(tax)
+        # min(tax * (1 + rate), base + income - threshold) <= tax up to the larger inverse
+        return max(self._income_for_income_tax(tax / (1 + surcharge.rates[i])),
+                   surcharge.thresholds[i] + tax - surcharge.base[i])
+
+    def _income_for_income_tax(self, tax: float) -> float:
+        slabs = self.slabs
+        i = bisect_right(slabs.cumulative, tax) - 1
+        rate = slabs.rates[i]
+        income = slabs.breakpoints[i] + (tax - slabs.cumulative[i]) / rate if rate > 0 else float("inf")
+        if self.marginal_relief:
+            # min(slab tax, income - rebate_limit) <= tax holds up to the larger of the two inverses
+            income = max(income, self.rebate_limit + tax)
+        return max(income, self.rebate_limit)
+
+    def kinks(self) -> Tuple[float, ...]:
+        """Taxable incomes where tax_with_surcharge changes slope or jumps."""
+        points = set(self.slabs.breakpoints)
+        points.add(self.rebate_limit)
+        points.add(self.marginal_relief_end())
+        points.update(self.surcharge.thresholds)
+        points.update(self.surcharge.relief_end)
+        return tuple(sorted(points))
+
+
+def compile_slabs(slabs) -> SlabSchedule:
+    ordered = sorted(slabs)
+    if not ordered or ordered[0][0] != 0:
+        raise ValueError("Slabs must start at 0")
+
+    breakpoints = tuple(float(lower) for lower, _ in ordered)
+    rates = tuple(float(rate) for _, rate in ordered)
+    cumulative = [0.0]
+    for i in range(1, len(breakpoints)):
+        cumulative.append(cumulative[-1] + (breakpoints[i] - breakpoints[i - 1]) * rates[i - 1])
+    return SlabSchedule(breakpoints, rates, tuple(cumulative))
+
+
+def _surcharge_relief_end(slabs: SlabSchedule, threshold: float, rate: float, base: float, upper: float) -> float:
+    for k, lower in enumerate(slabs.breakpoints):
+        slope = slabs.rates[k] * (1 + rate) - 1
+        if slope == 0:
+            continue
+        # (cumulative + (x - lower) * slab rate) * (1 + rate) == base + x - threshold
+        x = (base - threshold - (slabs.cumulative[k] - lower * slabs.rates[k]) * (1 + rate)) / slope
+        slab_upper = slabs.breakpoints[k + 1] if k + 1 < len(slabs.breakpoints) else float("inf")
+        if max(lower, threshold) <= x < min(slab_upper, upper):
+            return x
+    return upper
+
+
+def compile_surcharge(rules: RegimeRules, bands) -> SurchargeSchedule:
+    """Precompute what is due at each threshold, so surcharge is one bisect and a min() per income."""
+    ordered = [(float(threshold), float(rate)) for threshold, rate in sorted(bands)]
+    thresholds, rates, base, relief_end = [], [], [], []
+    for i, (threshold, rate) in enumerate(ordered):
+        tax = rules.income_tax(threshold)
+        # What the schedule so far charges at the threshold, computed exactly as amount() would
+        partial = SurchargeSchedule(tuple(thresholds), tuple(rates), tuple(base), tuple(relief_end))
+        due = tax + partial.amount(threshold, tax)
+        upper = ordered[i + 1][0] if i + 1 < len(ordered) else float("inf")
+        thresholds.append(threshold)
+        rates.append(rate)
+        base.append(due)
+        relief_end.append(_surcharge_relief_end(rules.slabs, threshold, rate, due, upper))
+    return SurchargeSchedule(tuple(thresholds), tuple(rates), tuple(base), tuple(relief_end))
+
+
+NO_SURCHARGE = SurchargeSchedule((), (), (), ())
+
+
+def compile_rules(fy: str, regime: str, spec: dict, age_band: str = DEFAULT_AGE_BAND,
+                  metro: bool = True) -> RegimeRules:
+    caps = {name: float(value) for name, value in spec["caps"].items()}
+    non_metro = caps.pop("hra_basic_pct_non_metro", None)
+    if not metro and non_metro is not None:
+        caps["hra_basic_pct"] = non_metro
+
+    rules = RegimeRules(
+        fy=fy,
+        regime=regime,
+        age_band=age_band,
+        metro=metro,
+        slabs=compile_slabs(spec.get("age_slabs", {}).get(age_band, spec["slabs"])),
+        standard_deduction=float(spec["standard_deduction"]),
+        rebate_limit=float(spec["rebate_limit"]),
+        marginal_relief=bool(spec["marginal_relief"]),
+        surcharge=NO_SURCHARGE,
+        cess_rate=float(spec["cess_rate"]),
+        caps=MappingProxyType(caps),
+    )
+    return rules._replace(surcharge=compile_surcharge(rules, spec.get("surcharge", ())))
+
+
+ARTIFACT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tax_rules.compiled.json")
+
+
+def rules_digest() -> str:
+    """Fingerprint of TAX_RULES, recorded in the artifact to detect staleness."""
+    source = json.dumps(TAX_RULES, sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(source.encode(), digest_size=16).hexdigest()
+
+
+def compile_all() -> dict:
+    return {
+        (fy, regime, age_band, metro): compile_rules(fy, regime, spec, age_band, metro)
+        for fy, regimes in TAX_RULES.items()
+        for regime, spec in regimes.items()
+        for age_band in AGE_BANDS
+        for metro in (True, False)
+    }
+
+
+def build_artifact(path: str = ARTIFACT_PATH) -> None:
+    rules = [
+        {
+            "fy": r.fy,
+            "regime": r.regime,
+            "age_band": r.age_band,
+            "metro": r.metro,
+            "slabs": [list(r.slabs.breakpoints), list(r.slabs.rates), list(r.slabs.cumulative)],
+            "standard_deduction": r.standard_deduction,
+            "rebate_limit": r.rebate_limit,
+            "marginal_relief": r.marginal_relief,
+            "surcharge": [list(part) for part in r.surcharge],
+            "cess_rate": r.cess_rate,
+            "caps": dict(r.caps),
+        }
+        for r in compile_all().values()
+    ]
+    with open(path, "w") as f:
+        json.dump({"digest": rules_digest(), "rules": rules}, f, separators=(",", ":"))
+        f.write("\n")
+
+
+def load_artifact(path: str = ARTIFACT_PATH):
+    """Compiled rules from the artifact, or None if it is missing or stale."""
+    try:
+        with open(path) as f:
+            artifact = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if artifact.get("digest") != rules_digest():
+        return None
+
+    compiled = {}
+    for r in artifact["rules"]:
+        breakpoints, rates, cumulative = r["slabs"]
+        compiled[(r["fy"], r["regime"], r["age_band"], r["metro"])] = RegimeRules(
+            fy=r["fy"],
+            regime=r["regime"],
+            age_band=r["age_band"],
+            metro=r["metro"],
+            slabs=SlabSchedule(tuple(breakpoints), tuple(rates), tuple(cumulative)),
+            standard_deduction=r["standard_deduction"],
+            rebate_limit=r["rebate_limit"],
+            marginal_relief=r["marginal_relief"],
+            surcharge=SurchargeSchedule(*(tuple(part) for part in r["surcharge"])),
+            cess_rate=r["cess_rate"],
+            caps=MappingProxyType(r["caps"]),
+        )
+    return compiled
+
+
+TYPESCRIPT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                               "frontend", "src", "utils", "taxRules.generated.ts")
+
+
+def typescript_rules() -> str:
+    """TypeScript module with the compiled rules of every FY (general age band, metro) for the frontend."""
+    def schedule(r: RegimeRules) -> dict:
+        return {
+            "breakpoints": list(r.slabs.breakpoints),
+            "rates": list(r.slabs.rates),
+            "cumulative": list(r.slabs.cumulative),
+            "standardDeduction": r.standard_deduction,
+            "rebateLimit": r.rebate_limit,
+            "marginalRelief": r.marginal_relief,
+            "surcharge": {
+                "thresholds": list(r.surcharge.thresholds),
+                "rates": list(r.surcharge.rates),
+                "base": list(r.surcharge.base),
+            },
+            "cessRate": r.cess_rate,
+            "caps": dict(r.caps),
+        }
+
+    table = {
+        fy: {regime: schedule(compile_rules(fy, regime, spec)) for regime, spec in regimes.items()}
+        for fy, regimes in TAX_RULES.items()
+    }
+    return (
+        "// Generated by `python tax_rules.py` in backend/ from TAX_RULES. Do not edit.\n"
+        "import type { TaxRuleTable } from './taxCalculator';\n\n"
+        f"export const RULES_DIGEST = {json.dumps(rules_digest())};\n"
+        f"export const DEFAULT_FY = {json.dumps(DEFAULT_FY)};\n\n"
+        f"export const TAX_RULES: TaxRuleTable = {json.dumps(table, indent=4)};\n"
+    )
+
+
+COMPILED_RULES = load_artifact() or compile_all()
+
+
+def get_rules(regime: str, fy: str = DEFAULT_FY, age_band: str = DEFAULT_AGE_BAND,
+              metro: bool = True) -> RegimeRules:
+    try:
+        return COMPILED_RULES[(fy, regime, age_band, metro)]
+    except KeyError:
+        raise ValueError(f"No tax rules for FY {fy} ({regime} regime, {age_band}, "
+                         f"{'metro' if metro else 'non-metro'})") from None
+
+
+if __name__ == "__main__":
+    build_artifact()
+    print(f"Wrote {ARTIFACT_PATH}")
+    if os.path.isdir(os.path.dirname(TYPESCRIPT_PATH)):
+        with open(TYPESCRIPT_PATH, "w") as f:
+            f.write(typescript_rules())
+        print(f"Wrote {TYPESCRIPT_PATH}")
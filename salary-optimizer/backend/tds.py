@@ -0,0 +1,173 @@
+import numpy as np
+
+import tax_core
+from batch_engine import compare_tax_regimes_batch, compare_tax_regimes_grouped
+from models import TdsRequest, TdsResponse
+from tax_core import INVESTMENT_FIELDS, SALARY_FIELDS, TaxInputs, profile_of
+
+# Month-by-month TDS (tax withheld from salary) for one financial year.
+#
+# Every month the year's tax is projected again: salary actually paid so far
+# plus the salary still expected, under the regime declared for that month.
+# Whatever the projection says is still owed is spread evenly over the months
+# left, as payroll does. So a mid-year joiner's tax is spread over the
+# months they are employed, a bonus is in the projection from the start of
+# the year, and a regime switch or a changed month re-levels the rest of the
+# year.
+#
+# TdsProjection keeps the monthly table. The projection only depends on the
+# annual totals, which are updated by delta, so changing one month's actuals
+# costs one engine call (both regimes at once) plus a walk over the months
+# from that one on. monthly_run is the columnar counterpart for a
+# company-wide run of a single month.
+
+MONTHS = ('Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec', 'Jan', 'Feb', 'Mar')
+MONTH_COUNT = len(MONTHS)
+
+
+def _check_month(month: int, name: str = 'month') -> int:
+    if not 0 <= month < MONTH_COUNT:
+        raise ValueError(f"{name} must be between 0 (April) and 11 (March)")
+    return month
+
+
+class TdsProjection:
+    def __init__(self, request: TdsRequest):
+        base = request.base
+        self.join_month = _check_month(request.join_month, 'join_month')
+        self.profile = profile_of(base)
+        self.investments = {name: getattr(base.investments, name) for name in INVESTMENT_FIELDS}
+
+        self.regimes = []
+        regime = request.regime
+        for month in request.regime_switches:
+            _check_month(month, 'regime_switches month')
+        for month in range(MONTH_COUNT):
+            regime = request.regime_switches.get(month, regime)
+            self.regimes.append(regime)
+
+        pay_months = sorted(set(request.variable_pay_months)) or list(range(self.join_month, MONTH_COUNT))
+        for month in pay_months:
+            if _check_month(month, 'variable_pay_months') < self.join_month:
+                raise ValueError("Variable pay cannot be paid before join_month")
+
+        # Projected pay: a twelfth of each annual figure per employed month,
+        # variable pay split over its months
+        salary = base.salary
+        self.months = []
+        for month in range(MONTH_COUNT):
+            row = dict.fromkeys(SALARY_FIELDS, 0.0)
+            if month >= self.join_month:
+                for name in SALARY_FIELDS:
+                    row[name] = getattr(salary, name) / MONTH_COUNT
+                row['variable_pay'] = salary.variable_pay / len(pay_months) if month in pay_months else 0.0
+            self.months.append(row)
+        self.totals = {name: sum(row[name] for row in self.months) for name in SALARY_FIELDS}
+
+        self.tds = [0.0] * MONTH_COUNT
+        self.actual = [False] * MONTH_COUNT
+        self.projected = [0.0] * MONTH_COUNT
+        self._annual_tax = None
+
+        for actual in sorted(request.actuals, key=lambda a: a.month):
+            self._set_actual(actual.month, actual.earnings, actual.tds)
+        self._recompute(0)
+
+    def _set_actual(self, month: int, earnings: dict, tds: float) -> None:
+        row = self.months[_check_month(month)]
+        for name, amount in earnings.items():
+            if name not in SALARY_FIELDS:
+                raise ValueError(f"Unknown salary field '{name}'")
+            self.totals[name] += amount - row[name]
+            row[name] = amount
+        if earnings:
+            self._annual_tax = None
+        self.tds[month] = tds
+        self.actual[month] = True
+
+    def set_actual(self, month: int, tds: float, earnings: dict = None) -> None:
+        """Record what was paid and withheld in month; only later months are recomputed."""
+        self._set_actual(month, earnings or {}, tds)
+        self._recompute(month)
+
+    def annual_tax(self) -> dict:
+        """Projected total tax per regime for the current annual totals."""
+        if self._annual_tax is None:
+            inputs = TaxInputs(**self.totals, **self.investments, profile=self.profile)
+            result = tax_core.compare(inputs)
+            self._annual_tax = {'old': result.old_regime.total_tax, 'new': result.new_regime.total_tax}
+        return self._annual_tax
+
+    def _recompute(self, start: int) -> None:
+        annual_tax = self.annual_tax()
+        paid = sum(self.tds[:start])
+        for month in range(start, MONTH_COUNT):
+            projected = annual_tax[self.regimes[month]]
+            self.projected[month] = projected
+            if not self.actual[month]:
+                if month < self.join_month:
+                    self.tds[month] = 0.0
+                else:
+                    self.tds[month] = max(0.0, (projected - paid) / (MONTH_COUNT - month))
+            paid += self.tds[month]
+
+    def schedule(self) -> list:
+        months = []
+        for month, row in enumerate(self.months):
+            gross = sum(row[name] for name in tax_core.EARNING_FIELDS)
+            months.append({
+                'month': month,
+                'label': MONTHS[month],
+                'regime': self.regimes[month].capitalize(),
+                'gross': gross,
+                'tds': self.tds[month],
+                'net': gross - row['pf_deduction'] - row['professional_tax'] - self.tds[month],
+                'projected_annual_tax': self.projected[month],
+                'actual': self.actual[month],
+            })
+        return months
+
+    def response(self) -> dict:
+        months = self.schedule()
+        return {
+            'months': months,
+            'annual_gross': sum(m['gross'] for m in months),
+            'annual_tax': self.projected[-1],
+            'total_tds': sum(self.tds),
+        }
+
+
+def project(request: TdsRequest) -> TdsResponse:
+    return TdsResponse.model_validate(TdsProjection(request).response())
+
+
+def projected_columns(to_date: dict, monthly: dict, month: int, annual: dict = None) -> dict:
+    """
+    Annual input columns for a run in month: pay to date (months before it)
+    plus the expected monthly pay for every month left, plus annual-only
+    columns such as investments.
+    """
+    remaining = MONTH_COUNT - _check_month(month)
+    columns = dict(annual or {})
+    for name in set(to_date) | set(monthly):
+        columns[name] = np.asarray(to_date.get(name, 0.0)) + np.asarray(monthly.get(name, 0.0)) * remaining
+    return columns
+
+
+def monthly_run(columns: dict, month: int, tds_paid, old_regime, profiles=None) -> dict:
+    """
+    This month's TDS for every employee at once, from projected annual
+    columns (see projected_columns), TDS withheld so far and a boolean array
+    that is True where the employee is on the old regime. Pass profiles (one
+    RuleProfile per row) for a mixed workforce.
+    """
+    remaining = MONTH_COUNT - _check_month(month)
+    if profiles is None:
+        result = compare_tax_regimes_batch(columns)
+    else:
+        result = compare_tax_regimes_grouped(columns, profiles)
+    annual_tax = np.where(old_regime, result['old_regime']['total_tax'], result['new_regime']['total_tax'])
+    return {
+        'annual_tax': annual_tax,
+        'tds': np.maximum(0.0, (annual_tax - tds_paid) / remaining),
+    }
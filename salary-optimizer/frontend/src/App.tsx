@@ -1,8 +1,8 @@
-import { useState } from 'react'
+import { useEffect, useRef, useState } from 'react'
 import { SalaryInputForm } from './components/SalaryInputForm'
 import { TaxComparison } from './components/TaxComparison'
 import type { SalaryInputs, Investments, TaxResult } from './utils/taxCalculator'
-import { calculateTaxAPI } from './services/api'
+import { connectLiveCalculation, createTaxRecalculator } from './services/api'
 import { Calculator, DollarSign } from 'lucide-react'
 
 function App() {
@@ -27,21 +27,36 @@ function App() {
   });
 
   const [results, setResults] = useState<{ oldRegime: TaxResult, newRegime: TaxResult } | null>(null);
+  const [offline, setOffline] = useState(false);
   const [loading, setLoading] = useState(false);
+  const [live, setLive] = useState(false);
 
-  // Manual API call handler
-  const handleCalculate = async () => {
-    setLoading(true);
-    setResults(null);
-    try {
-      const res = await calculateTaxAPI(inputs, investments);
-      setResults(res);
-    } catch (e) {
-      console.error("Failed to fetch tax data", e);
-      alert("Calculation failed. Ensure backend is running.");
-    } finally {
-      setLoading(false);
-    }
+  // One recalculator for the app's lifetime: debounces input changes, aborts
+  // superseded requests and sends changes over the live WebSocket when it
+  // is available (see services/api.ts)
+  const recalculator = useRef<ReturnType<typeof createTaxRecalculator> | null>(null);
+  if (recalculator.current === null) {
+    recalculator.current = createTaxRecalculator({
+      onResult: (res, source) => {
+        setResults(res);
+        setOffline(source === 'offline');
+      },
+      onPending: setLoading,
+      live: connectLiveCalculation(),
+    });
+  }
+
+  useEffect(() => () => recalculator.current?.cancel(), []);
+
+  // After the first calculation, results follow the inputs as they change
+  useEffect(() => {
+    if (live) recalculator.current?.schedule(inputs, investments);
+  }, [live, inputs, investments]);
+
+  const handleCalculate = () => {
+    recalculator.current?.schedule(inputs, investments);
+    recalculator.current?.flush();
+    setLive(true);
   };
 
   return (
@@ -97,6 +112,11 @@ function App() {
         {/* Results Section */}
         {results && (
           <div className="animate-in fade-in slide-in-from-bottom-4 duration-500">
+            {offline && (
+              <p className="text-center text-sm text-amber-600 mb-4">
+                Backend unreachable: showing an offline estimate from the same tax rules.
+              </p>
+            )}
             <TaxComparison
               oldRegime={results.oldRegime}
               newRegime={results.newRegime}
@@ -1,9 +1,11 @@
+import { calculateTax } from '../utils/taxCalculator';
 import type { SalaryInputs, Investments, TaxResult } from '../utils/taxCalculator';
 
 // Backend is deployed on Vercel
 const API_URL = import.meta.env.PROD
     ? 'https://salary-optimizer-api.vercel.app/api'
     : 'http://localhost:8000/api';
+const LIVE_URL = API_URL.replace(/^http/, 'ws').replace(/\/api$/, '/ws/calculate');
 
 export interface ComparisonResponse {
     old_regime: TaxResult;
@@ -47,6 +49,7 @@ function mapResponseToTaxResult(res: any): TaxResult {
         grossSalary: res.gross_salary,
         taxableIncome: res.taxable_income,
         taxAmount: res.tax_amount,
+        surcharge: res.surcharge,
         cess: res.cess,
         totalTax: res.total_tax,
         inHandMonthly: res.in_hand_monthly,
@@ -54,26 +57,225 @@ function mapResponseToTaxResult(res: any): TaxResult {
     };
 }
 
-export async function calculateTaxAPI(inputs: SalaryInputs, investments: Investments): Promise<{ oldRegime: TaxResult, newRegime: TaxResult }> {
-    try {
-        const response = await fetch(`${API_URL}/calculate`, {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify(transformToApiPayload(inputs, investments)),
-        });
+export type TaxResults = { oldRegime: TaxResult, newRegime: TaxResult };
 
-        if (!response.ok) {
-            throw new Error('API Calculation failed');
-        }
+// Identical calls made while one is in flight share its fetch
+const inFlight = new Map<string, Promise<TaxResults>>();
+
+async function fetchTax(body: string, signal?: AbortSignal): Promise<TaxResults> {
+    const response = await fetch(`${API_URL}/calculate`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body,
+        signal,
+    });
+
+    if (!response.ok) {
+        throw new Error('API Calculation failed');
+    }
 
-        const data = await response.json();
-        return {
-            oldRegime: mapResponseToTaxResult(data.old_regime),
-            newRegime: mapResponseToTaxResult(data.new_regime)
-        };
+    const data = await response.json();
+    return {
+        oldRegime: mapResponseToTaxResult(data.old_regime),
+        newRegime: mapResponseToTaxResult(data.new_regime)
+    };
+}
 
+export async function calculateTaxAPI(inputs: SalaryInputs, investments: Investments, signal?: AbortSignal): Promise<TaxResults> {
+    const body = JSON.stringify(transformToApiPayload(inputs, investments));
+    if (signal) {
+        // Cancellable calls own their fetch
+        return fetchTax(body, signal);
+    }
+    let pending = inFlight.get(body);
+    if (!pending) {
+        pending = fetchTax(body).finally(() => inFlight.delete(body));
+        inFlight.set(body, pending);
+    }
+    try {
+        return await pending;
     } catch (error) {
         console.error(error);
         throw error;
     }
 }
+
+type ApiPayload = ReturnType<typeof transformToApiPayload>;
+
+// Field -> value across both sections, the shape /ws/calculate patches use
+function flatten(payload: ApiPayload): { [field: string]: number } {
+    return { ...payload.salary, ...payload.investments };
+}
+
+export interface LiveCalculation {
+    calculate(inputs: SalaryInputs, investments: Investments): Promise<TaxResults>;
+    close(): void;
+}
+
+// Live channel over the /ws/calculate WebSocket. The first message sends
+// the full request; after that only changed fields go up and only changed
+// result fields come back, merged here into the last full result. Replies
+// arrive in order, so every patch is merged even when its caller has moved
+// on. Any error resyncs with a full request on the next call; if the
+// socket can't be opened (e.g. on the serverless deployment) calculate
+// rejects and the channel stays unavailable.
+export function connectLiveCalculation(url: string = LIVE_URL): LiveCalculation {
+    let socket: Promise<WebSocket> | undefined;
+    let unavailable = false;
+    let sent: { [field: string]: number } | undefined; // Server-side state as of the last message
+    let result: any; // Latest full ComparisonResponse, snake_case
+    let nextId = 0;
+    const waiting = new Map<number, { resolve: (results: TaxResults) => void, reject: (error: Error) => void }>();
+
+    function reset(error: Error) {
+        socket = undefined;
+        sent = undefined;
+        result = undefined;
+        waiting.forEach(({ reject }) => reject(error));
+        waiting.clear();
+    }
+
+    function connect(): Promise<WebSocket> {
+        socket ??= new Promise((resolve, reject) => {
+            const ws = new WebSocket(url);
+            let opened = false;
+            ws.onopen = () => {
+                opened = true;
+                resolve(ws);
+            };
+            ws.onerror = () => {
+                // Never opened: the server has no WebSocket endpoint, use HTTP from now on
+                if (!opened) unavailable = true;
+                reject(new Error('Live calculation unavailable'));
+            };
+            ws.onclose = () => reset(new Error('Live calculation closed'));
+            ws.onmessage = (event) => {
+                const reply = JSON.parse(event.data);
+                const waiter = waiting.get(reply.id);
+                waiting.delete(reply.id);
+                if (reply.error) {
+                    sent = undefined;
+                    waiter?.reject(new Error('Live calculation failed'));
+                    return;
+                }
+                if (reply.result) {
+                    result = reply.result;
+                } else {
+                    for (const [key, fields] of Object.entries(reply.changes)) {
+                        result[key] = { ...result[key], ...(fields as object) };
+                    }
+                }
+                waiter?.resolve({
+                    oldRegime: mapResponseToTaxResult(result.old_regime),
+                    newRegime: mapResponseToTaxResult(result.new_regime)
+                });
+            };
+        });
+        return socket;
+    }
+
+    return {
+        async calculate(inputs: SalaryInputs, investments: Investments) {
+            if (unavailable) throw new Error('Live calculation unavailable');
+            const ws = await connect();
+            const payload = transformToApiPayload(inputs, investments);
+            const fields = flatten(payload);
+            const id = nextId++;
+            const changes: { [field: string]: number } = {};
+            for (const [name, value] of Object.entries(fields)) {
+                if (sent && sent[name] !== value) changes[name] = value;
+            }
+            // A patch needs at least one change; otherwise resend in full
+            const message = Object.keys(changes).length ? { id, changes } : { id, request: payload };
+            sent = fields;
+            return new Promise<TaxResults>((resolve, reject) => {
+                waiting.set(id, { resolve, reject });
+                ws.send(JSON.stringify(message));
+            });
+        },
+        close() {
+            socket?.then((ws) => ws.close(), () => undefined);
+            reset(new Error('Live calculation closed'));
+        },
+    };
+}
+
+export interface RecalculateOptions {
+    delay?: number; // Quiet period in ms before a request is sent
+    onResult: (results: TaxResults, source: 'api' | 'offline') => void;
+    onPending?: (pending: boolean) => void;
+    live?: LiveCalculation; // Preferred over HTTP while it is available
+}
+
+// Debounced recalculation for live inputs. A burst of changes (a slider
+// drag, typing) sends one request once the inputs settle, and a newer
+// change aborts the request still in flight for older inputs, so only the
+// latest inputs ever reach onResult. With a live channel, changes go over
+// the WebSocket and HTTP is only the fallback. If the API can't be reached
+// the result comes from the local calculator instead, marked 'offline'.
+export function createTaxRecalculator({ delay = 250, onResult, onPending, live }: RecalculateOptions) {
+    let timer: ReturnType<typeof setTimeout> | undefined;
+    let controller: AbortController | undefined;
+    let latest: [SalaryInputs, Investments] | undefined;
+    let lastBody: string | undefined;
+
+    async function remote(inputs: SalaryInputs, investments: Investments, signal: AbortSignal): Promise<TaxResults> {
+        if (live) {
+            try {
+                return await live.calculate(inputs, investments);
+            } catch {
+                if (signal.aborted) throw new Error('Superseded');
+            }
+        }
+        return calculateTaxAPI(inputs, investments, signal);
+    }
+
+    async function run() {
+        timer = undefined;
+        if (!latest) return;
+        const [inputs, investments] = latest;
+        const body = JSON.stringify(transformToApiPayload(inputs, investments));
+        if (body === lastBody) return;
+
+        controller?.abort();
+        const current = controller = new AbortController();
+        lastBody = body;
+        onPending?.(true);
+        try {
+            const results = await remote(inputs, investments, current.signal);
+            // Live replies can't be aborted, so superseded ones are dropped here
+            if (current.signal.aborted) return;
+            onResult(results, 'api');
+        } catch (error) {
+            if (current.signal.aborted) return; // Superseded by newer inputs
+            console.error(error);
+            lastBody = undefined;
+            onResult(calculateTax(inputs, investments), 'offline');
+        } finally {
+            if (controller === current) {
+                controller = undefined;
+                onPending?.(false);
+            }
+        }
+    }
+
+    return {
+        schedule(inputs: SalaryInputs, investments: Investments) {
+            latest = [inputs, investments];
+            clearTimeout(timer);
+            timer = setTimeout(run, delay);
+        },
+        // Send the latest inputs now, skipping the rest of the quiet period
+        flush() {
+            clearTimeout(timer);
+            lastBody = undefined;
+            return run();
+        },
+        cancel() {
+            clearTimeout(timer);
+            timer = undefined;
+            controller?.abort();
+            live?.close();
+        },
+    };
+}
@@ -0,0 +1,320 @@
+// Generated by `python tax_rules.py` in backend/ from TAX_RULES. Do not edit.
+import type { TaxRuleTable } from './taxCalculator';
+
+export const RULES_DIGEST = "964de1c48d774ea9571b2716c9d6e039";
+export const DEFAULT_FY = "2025-26";
+
+export const TAX_RULES: TaxRuleTable = {
+    "2023-24": {
+        "new": {
+            "breakpoints": [
+                0.0,
+                300000.0,
+                600000.0,
+                900000.0,
+                1200000.0,
+                1500000.0
+            ],
+            "rates": [
+                0.0,
+                0.05,
+                0.1,
+                0.15,
+                0.2,
+                0.3
+            ],
+            "cumulative": [
+                0.0,
+                0.0,
+                15000.0,
+                45000.0,
+                90000.0,
+                150000.0
+            ],
+            "standardDeduction": 50000.0,
+            "rebateLimit": 700000.0,
+            "marginalRelief": true,
+            "surcharge": {
+                "thresholds": [
+                    5000000.0,
+                    10000000.0,
+                    20000000.0
+                ],
+                "rates": [
+                    0.1,
+                    0.15,
+                    0.25
+                ],
+                "base": [
+                    1200000.0,
+                    2970000.0,
+                    6555000.0
+                ]
+            },
+            "cessRate": 0.04,
+            "caps": {}
+        },
+        "old": {
+            "breakpoints": [
+                0.0,
+                250000.0,
+                500000.0,
+                1000000.0
+            ],
+            "rates": [
+                0.0,
+                0.05,
+                0.2,
+                0.3
+            ],
+            "cumulative": [
+                0.0,
+                0.0,
+                12500.0,
+                112500.0
+            ],
+            "standardDeduction": 50000.0,
+            "rebateLimit": 500000.0,
+            "marginalRelief": false,
+            "surcharge": {
+                "thresholds": [
+                    5000000.0,
+                    10000000.0,
+                    20000000.0,
+                    50000000.0
+                ],
+                "rates": [
+                    0.1,
+                    0.15,
+                    0.25,
+                    0.37
+                ],
+                "base": [
+                    1312500.0,
+                    3093750.0,
+                    6684375.0,
+                    18515625.0
+                ]
+            },
+            "cessRate": 0.04,
+            "caps": {
+                "section_80c": 150000.0,
+                "section_80d": 75000.0,
+                "nps_self": 50000.0,
+                "home_loan_interest": 200000.0,
+                "lta": 50000.0,
+                "hra_basic_pct": 0.5,
+                "hra_rent_basic_pct": 0.1
+            }
+        }
+    },
+    "2024-25": {
+        "new": {
+            "breakpoints": [
+                0.0,
+                300000.0,
+                700000.0,
+                1000000.0,
+                1200000.0,
+                1500000.0
+            ],
+            "rates": [
+                0.0,
+                0.05,
+                0.1,
+                0.15,
+                0.2,
+                0.3
+            ],
+            "cumulative": [
+                0.0,
+                0.0,
+                20000.0,
+                50000.0,
+                80000.0,
+                140000.0
+            ],
+            "standardDeduction": 75000.0,
+            "rebateLimit": 700000.0,
+            "marginalRelief": true,
+            "surcharge": {
+                "thresholds": [
+                    5000000.0,
+                    10000000.0,
+                    20000000.0
+                ],
+                "rates": [
+                    0.1,
+                    0.15,
+                    0.25
+                ],
+                "base": [
+                    1190000.0,
+                    2959000.0,
+                    6543500.0
+                ]
+            },
+            "cessRate": 0.04,
+            "caps": {}
+        },
+        "old": {
+            "breakpoints": [
+                0.0,
+                250000.0,
+                500000.0,
+                1000000.0
+            ],
+            "rates": [
+                0.0,
+                0.05,
+                0.2,
+                0.3
+            ],
+            "cumulative": [
+                0.0,
+                0.0,
+                12500.0,
+                112500.0
+            ],
+            "standardDeduction": 50000.0,
+            "rebateLimit": 500000.0,
+            "marginalRelief": false,
+            "surcharge": {
+                "thresholds": [
+                    5000000.0,
+                    10000000.0,
+                    20000000.0,
+                    50000000.0
+                ],
+                "rates": [
+                    0.1,
+                    0.15,
+                    0.25,
+                    0.37
+                ],
+                "base": [
+                    1312500.0,
+                    3093750.0,
+                    6684375.0,
+                    18515625.0
+                ]
+            },
+            "cessRate": 0.04,
+            "caps": {
+                "section_80c": 150000.0,
+                "section_80d": 75000.0,
+                "nps_self": 50000.0,
+                "home_loan_interest": 200000.0,
+                "lta": 50000.0,
+                "hra_basic_pct": 0.5,
+                "hra_rent_basic_pct": 0.1
+            }
+        }
+    },
+    "2025-26": {
+        "new": {
+            "breakpoints": [
+                0.0,
+                400000.0,
+                800000.0,
+                1200000.0,
+                1600000.0,
+                2000000.0,
+                2400000.0
+            ],
+            "rates": [
+                0.0,
+                0.05,
+                0.1,
+                0.15,
+                0.2,
+                0.25,
+                0.3
+            ],
+            "cumulative": [
+                0.0,
+                0.0,
+                20000.0,
+                60000.0,
+                120000.0,
+                200000.0,
+                300000.0
+            ],
+            "standardDeduction": 75000.0,
+            "rebateLimit": 1200000.0,
+            "marginalRelief": true,
+            "surcharge": {
+                "thresholds": [
+                    5000000.0,
+                    10000000.0,
+                    20000000.0
+                ],
+                "rates": [
+                    0.1,
+                    0.15,
+                    0.25
+                ],
+                "base": [
+                    1080000.0,
+                    2838000.0,
+                    6417000.0
+                ]
+            },
+            "cessRate": 0.04,
+            "caps": {}
+        },
+        "old": {
+            "breakpoints": [
+                0.0,
+                250000.0,
+                500000.0,
+                1000000.0
+            ],
+            "rates": [
+                0.0,
+                0.05,
+                0.2,
+                0.3
+            ],
+            "cumulative": [
+                0.0,
+                0.0,
+                12500.0,
+                112500.0
+            ],
+            "standardDeduction": 50000.0,
+            "rebateLimit": 500000.0,
+            "marginalRelief": false,
+            "surcharge": {
+                "thresholds": [
+                    5000000.0,
+                    10000000.0,
+                    20000000.0,
+                    50000000.0
+                ],
+                "rates": [
+                    0.1,
+                    0.15,
+                    0.25,
+                    0.37
+                ],
+                "base": [
+                    1312500.0,
+                    3093750.0,
+                    6684375.0,
+                    18515625.0
+                ]
+            },
+            "cessRate": 0.04,
+            "caps": {
+                "section_80c": 150000.0,
+                "section_80d": 75000.0,
+                "nps_self": 50000.0,
+                "home_loan_interest": 200000.0,
+                "lta": 50000.0,
+                "hra_basic_pct": 0.5,
+                "hra_rent_basic_pct": 0.1
+            }
+        }
+    }
+};